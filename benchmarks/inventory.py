@@ -0,0 +1,65 @@
+import os
+import time
+import tempfile
+from ruamel.yaml import YAML
+from utils import inventory_cache
+from utils.runner import is_in_inventory, check_config
+
+NUM_HOSTS = 15000
+
+
+def write_inventory(directory, num_hosts):
+    '''Write Nornir config and inventory of ToR switches.
+    Arguments:
+        * directory - directory to write files to
+        * num_hosts - number of hosts in inventory
+    Returns:
+        * Nornir config location
+    '''
+    config = os.path.join(directory, 'config.yml')
+    host_file = os.path.join(directory, 'hosts.yml')
+    group_file = os.path.join(directory, 'groups.yml')
+    with open(config, 'w', encoding='utf-8') as f:
+        f.write('inventory:\n  plugin: nornir.plugins.inventory.simple.'
+                'SimpleInventory\n  options:\n    host_file: "{}"\n'
+                '    group_file: "{}"\n'.format(host_file, group_file))
+    with open(host_file, 'w', encoding='utf-8') as f:
+        for num in range(num_hosts):
+            f.write('tor-{0}:\n  hostname: 10.{1}.{2}.1\n  groups:\n'
+                    '    - dc_{1}\n    - tors\n'.format(
+                        num, num // 256 % 256, num % 256))
+    with open(group_file, 'w', encoding='utf-8') as f:
+        f.write('tors:\n  data:\n    role: tor_switch\n')
+        for num in range(256):
+            f.write('dc_{0}:\n  data:\n    dc_name: dc{0}\n'.format(num))
+    return config
+
+
+def bench(name, func, *args):
+    '''Time single call of function and print its cost.'''
+    start = time.perf_counter()
+    func(*args)
+    print('{:<40} {:>10.1f} ms'.format(
+        name, (time.perf_counter() - start) * 1000))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        inventory_cache.DEFAULT_CACHE_DIR = os.path.join(directory, 'cache')
+        config = write_inventory(directory, NUM_HOSTS)
+        host_file = os.path.join(directory, 'hosts.yml')
+        print('Inventory of {} hosts:'.format(NUM_HOSTS))
+
+        def parse():
+            with open(host_file, 'r', encoding='utf-8') as f:
+                YAML().load(f)
+
+        bench('round-trip YAML parse', parse)
+        bench('check_config, no snapshots', check_config, config)
+        bench('check_config, snapshots', check_config, config)
+        bench('is_in_inventory, snapshots', is_in_inventory, config,
+              'tor-{}'.format(NUM_HOSTS - 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import time
+import ipaddress
+import tracemalloc
+from utils.switch_objects import (SwitchInterface, InterfaceSet, IPAddress,
+                                  VlanSet)
+
+NUM_HOSTS = 1000
+NUM_INTERFACES = 100
+NUM_TRUNKS = 1000
+
+
+class DictInterface:
+    '''Switch interface keeping attributes in per-instance dictionary, like
+    SwitchInterface did before slots.'''
+    def __init__(self, name):
+        self.name = name
+        self.ipv4_addresses = []
+        self.ipv6_addresses = []
+        self.mode = 'switched'
+        self.svi = self.subinterface = self.lag = False
+
+
+class DictIPAddress:
+    '''IP address keeping ipaddress object, like IPAddress did before.'''
+    def __init__(self, address, prefix_length):
+        self.address = ipaddress.ip_address(address)
+        self.prefix_length = int(prefix_length)
+        self.primary = True
+
+
+def build_hosts(interface_class, address_class, container):
+    '''Build interfaces of all hosts, filled like switch_interfaces_check
+    binding does.
+    Arguments:
+        * interface_class - switch interface class
+        * address_class - IP address class
+        * container - callable making interface collection out of list
+    Returns:
+        * list of interface collections, one per host
+    '''
+    hosts = []
+    for host_num in range(NUM_HOSTS):
+        interfaces = []
+        for num in range(NUM_INTERFACES):
+            # names are built at runtime, as parsed from CLI outputs
+            interface = interface_class('Ethernet1/{}'.format(num + 1))
+            interface.admin_status = 'up'
+            interface.oper_status = 'up'
+            interface.description = 'server-{}'.format(num)
+            interface.mtu = 9216
+            interface.speed = 25
+            interface.duplex = 'full'
+            interface.load_in = 0.1
+            interface.load_out = 0.2
+            interface.macs_learned = 2
+            interface.switch_mode = 'access'
+            interface.pvid = 100
+            interface.vlan_list = [100]
+            interface.member = None
+            interface.breakout = False
+            interface.ipv4_addresses.append(address_class(
+                '10.{}.{}.1'.format(host_num % 256, num), 24))
+            interface.ipv6_addresses.append(address_class(
+                '2001:db8:{:x}:{:x}::1'.format(host_num, num), 64))
+            interfaces.append(interface)
+        hosts.append(container(interfaces))
+    return hosts
+
+
+def build_trunks(vlan_list):
+    '''Build allowed VLAN lists of trunks allowing all VLANs.
+    Arguments:
+        * vlan_list - callable making VLAN list out of range string
+    Returns:
+        * list of VLAN lists
+    '''
+    return [vlan_list('1-4094') for _ in range(NUM_TRUNKS)]
+
+
+def expand_vlans(vlan_list):
+    '''Expand VLAN ranges into list of integers, like drivers did before.'''
+    start, end = vlan_list.split('-')
+    return list(range(int(start), int(end) + 1))
+
+
+def measure(name, build, *args):
+    '''Build objects and print memory they take.'''
+    tracemalloc.start()
+    hosts = build(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{:<30} {:>10.1f} MB'.format(name, size / 2 ** 20))
+    return hosts
+
+
+def main():
+    print('{} hosts x {} interfaces:'.format(NUM_HOSTS, NUM_INTERFACES))
+    measure('dictionaries and list', build_hosts, DictInterface,
+            DictIPAddress, list)
+    hosts = measure('slots and InterfaceSet', build_hosts, SwitchInterface,
+                    IPAddress, InterfaceSet)
+    name = 'Ethernet1/{}'.format(NUM_INTERFACES)
+    for label, lookup in (
+            ('lookup by name, scan', lambda x: next(
+                y for y in x if y.name == name)),
+            ('lookup by name, index', lambda x: x.get(name))):
+        start = time.perf_counter()
+        for interfaces in hosts:
+            lookup(interfaces)
+        print('{:<30} {:>10.1f} ms'.format(
+            label, (time.perf_counter() - start) * 1000))
+    print('{} trunks allowing 1-4094:'.format(NUM_TRUNKS))
+    lists = measure('lists of integers', build_trunks, expand_vlans)
+    sets = measure('VlanSet', build_trunks, VlanSet.from_string)
+    for label, vlan_lists, intersect in (
+            ('intersect lists', lists, lambda x, y: set(x).intersection(y)),
+            ('intersect VlanSet', sets, lambda x, y: x & y)):
+        start = time.perf_counter()
+        common = vlan_lists[0]
+        for vlan_list in vlan_lists:
+            common = intersect(common, vlan_list)
+        print('{:<30} {:>10.1f} ms'.format(
+            label, (time.perf_counter() - start) * 1000))
+
+
+if __name__ == '__main__':
+    main()
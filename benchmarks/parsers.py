@@ -0,0 +1,137 @@
+import sys
+import json
+import types
+import timeit
+import subprocess
+from drivers import get_driver
+from tests.helpers import get_file_contents
+
+# number of copies of recorded neighbors/interfaces to parse, to get an
+# output of real ToR switch size
+SCALE = 100
+ROUNDS = 20
+# number of distinct neighbors in synthetic BGP output, like route server or
+# border leaf has per VRF
+NUM_NEIGHBORS = 1000
+# revision with split and search BGP parsers, which single pass ones
+# replaced; other revision may be given as the first argument
+BASELINE_REVISION = 'd171b9b~1'
+
+
+def scale_text_bgp(output, scale):
+    '''Multiply neighbors in BGP neighbors text output.
+    Arguments:
+        * output - CLI output
+        * scale - multiplier
+    Returns:
+        * string with output
+    '''
+    return '\n'.join([output.strip()] * scale)
+
+
+def synthetic_bgp(output, header, address, num_neighbors):
+    '''Build BGP neighbors text output with many distinct neighbors out of
+    first recorded one.
+    Arguments:
+        * output - CLI output
+        * header - text neighbor header line starts with
+        * address - address of first neighbor, as listed in output
+        * num_neighbors - number of neighbors to make
+    Returns:
+        * string with output
+    '''
+    block = output[:output.index(header, 1)]
+    return ''.join(block.replace(address, 'fe80::{:x}'.format(x + 1))
+                   for x in range(num_neighbors))
+
+
+def load_revision_driver(revision, module_name, class_name):
+    '''Load driver as it was at git revision, to benchmark parsers against
+    the code they replaced. Driver is not registered.
+    Arguments:
+        * revision - git revision
+        * module_name - name of module in drivers package
+        * class_name - name of driver class
+    Returns:
+        * instance of driver class
+    '''
+    path = 'drivers/{}.py'.format(module_name)
+    source = subprocess.run(['git', 'show', '{}:{}'.format(revision, path)],
+                            check=True, capture_output=True,
+                            text=True).stdout
+    module = types.ModuleType('{}_{}'.format(module_name, 'baseline'))
+    exec(compile(source, '{}:{}'.format(revision, path), 'exec'),
+         module.__dict__)
+    return getattr(module, class_name)()
+
+
+def scale_json(output, table_path, scale):
+    '''Multiply rows of NX-OS structured output table.
+    Arguments:
+        * output - JSON output
+        * table_path - list of keys leading to list of rows
+        * scale - multiplier
+    Returns:
+        * JSON string
+    '''
+    data = json.loads(output)
+    rows = data
+    for key in table_path[:-1]:
+        rows = rows[key]
+    rows[table_path[-1]] = rows[table_path[-1]] * scale
+    return json.dumps(data)
+
+
+def bench(name, func, output, *args):
+    '''Time parsing function and print per call cost.
+    Arguments:
+        * name - title to print
+        * func - parsing function returning iterable
+        * output - output to parse
+        * args - additional arguments for parsing function
+    '''
+    seconds = min(timeit.repeat(lambda: list(func(output, *args)),
+                                number=ROUNDS, repeat=3)) / ROUNDS
+    print('{:<40} {:>10.3f} ms'.format(name, seconds * 1000))
+
+
+def main():
+    text = get_driver('nxos')
+    structured = get_driver('nxos', 'json')
+    bgp_text = scale_text_bgp(get_file_contents(
+        'cisco_show_bgp_ipv6_vrf_neighbors.txt'), SCALE)
+    bgp_json = scale_json(get_file_contents(
+        'cisco_show_bgp_ipv6_vrf_neighbors.json'),
+        ['TABLE_vrf', 'ROW_vrf', 'TABLE_neighbor', 'ROW_neighbor'], SCALE)
+    brief_text = '\n'.join([get_file_contents(
+        'cisco_show_int_brief.txt')] * SCALE)
+    brief_json = scale_json(get_file_contents('cisco_show_int_brief.json'),
+                            ['TABLE_interface', 'ROW_interface'], SCALE)
+    print('NX-OS parsers, {} copies of recorded outputs:'.format(SCALE))
+    bench('BGP neighbors, text', text.parse_bgp_neighbors, bgp_text, 'v6')
+    bench('BGP neighbors, json', structured.parse_bgp_neighbors, bgp_json,
+          'v6')
+    bench('interfaces brief, text', text.parse_interfaces_brief, brief_text)
+    bench('interfaces brief, json', structured.parse_interfaces_brief,
+          brief_json)
+    nxos_bgp = synthetic_bgp(get_file_contents(
+        'cisco_show_bgp_ipv6_vrf_neighbors.txt'), 'BGP neighbor is ',
+        'fe80::162:15', NUM_NEIGHBORS)
+    huawei_bgp = synthetic_bgp(get_file_contents(
+        'huawei_show_bgp_ipv6_vrf_neighbors.txt'), ' BGP Peer is ',
+        'FE80::DD:A1', NUM_NEIGHBORS)
+    revision = sys.argv[1] if len(sys.argv) > 1 else BASELINE_REVISION
+    print('BGP neighbors text parsers, {} neighbors, baseline is {}:'.format(
+        NUM_NEIGHBORS, revision))
+    bench('NX-OS, baseline', load_revision_driver(
+        revision, 'nxos', 'NXOSDriver').parse_bgp_neighbors, nxos_bgp, 'v6')
+    bench('NX-OS, current', text.parse_bgp_neighbors, nxos_bgp, 'v6')
+    bench('VRPv8, baseline', load_revision_driver(
+        revision, 'huawei_vrpv8', 'VRPv8Driver').parse_bgp_neighbors,
+        huawei_bgp, 'v6')
+    bench('VRPv8, current', get_driver('huawei_vrpv8').parse_bgp_neighbors,
+          huawei_bgp, 'v6')
+
+
+if __name__ == '__main__':
+    main()
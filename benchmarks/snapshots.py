@@ -0,0 +1,95 @@
+import os
+import time
+import sqlite3
+import tempfile
+from nornir.core.inventory import Host
+from utils.switch_objects import SwitchInterface, BGPNeighbor, VlanSet
+from utils.fleet_export import export_fleet, TABLES
+from utils.snapshot_diff import diff_snapshots
+
+NUM_HOSTS = 1000
+NUM_INTERFACES = 100
+NUM_NEIGHBORS = 4
+# every that interface changes between snapshots
+CHANGE_EVERY = 97
+
+
+def build_hosts(run):
+    '''Build hosts like switch_interfaces_check left them, counters are
+    different on every run and some interfaces change.
+    Arguments:
+        * run - run number
+    Returns:
+        * list of nornir.core.inventory.Host
+    '''
+    vlans = VlanSet.from_string('1,512,600')
+    hosts = []
+    for host_num in range(NUM_HOSTS):
+        interfaces = []
+        for num in range(NUM_INTERFACES):
+            changed = run and (host_num * NUM_INTERFACES + num) % \
+                CHANGE_EVERY == 0
+            interface = SwitchInterface('Ethernet1/{}'.format(num + 1))
+            interface.admin_status = 'up'
+            interface.oper_status = 'down' if changed else 'up'
+            interface.mtu = 9216
+            interface.speed = 25
+            interface.load_in = 0.1 + run / 100
+            interface.load_out = 0.2 + run / 100
+            interface.macs_learned = 100 + run
+            interface.switch_mode = 'trunk'
+            interface.vlan_list = vlans
+            interfaces.append(interface)
+        neighbors = {}
+        for num in range(NUM_NEIGHBORS):
+            neighbor = BGPNeighbor('10.{}.{}.{}'.format(
+                host_num // 256, host_num % 256, num))
+            neighbor.state = 'established'
+            neighbor.as_number = 65000 + num
+            neighbors[neighbor.address.compressed] = neighbor
+        hosts.append(Host('tor-{}'.format(host_num), data={
+            'interfaces': interfaces, 'vrf_name': 'Lasers',
+            'bgp_neighbors': neighbors}))
+    return hosts
+
+
+def naive_diff(path, old, new):
+    '''Compare interfaces of two snapshots loading every row, as without
+    record hashes.'''
+    columns = [x for x, _ in TABLES['interfaces']][2:]
+    connection = sqlite3.connect(path)
+    try:
+        rows = ({}, {})
+        for row in connection.execute(
+                'SELECT {} FROM interfaces WHERE snapshot IN (?, ?)'.format(
+                    ', '.join(['snapshot', 'host'] + columns)), (old, new)):
+            rows[row[0] == new][row[1:3]] = row
+        return [x for x, y in rows[1].items() if x in rows[0] and
+                rows[0][x][columns.index('oper_status') + 2] !=
+                y[columns.index('oper_status') + 2]]
+    finally:
+        connection.close()
+
+
+def main():
+    print('{} hosts x {} interfaces, every {}th one changes:'.format(
+        NUM_HOSTS, NUM_INTERFACES, CHANGE_EVERY))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'fleet.db')
+        for run in range(2):
+            hosts = build_hosts(run)
+            start = time.perf_counter()
+            export_fleet(hosts, path, snapshot='s{}'.format(run))
+            print('{:<30} {:>10.1f} ms'.format(
+                'export snapshot', (time.perf_counter() - start) * 1000))
+        for label, diff in (
+                ('diff all rows', lambda: naive_diff(path, 's0', 's1')),
+                ('diff record hashes', lambda: diff_snapshots(path))):
+            start = time.perf_counter()
+            changes = diff()
+            print('{:<30} {:>10.1f} ms, {} changes'.format(
+                label, (time.perf_counter() - start) * 1000, len(changes)))
+
+
+if __name__ == '__main__':
+    main()
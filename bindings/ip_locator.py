@@ -0,0 +1,123 @@
+from nornir import InitNornir
+from nornir.core.task import Result
+from utils.nornir_utils import nornir_set_credentials
+from utils.result_sink import streaming, TextSink
+from utils.metrics import timed_task
+from utils.mac_index import MacIndex, require_numpy
+from utils.ip_index import IPIndex, parse_ip_address
+from operations import check_mac_table, check_interfaces
+from drivers import get_host_driver
+
+# binding metadata, read by utils.binding_registry without importing module
+DESCRIPTION = 'Locate switch ports IP address is behind by ARP/ND tables'
+# parameters user is prompted for, with prompt texts
+PARAMETERS = {'ip_address': 'Enter IPv4 or IPv6 address'}
+PLATFORMS = ('nxos', 'huawei_vrpv8')
+
+
+@timed_task
+def collect_tables(task):
+    '''Nornir task that grabs full ARP/ND and MAC tables of a switch into
+    host data.
+    Arguments:
+        * task - instance of nornir.core.task.Task
+    Returns:
+        * instance of nornir.core.task.Result
+    '''
+    get_host_driver(task.host)
+    neighbors = task.run(task=check_interfaces.get_ip_neighbors,
+                         name='Get full ARP and ND tables')
+    macs = task.run(task=check_mac_table.get_mac_table,
+                    name='Get full MAC table')
+    return Result(task.host, result='{}; {}'.format(
+        neighbors[0].result, macs[0].result))
+
+
+def format_location(location):
+    '''Format IP index location with switch ports behind it.'''
+    lines = ['\t{} ({}) resolved on {} interface {}, VRF {}'.format(
+        location.address, location.mac, location.host, location.interface,
+        location.vrf)]
+    lines.extend('\t\tlearned on {} port {}, VLAN {}'.format(*x[1:])
+                 for x in location.ports)
+    return '\n'.join(lines)
+
+
+def locations_by_host(locations):
+    '''Group IP index locations by hosts they are resolved on or learned on
+    ports of.
+    Arguments:
+        * locations - list of utils.ip_index.IPLocation
+    Returns:
+        * dictionary with host names as keys and lists of locations as values
+    '''
+    grouped = {}
+    for location in locations:
+        for hostname in dict.fromkeys([location.host] + [
+                x[1] for x in location.ports]):
+            grouped.setdefault(hostname, []).append(location)
+    return grouped
+
+
+@timed_task
+def report_ip_locations(task, ip_address, located):
+    '''Nornir task that reports interfaces of a switch IP address is
+    resolved on and switch ports its MAC address is learned on.
+    Arguments:
+        * task - instance of nornir.core.task.Task
+        * ip_address - IP address
+        * located - dictionary with host names as keys and lists of
+            utils.ip_index.IPLocation as values
+    Returns:
+        * instance of nornir.core.task.Result
+    '''
+    locations = located.get(task.host.name)
+    if locations:
+        result = '{} found in ARP/ND or MAC tables:\n{}'.format(
+            ip_address, '\n'.join(format_location(x) for x in locations))
+    else:
+        result = '{} not found in ARP/ND or MAC tables'.format(ip_address)
+    return Result(task.host, result=result)
+
+
+def execute(nornir, ip_address=None):
+    '''Execute this binding. ARP/ND and MAC tables of all hosts are indexed
+    together, then every host reports where IP address is resolved and
+    switch ports its MAC address is learned on, if it is resolved on host or
+    learned on its port.
+    Arguments:
+        * nornir - instnace of nornir.core.Nornir
+        * ip_address (defaults to None) - IP address to locate; prompted if
+            None
+    Returns:
+        * instance of nornir.core.task.AggregatedResult with reports of
+            hosts and collection results of hosts failed
+    '''
+    # fail before tables are collected from every host
+    require_numpy()
+    if ip_address is None:
+        ip_address = input(PARAMETERS['ip_address'] + ' > ')
+    parse_ip_address(ip_address)
+    result = nornir.run(task=collect_tables)
+    hosts = [y for x, y in nornir.inventory.hosts.items()
+             if x not in result.failed_hosts]
+    locations = IPIndex.from_hosts(hosts).locate(
+        ip_address, MacIndex.from_hosts(hosts))
+    # host tables are indexed now, don't keep them twice
+    for host in hosts:
+        host.data.pop('ip_neighbors', None)
+        host.data.pop('mac_table', None)
+    # failed hosts are skipped by Nornir, their results are kept
+    report = nornir.run(task=report_ip_locations, ip_address=ip_address,
+                        located=locations_by_host(locations))
+    for hostname in result.failed_hosts:
+        report[hostname] = result[hostname]
+    return report
+
+
+if __name__ == '__main__':
+    # grab hosts from inventory, collect tables printing out only topmost
+    # (umbrella operation) results as soon as every host is done
+    nrnr = streaming(InitNornir(config_file='config.yml'), TextSink())
+    nornir_set_credentials(nrnr)
+    execute(nrnr)
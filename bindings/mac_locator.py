@@ -0,0 +1,139 @@
+from nornir import InitNornir
+from nornir.core.task import Result
+from utils.nornir_utils import nornir_set_credentials
+from utils.result_sink import streaming, TextSink
+from utils.metrics import timed_task
+from utils.mac_index import (MacIndex, parse_mac_prefix, require_numpy,
+                             MAC_BITS)
+from operations import check_mac_table
+from drivers import get_host_driver
+
+# binding metadata, read by utils.binding_registry without importing module
+DESCRIPTION = 'Locate switch ports MAC address or OUI is learned on'
+# parameters user is prompted for, with prompt texts
+PARAMETERS = {'mac_address': 'Enter MAC address or its prefix (like OUI)'}
+PLATFORMS = ('nxos', 'huawei_vrpv8')
+
+
+@timed_task
+def collect_mac_table(task):
+    '''Nornir task that grabs full MAC table of a switch into host data.
+    Arguments:
+        * task - instance of nornir.core.task.Task
+    Returns:
+        * instance of nornir.core.task.Result
+    '''
+    get_host_driver(task.host)
+    result = task.run(task=check_mac_table.get_mac_table,
+                      name='Get full MAC table')
+    return Result(task.host, result=result[0].result)
+
+
+def is_edge_port(hosts):
+    '''Make function telling if port is an edge one. Ports listed in
+    'uplinks' host data (like LAGs to spines or vPC peer-link) are not.
+    Arguments:
+        * hosts - dictionary with host names as keys and
+            nornir.core.inventory.Host as values
+    Returns:
+        * function receiving host name and port name
+    '''
+    uplinks = {x: set(y.get('uplinks') or []) for x, y in hosts.items()}
+    return lambda hostname, port: port not in uplinks[hostname]
+
+
+def format_entries(entries):
+    '''Format MAC index entries, one per line.'''
+    return '\n'.join('\t{} on {} port {}, VLAN {}'.format(*x)
+                     for x in entries)
+
+
+def entries_by_host(entries):
+    '''Group MAC index entries by host name.
+    Arguments:
+        * entries - list of (MAC address, host name, port name, VLAN number)
+            tuples
+    Returns:
+        * dictionary with host names as keys and lists of entries as values
+    '''
+    grouped = {}
+    for entry in entries:
+        grouped.setdefault(entry[1], []).append(entry)
+    return grouped
+
+
+@timed_task
+def report_mac_locations(task, mac_address, located, shared):
+    '''Nornir task that reports ports of a switch MAC address (or addresses
+    with prefix) is learned on, and MACs it shares with edge ports of any
+    switch.
+    Arguments:
+        * task - instance of nornir.core.task.Task
+        * mac_address - MAC address or its prefix
+        * located - dictionary with host names as keys and lists of MAC
+            index entries of located addresses as values
+        * shared - dictionary with host names as keys and lists of entries
+            lists of MACs learned on more than one edge port as values
+    Returns:
+        * instance of nornir.core.task.Result
+    '''
+    entries = located.get(task.host.name)
+    if entries:
+        result = '{} found in MAC table:\n{}'.format(
+            mac_address, format_entries(entries))
+    else:
+        result = '{} not found in MAC table'.format(mac_address)
+    shared_entries = shared.get(task.host.name)
+    if shared_entries:
+        result += '\n{} MAC addresses learned on more than one edge ' \
+            'port:\n{}'.format(len(shared_entries), '\n'.join(
+                format_entries(x) for x in shared_entries))
+    return Result(task.host, result=result)
+
+
+def execute(nornir, mac_address=None):
+    '''Execute this binding. MAC tables of all hosts are indexed together,
+    then every host reports locations of MAC address (or addresses with
+    prefix) and MACs learned on more than one edge port, it has learned.
+    Arguments:
+        * nornir - instnace of nornir.core.Nornir
+        * mac_address (defaults to None) - MAC address or its prefix to
+            locate; prompted if None
+    Returns:
+        * instance of nornir.core.task.AggregatedResult with reports of
+            hosts and collection results of hosts failed
+    '''
+    # fail before MAC tables are collected from every host
+    require_numpy()
+    if mac_address is None:
+        mac_address = input(PARAMETERS['mac_address'] + ' > ')
+    _, bits = parse_mac_prefix(mac_address)
+    result = nornir.run(task=collect_mac_table)
+    hosts = {x: y for x, y in nornir.inventory.hosts.items()
+             if x not in result.failed_hosts}
+    index = MacIndex.from_hosts(hosts.values())
+    if bits == MAC_BITS:
+        entries = index.locate(mac_address)
+    else:
+        entries = index.locate_prefix(mac_address)
+    shared = {}
+    for shared_entries in index.shared_macs(is_edge_port(hosts)).values():
+        for hostname in entries_by_host(shared_entries):
+            shared.setdefault(hostname, []).append(shared_entries)
+    # host MAC tables are indexed now, don't keep them twice
+    for host in hosts.values():
+        host.data.pop('mac_table', None)
+    # failed hosts are skipped by Nornir, their results are kept
+    report = nornir.run(task=report_mac_locations, mac_address=mac_address,
+                        located=entries_by_host(entries), shared=shared)
+    for hostname in result.failed_hosts:
+        report[hostname] = result[hostname]
+    return report
+
+
+if __name__ == '__main__':
+    # grab hosts from inventory, collect MAC tables printing out only topmost
+    # (umbrella operation) results as soon as every host is done
+    nrnr = streaming(InitNornir(config_file='config.yml'), TextSink())
+    nornir_set_credentials(nrnr)
+    execute(nrnr)
@@ -1,12 +1,19 @@
-import json
 from nornir import InitNornir
 from nornir.core.task import Result
-from nornir.plugins.functions.text import print_result
 from utils.nornir_utils import nornir_set_credentials
+from utils.result_sink import streaming, TextSink
+from utils.metrics import timed_task
 from operations import check_interfaces, check_mac_table
-from app_exception import UnsupportedNOS
+from drivers import get_host_driver
 
+# binding metadata, read by utils.binding_registry without importing module
+DESCRIPTION = 'Gather state and characteristics of switch interfaces'
+# parameters user is prompted for, with prompt texts
+PARAMETERS = {'interface_names': 'Enter interface names'}
+PLATFORMS = ('nxos', 'huawei_vrpv8')
 
+
+@timed_task
 def check_switch_interfaces(task, interface_names):
     '''Nornir task that execute different subtasks to get an high level
     overview of interfaces state and characteristics on switch. This binding
@@ -18,15 +25,8 @@ def check_switch_interfaces(task, interface_names):
     Returns:
         * instance of nornir.core.task.Result
     '''
-    with open('operations/vendor_vars.json', 'r', encoding='utf-8') as jsonf:
-        vendor_vars = json.load(jsonf)
-    if task.host.platform == 'nxos':
-        task.host['vendor_vars'] = vendor_vars['Cisco Nexus']
-    elif task.host.platform == 'huawei_vrpv8':
-        task.host['vendor_vars'] = vendor_vars['Huawei CE']
-    else:
-        raise UnsupportedNOS('{} is unsupported or bogus'.format(
-            task.host.platform))
+    # fail early on unsupported platforms, before any subtask is run
+    get_host_driver(task.host)
     task.run(task=check_interfaces.sanitize_interface_list,
              name='Check provided interface names to be valid',
              interface_list=interface_names)
@@ -102,24 +102,25 @@ def check_switch_interfaces(task, interface_names):
     return Result(task.host, result=result)
 
 
-def execute(nornir):
+def execute(nornir, interface_names=None):
     '''Execute this binding.
     Arguments:
         * nornir - instnace of nornir.core.Nornir
+        * interface_names (defaults to None) - names of interfaces to check
+            for; prompted if None
     Returns:
         * instance of nornir.core.task.Result
     '''
-    interface_names = input('Enter interface names > ')
+    if interface_names is None:
+        interface_names = input(PARAMETERS['interface_names'] + ' > ')
     return nornir.run(task=check_switch_interfaces,
                       interface_names=interface_names)
 
 
 if __name__ == '__main__':
     # grab one host from inventory, execute operations and print out only
-    # topmost (umbrella operation) results
+    # topmost (umbrella operation) results as soon as host is done
     nrnr = InitNornir(config_file='config.yml')
-    nrnr = nrnr.filter(name='test-host')
+    nrnr = streaming(nrnr.filter(name='test-host'), TextSink())
     nornir_set_credentials(nrnr)
-    result = execute(nrnr)
-    for host in result:
-        print_result(result[host][0])
+    execute(nrnr)
@@ -1,74 +1,57 @@
-import json
 from nornir import InitNornir
 from nornir.core.task import Result
-from nornir.plugins.functions.text import print_result
 from utils.nornir_utils import nornir_set_credentials
+from utils.result_sink import streaming, TextSink
+from utils.metrics import timed_task
+from utils.async_engine import AsyncEngine
 from operations import check_vrf_status, check_interfaces, check_mac_table
-from app_exception import UnsupportedNOS
+from drivers import get_host_driver
 
+# binding metadata, read by utils.binding_registry without importing module
+DESCRIPTION = 'Check VRF operational state on a ToR switch'
+# parameters user is prompted for, with prompt texts
+PARAMETERS = {'vrf_name': "Enter VRF name ('all' to check every VRF)"}
+PLATFORMS = ('nxos', 'huawei_vrpv8')
+# VRF name to check all VRFs at once
+ALL_VRFS = 'all'
 
-def check_vrf(task, vrf_name):
-    '''Nornir task that execute different subtasks to get an high level
-    overview of VRF operational state on a ToR switch. Criterias for final
-    rating are opinionated. In theory task may run well on other types of
-    switches.
+
+def rate_vrf(interfaces, bgp_neighbors):
+    '''Summarize VRF operational state and rate it. Criterias for rating are
+    opinionated.
     Arguments:
-        * task - instance of nornir.core.task.Task
-        * vrf_name - name of VRF to check for
+        * interfaces - iterable of utils.switch_objects.SwitchInterface bound
+            to VRF, with status, IP addresses, IP neighbors and MACs learned
+            filled by operations
+        * bgp_neighbors - dictionary with utils.switch_objects.BGPNeighbor of
+            VRF as values
     Returns:
-        * instance of nornir.core.task.Result
+        * string with summary lines, ending with overall status
     '''
-    with open('operations/vendor_vars.json', 'r', encoding='utf-8') as jsonf:
-        vendor_vars = json.load(jsonf)
-    if task.host.platform == 'nxos':
-        task.host['vendor_vars'] = vendor_vars['Cisco Nexus']
-        nos_name = 'Cisco NX-OS'
-    elif task.host.platform == 'huawei_vrpv8':
-        task.host['vendor_vars'] = vendor_vars['Huawei CE']
-        nos_name = 'Huawei VRPv8'
-    else:
-        raise UnsupportedNOS('{} is unsupported or bogus'.format(
-            task.host.platform))
-    task.host['vrf_name'] = vrf_name
-    task.run(task=check_vrf_status.find_vrf,
-             name='Check if VRF exists on node')
-    task.run(task=check_vrf_status.get_vrf_interfaces,
-             name='Get VRF interfaces list')
-    task.run(task=check_interfaces.check_interfaces_status,
-             name='Check interfaces status for VRF')
-    task.run(task=check_interfaces.get_interfaces_ip_addresses,
-             name='Gather IP addresses for interfaces in VRF')
-    task.run(task=check_interfaces.get_interfaces_ip_neighbors,
-             name='Gather IP neighbors for interfaces in VRF')
-    task.run(task=check_mac_table.get_interfaces_macs,
-             name='Gather learned MAC for interfaces in VRF')
-    task.run(task=check_vrf_status.check_vrf_bgp_neighbors,
-             name='Get BGP neighbors in VRF and they state')
-    result = 'Host {} running {}, VRF {} status:\n'.format(
-            task.host.name, nos_name, task.host['vrf_name'])
-    oper_up_interfaces = [x for x in task.host[
-        'interfaces'] if x.oper_status == 'up']
+    interfaces = list(interfaces)
+    result = ''
+    oper_up_interfaces = [x for x in interfaces if x.oper_status == 'up']
     result += '\t{} interfaces in VRF, {} of them operationally up\n'.format(
-            len(task.host['interfaces']), len(oper_up_interfaces))
+            len(interfaces), len(oper_up_interfaces))
     ipv4_addresses = []
     ipv6_addresses = []
-    for interface in task.host['interfaces']:
+    for interface in interfaces:
         ipv4_addresses.extend(interface.ipv4_addresses)
         ipv6_addresses.extend([x for x in interface.ipv6_addresses
                               if not x.address.is_link_local])
     result += '\t{}/{} v4/v6 addresses present (except link-locals)\n'.format(
             len(ipv4_addresses), len(ipv6_addresses))
-    v4_neighbors = sum([x.ipv4_neighbors for x in task.host['interfaces']])
-    v6_neighbors = sum([x.ipv6_neighbors for x in task.host['interfaces']])
+    v4_neighbors = sum([x.ipv4_neighbors for x in interfaces])
+    v6_neighbors = sum([x.ipv6_neighbors for x in interfaces])
     result += '\t{}/{} v4/v6 neighbors learned on interfaces\n'.format(
             v4_neighbors, v6_neighbors)
-    learned_macs = sum([x.macs_learned for x in task.host['interfaces']])
+    learned_macs = sum([x.macs_learned for x in interfaces])
     result += '\t{} MAC addresses learned in VRF VLANs\n'.format(learned_macs)
-    num_neighbors = len(task.host['bgp_neighbors'])
-    established_neighbors = len([x for x in task.host[
-        'bgp_neighbors'].values() if x.state == 'established'])
+    num_neighbors = len(bgp_neighbors)
+    established_neighbors = len([x for x in bgp_neighbors.values()
+                                 if x.state == 'established'])
     neighbors_with_prefixes = []
-    for neighbor in task.host['bgp_neighbors'].values():
+    for neighbor in bgp_neighbors.values():
         if neighbor.af['ipv4'] and neighbor.af['ipv4'].learned_routes:
             neighbors_with_prefixes.append(neighbor)
             continue
@@ -90,30 +73,116 @@ def check_vrf(task, vrf_name):
         overall_status = 'No IP address configured in VRF'
     elif not oper_up_interfaces:
         overall_status = 'All interfaces down'
-    elif not task.host['interfaces']:
+    elif not interfaces:
         overall_status = 'No interfaces configured'
     else:
         overall_status = 'VRF looks good!'
     result += overall_status
+    return result
+
+
+@timed_task
+def check_vrf(task, vrf_name):
+    '''Nornir task that execute different subtasks to get an high level
+    overview of VRF operational state on a ToR switch. Criterias for final
+    rating are opinionated. In theory task may run well on other types of
+    switches.
+    Arguments:
+        * task - instance of nornir.core.task.Task
+        * vrf_name - name of VRF to check for
+    Returns:
+        * instance of nornir.core.task.Result
+    '''
+    nos_name = get_host_driver(task.host).nos_name
+    task.host['vrf_name'] = vrf_name
+    task.run(task=check_vrf_status.find_vrf,
+             name='Check if VRF exists on node')
+    task.run(task=check_vrf_status.get_vrf_interfaces,
+             name='Get VRF interfaces list')
+    task.run(task=check_interfaces.check_interfaces_status,
+             name='Check interfaces status for VRF')
+    task.run(task=check_interfaces.get_interfaces_ip_addresses,
+             name='Gather IP addresses for interfaces in VRF')
+    task.run(task=check_interfaces.get_interfaces_ip_neighbors,
+             name='Gather IP neighbors for interfaces in VRF')
+    task.run(task=check_mac_table.get_interfaces_macs,
+             name='Gather learned MAC for interfaces in VRF')
+    task.run(task=check_vrf_status.check_vrf_bgp_neighbors,
+             name='Get BGP neighbors in VRF and they state')
+    result = 'Host {} running {}, VRF {} status:\n'.format(
+            task.host.name, nos_name, task.host['vrf_name'])
+    result += rate_vrf(task.host['interfaces'], task.host['bgp_neighbors'])
+    return Result(task.host, result=result)
+
+
+@timed_task
+def check_all_vrfs(task):
+    '''Nornir task to get an high level overview of operational state of
+    every VRF on a ToR switch, rated like check_vrf does for single one.
+    Interfaces, IP addresses, ARP/ND and MAC tables and BGP neighbors of all
+    VRFs are grabbed once in bulk and partitioned by VRF in memory, so number
+    of commands sent doesn't grow with number of VRFs.
+    Arguments:
+        * task - instance of nornir.core.task.Task
+    Returns:
+        * instance of nornir.core.task.Result
+    '''
+    nos_name = get_host_driver(task.host).nos_name
+    # tables are grabbed for all VRFs, not for single one
+    task.host['vrf_name'] = None
+    task.run(task=check_vrf_status.find_vrfs,
+             name='Get VRFs configured on node')
+    task.run(task=check_vrf_status.get_all_vrf_interfaces,
+             name='Get interfaces of all VRFs')
+    task.run(task=check_interfaces.check_interfaces_status,
+             name='Check interfaces status for all VRFs')
+    task.run(task=check_interfaces.get_interfaces_ip_addresses, bulk=True,
+             name='Gather IP addresses for interfaces in all VRFs')
+    task.run(task=check_interfaces.get_interfaces_ip_neighbors, bulk=True,
+             name='Gather IP neighbors for interfaces in all VRFs')
+    task.run(task=check_mac_table.get_interfaces_macs, bulk=True,
+             name='Gather learned MAC for interfaces in all VRFs')
+    task.run(task=check_vrf_status.check_all_vrfs_bgp_neighbors,
+             name='Get BGP neighbors in all VRFs and they state')
+    result = 'Host {} running {}, status of {} VRFs:\n'.format(
+            task.host.name, nos_name, len(task.host['vrf_names']))
+    result += '\n'.join('VRF {} status:\n{}'.format(x, rate_vrf(
+        task.host['vrf_interfaces'][x], task.host['vrf_bgp_neighbors'][x]))
+        for x in task.host['vrf_names'])
     return Result(task.host, result=result)
 
 
-def execute(nornir):
+def execute(nornir, vrf_name=None, engine=None):
     '''Execute this binding.
     Arguments:
         * nornir - instnace of nornir.core.Nornir
+        * vrf_name (defaults to None) - name of VRF to check for, or
+            ALL_VRFS to check every VRF; prompted if None
+        * engine (defaults to None) - instance of
+            utils.async_engine.AsyncEngine to run binding on all hosts at once;
+            if None, Nornir thread pool is used
     Returns:
         * instance of nornir.core.task.Result
     '''
-    vrf_name = input('Enter VRF name > ')
-    return nornir.run(task=check_vrf, vrf_name=vrf_name)
+    if vrf_name is None:
+        vrf_name = input(PARAMETERS['vrf_name'] + ' > ')
+    if vrf_name == ALL_VRFS:
+        task, kwargs = check_all_vrfs, {}
+    else:
+        task, kwargs = check_vrf, {'vrf_name': vrf_name}
+    if engine is None:
+        return nornir.run(task=task, **kwargs)
+    return engine.run(nornir, task, **kwargs)
 
 
 if __name__ == '__main__':
     # grab hosts from inventory, execute operations and print out only topmost
-    # (umbrella operation) results
-    nrnr = InitNornir(config_file='config.yml')
+    # (umbrella operation) results as soon as every host is done; hosts are
+    # run all at once by asyncio engine only if 'async_engine' is set in
+    # user_defined section of config, netmiko is used otherwise
+    nrnr = streaming(InitNornir(config_file='config.yml'), TextSink())
     nornir_set_credentials(nrnr)
-    result = execute(nrnr)
-    for host in result:
-        print_result(result[host][0])
+    engine = None
+    if nrnr.config.user_defined.get('async_engine'):
+        engine = AsyncEngine()
+    execute(nrnr, engine=engine)
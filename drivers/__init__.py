@@ -0,0 +1,54 @@
+from app_exception import UnsupportedNOS
+from drivers.nxos import NXOSDriver, NXOSJSONDriver
+from drivers.huawei_vrpv8 import VRPv8Driver
+
+DRIVERS = {}
+
+
+def register_driver(driver_class):
+    '''Register NOS driver for its Nornir platform name and output format.
+    Can be used as class decorator for drivers defined outside of this
+    package.
+    Arguments:
+        * driver_class - subclass of drivers.base.BaseDriver
+    Returns:
+        * driver_class unchanged
+    '''
+    DRIVERS[(driver_class.platform,
+             driver_class.output_format)] = driver_class()
+    return driver_class
+
+
+def get_driver(platform, output_format='text'):
+    '''Grab driver instance for Nornir platform name.
+    Arguments:
+        * platform - Nornir platform name, like 'nxos'
+        * output_format (defaults to 'text') - format of outputs driver must
+            request and decode, like 'json'
+    Returns:
+        * instance of drivers.base.BaseDriver subclass
+    '''
+    try:
+        return DRIVERS[(platform, output_format)]
+    except KeyError:
+        if output_format == 'text':
+            raise UnsupportedNOS('task received unsupported NOS - {}'.format(
+                platform))
+        raise UnsupportedNOS('{} output is not supported for NOS - {}'.format(
+            output_format, platform))
+
+
+def get_host_driver(host):
+    '''Grab driver instance for Nornir host. Output format is selected with
+    host['output_format'] and defaults to 'text'.
+    Arguments:
+        * host - instance of nornir.core.inventory.Host
+    Returns:
+        * instance of drivers.base.BaseDriver subclass
+    '''
+    return get_driver(host.platform, host.get('output_format', 'text'))
+
+
+register_driver(NXOSDriver)
+register_driver(NXOSJSONDriver)
+register_driver(VRPv8Driver)
@@ -0,0 +1,333 @@
+import os.path
+import re
+import json
+from functools import lru_cache
+from utils.metrics import timed_parser
+
+VENDOR_VARS_FILE = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'operations', 'vendor_vars.json')
+MAC_ADDRESS = re.compile(r'^[a-f0-9]{4}(.|-)[a-f0-9]{4}(.|-)[a-f0-9]{4}$')
+BGP_SESSION_TYPES = {'ebgp': 'external', 'ibgp': 'internal'}
+
+
+@lru_cache(maxsize=None)
+def load_vendor_vars(file_name=VENDOR_VARS_FILE):
+    '''Read JSON file with CLI commands for every supported NOS. File is read
+    only once per process.
+    Arguments:
+        * file_name (defaults to VENDOR_VARS_FILE) - path to JSON file
+    Returns:
+        * dictionary with NOS names as keys and dictionaries of commands as
+            values
+    '''
+    with open(file_name, 'r', encoding='utf-8') as jsonf:
+        return json.load(jsonf)
+
+
+def iter_lines(output):
+    '''Lazily iterate over lines of CLI output without splitting it into
+    list first, which matters for large outputs like full ARP or MAC tables.
+    Arguments:
+        * output - CLI output
+    Yields:
+        * output lines without newline characters
+    '''
+    start = 0
+    while start < len(output):
+        end = output.find('\n', start)
+        if end == -1:
+            end = len(output)
+        yield output[start:end].rstrip('\r')
+        start = end + 1
+
+
+def as_lines(output):
+    '''Iterate over lines of CLI output given either as string or as iterable
+    of lines, like file object or streaming reader, so parsers consuming
+    lines one by one don't need whole output in memory.
+    Arguments:
+        * output - CLI output string or iterable of lines
+    Yields:
+        * output lines without newline characters
+    '''
+    if isinstance(output, str):
+        yield from iter_lines(output)
+        return
+    for line in output:
+        yield line.rstrip('\r\n')
+
+
+def new_bgp_neighbor(address):
+    '''Make dictionary with BGP neighbor parameters filled in with defaults,
+    for parsers to update as lines are consumed.
+    Arguments:
+        * address - neighbor address string
+    Returns:
+        * dictionary with neighbor parameters
+    '''
+    return {'address': address, 'vrf': None, 'state': None,
+            'as_number': None, 'router_id': None, 'type': None,
+            'learned_routes': 0, 'sent_routes': 0}
+
+
+@lru_cache(maxsize=None)
+def scan_regexp(regex):
+    '''Compile regular expression to find lines matching line pattern in
+    output string: pattern is prefixed with newline, so regular expression
+    engine skips to line starts instead of trying pattern at every position.
+    Arguments:
+        * regex - compiled regular expression matching single line
+    Returns:
+        * compiled regular expression
+    '''
+    return re.compile('\n(?:{})'.format(regex.pattern), regex.flags)
+
+
+class LineScanner:
+    '''Iterates over output lines matching line pattern, consuming output in
+    a single pass: output string is scanned with regular expression, while
+    iterable of lines (like streaming reader) is matched line by line.
+    Scanner can be told to skip lines up to the one starting with some text,
+    which is found in string output without trying pattern on every line.
+    Attributes:
+        * regex - compiled regular expression matching line from its start;
+            used in __init__
+        * output - CLI output string or iterable of lines; used in __init__
+        * skip_prefixes - tuple of texts line to stop skipping on starts
+            with, or None
+    '''
+    def __init__(self, regex, output):
+        self.regex = regex
+        self.output = output
+        self.skip_prefixes = None
+        # where prefixes were found last time in string output
+        self._found = {}
+
+    def skip_to(self, prefixes):
+        '''Skip lines up to the one starting with any of prefixes.'''
+        self.skip_prefixes = prefixes
+
+    def _iter_lines(self):
+        for line in as_lines(self.output):
+            if self.skip_prefixes is not None:
+                if not line.startswith(self.skip_prefixes):
+                    continue
+                self.skip_prefixes = None
+            match = self.regex.match(line)
+            if match:
+                yield match
+
+    def _find_prefix(self, position):
+        '''Find closest line starting with any of skip prefixes after
+        position in string output. Found positions are remembered, so output
+        is searched for every prefix only once.'''
+        closest = -1
+        for prefix in self.skip_prefixes:
+            found = self._found.get(prefix)
+            if found is None or -1 < found < position:
+                found = self.output.find('\n' + prefix, position)
+                self._found[prefix] = found
+            if found != -1 and (closest == -1 or found < closest):
+                closest = found
+        return closest
+
+    def _iter_string(self):
+        output = self.output
+        scan = scan_regexp(self.regex)
+        match = self.regex.match(output) or scan.search(output)
+        while match:
+            yield match
+            position = match.end()
+            if self.skip_prefixes is not None:
+                position = self._find_prefix(position)
+                self.skip_prefixes = None
+                if position == -1:
+                    return
+            match = scan.search(output, position)
+
+    def __iter__(self):
+        if isinstance(self.output, str):
+            return self._iter_string()
+        return self._iter_lines()
+
+
+def parse_bgp_neighbor_lines(regex, headers, output, af_name=None):
+    '''Parse BGP neighbors detailed output in a single pass, as a state
+    machine driven by matched lines. Regular expression is alternation of
+    line patterns, each wrapped into outer named group (token) with values
+    in groups following it: neighbor (address, VRF, AS number, session type;
+    VRF and type are optional), vrf (VRF name for neighbors listed below
+    it), link (session type), router_id, state, af (address family name),
+    learned and sent (number of routes). Number of sent routes is the last
+    parameter listed, so rest of neighbor lines is skipped after it.
+    Arguments:
+        * regex - compiled regular expression
+        * headers - tuple of texts neighbor and VRF header lines start with
+        * output - CLI output string or iterable of lines
+        * af_name (defaults to None) - either 'v4' or 'v6' to count routes
+            only in address family section for 'IPv4 Unicast' or
+            'IPv6 Unicast'; if None, output has no such sections
+    Yields:
+        * dictionaries with neighbor parameters
+    '''
+    af_header = 'IP{} Unicast'.format(af_name)
+    lines = LineScanner(regex, output)
+    neighbor = None
+    vrf_name = None
+    counting = af_name is None
+    for match in lines:
+        token = match.lastgroup
+        # lastindex is token group index, values are in groups after it
+        value = match.group(match.lastindex + 1)
+        if token == 'neighbor':
+            if neighbor is not None:
+                yield neighbor
+            neighbor = new_bgp_neighbor(value)
+            neighbor['vrf'] = match.group(match.lastindex + 2) or vrf_name
+            neighbor['as_number'] = match.group(match.lastindex + 3)
+            link = match.group(match.lastindex + 4)
+            if link:
+                neighbor['type'] = BGP_SESSION_TYPES.get(link.lower())
+            counting = af_name is None
+        elif token == 'vrf':
+            vrf_name = value
+        elif neighbor is None:
+            continue
+        elif token == 'link':
+            neighbor['type'] = BGP_SESSION_TYPES.get(value.lower())
+        elif token == 'af':
+            counting = value == af_header
+        elif token == 'learned' or token == 'sent':
+            if counting:
+                neighbor[token + '_routes'] = int(value)
+                if token == 'sent':
+                    lines.skip_to(headers)
+        elif token == 'state':
+            neighbor['state'] = value.lower()
+        else:
+            neighbor[token] = value
+    if neighbor is not None:
+        yield neighbor
+
+
+def iter_blocks(regex, output):
+    '''Split output into blocks, each starting with line matching regular
+    expression, like per interface blocks of 'show ip interface' output for
+    all interfaces. Text before the first block is dropped.
+    Arguments:
+        * regex - compiled regular expression with re.M flag, matching block
+            first line with block name in the first group
+        * output - CLI output
+    Yields:
+        * tuples of (block name, block text)
+    '''
+    matches = list(regex.finditer(output))
+    for match, next_match in zip(matches, matches[1:] + [None]):
+        end = next_match.start() if next_match is not None else len(output)
+        yield match.group(1), output[match.start():end]
+
+
+def cisco_compact_name(int_name):
+    '''Convert Cisco full interface name into abbreviated form used, for
+    example, in 'show interface brief' output
+    Arguments:
+        * int_name - full interface name
+    Returns:
+        * abbreviated interface name
+    '''
+    if 'Ethernet' in int_name:
+        return 'Eth'+int_name[8:]
+    elif 'port-channel' in int_name:
+        return 'Po'+int_name[12:]
+    else:
+        return int_name
+
+
+def convert_mac_address(mac_address):
+    '''Convert Cisco and Huawei notation MAC addresses into standard(?)
+    representation with colons. Plus lowering case.
+    Arguments:
+        * mac_address - MAC address in Cisco or Huawei notation
+    Returns:
+        * MAC address in standard notation
+    '''
+    mac_address = mac_address.lower()
+    if not MAC_ADDRESS.match(mac_address):
+        raise ValueError('Unsupported or invalid MAC address format')
+    mac_address = (mac_address[:2] + ':' + mac_address[2:4] + ':' +
+                   mac_address[5:7] + ':' + mac_address[7:9] + ':' +
+                   mac_address[10:12] + ':' + mac_address[12:])
+    return mac_address
+
+
+def convert_load(load_in_bits_second):
+    '''Convert bits/second to gigabits/second. If result less that 0.001 (one
+    megabit per second) set it to that value.
+    Arguments:
+        * load_in_bits_second - string describing current load in bits/sec
+    Return:
+        float rounded to 3rd digit describing loag in gigabits/sec
+    '''
+    if load_in_bits_second == '0':
+        return float(load_in_bits_second)
+    result = round(float(load_in_bits_second)/1000000000, 3)
+    result = result if result >= 0.001 else 0.001
+    return result
+
+
+class BaseDriver:
+    '''Base class for NOS drivers. Driver owns CLI commands and precompiled
+    output parsers for a single Nornir platform, operations are calling
+    driver methods instead of branching on platform name. Subclasses must
+    implement parsing methods.
+    Attributes:
+        * platform - Nornir platform name driver is registered for
+        * nos_name - human readable NOS name
+        * vendor_vars_key - name of section with commands in vendor_vars.json
+        * output_format - 'text' for screen-scraping human readable output,
+            or name of structured format driver is decoding
+        * brief_lists_mode - True if interfaces brief output contains
+            interface mode (L2/L3)
+        * builtin_vrfs - names of VRFs NOS creates by itself, which are
+            skipped while checking all VRFs
+    '''
+    platform = None
+    nos_name = None
+    vendor_vars_key = None
+    output_format = 'text'
+    brief_lists_mode = False
+    builtin_vrfs = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # parse time of outputs is recorded if utils.metrics is enabled
+        for name, value in list(vars(cls).items()):
+            if name.startswith(('parse_', 'iter_')) and callable(value):
+                setattr(cls, name, timed_parser(value))
+
+    @property
+    def commands(self):
+        '''Dictionary of CLI command templates for NOS.'''
+        return load_vendor_vars()[self.vendor_vars_key]
+
+    def command(self, name, *args):
+        '''Render CLI command from template.
+        Arguments:
+            * name - command name, key in vendor_vars.json
+            * args - values to insert into template
+        Returns:
+            * string with command
+        '''
+        return self.commands[name].format(*args)
+
+    def mac_table_port_name(self, interface_name):
+        '''Convert interface name into form used in MAC address table.
+        Arguments:
+            * interface_name - full interface name
+        Returns:
+            * interface name as listed in MAC table
+        '''
+        return interface_name
+
+    def __str__(self):
+        return self.nos_name
@@ -0,0 +1,495 @@
+import re
+from functools import lru_cache
+from drivers.base import (BaseDriver, iter_lines, iter_blocks,
+                          parse_bgp_neighbor_lines, new_bgp_neighbor,
+                          convert_mac_address, convert_load,
+                          BGP_SESSION_TYPES)
+from utils.switch_objects import VlanSet
+
+IPV4_ADDRESS = re.compile(r'Internet Address is '
+                          r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+                          r'/(\d{1,2})( Sub)?')
+IPV6_LINK_LOCAL = re.compile(r'link-local address is ([0-9A-Fa-f:]+)')
+IPV6_ADDRESS = re.compile(
+        r'([0-9A-Fa-f:]+), subnet is [0-9A-Fa-f:]+/(\d{1,3})')
+NEIGHBORS_DYNAMIC = re.compile(r'Dynamic:(?:\s+)?(\d+)')
+ARP_LINE = re.compile(
+        r'^(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})\s+([0-9a-f]{4}-[0-9a-f]{4}-'
+        r'[0-9a-f]{4})\s+(?:\d+\s+)?([A-Z])\S*\s+(\S+)(?:\s+(\S+))?')
+ND_STATE = re.compile(r'State\s+:\s+(\S+)')
+ND_INTERFACE = re.compile(r'^Interface\s+:\s+(\S+)')
+ND_ADDRESS = re.compile(r'IPv6 Address\s+:\s+(\S+)')
+ND_LINK_LAYER = re.compile(r'^Link-layer\s+:\s+(\S+)')
+ND_VPN = re.compile(r'^VPN name\s+:\s+(\S+)')
+DESCRIPTION = re.compile(r'Description: (.+)\n')
+HARDWARE_ADDRESS = re.compile(r'Hardware address is ([a-z0-9-]+)\s')
+MTU = re.compile(r'Maximum (?:Transmit Unit|Frame Length) is (\d{4})')
+LAG_BANDWIDTH = re.compile(r'Current BW : (\d+)Gbps,')
+DUPLEX = re.compile(r'Duplex:\s+(FULL|HALF),')
+SPEED = re.compile(r'Speed:\s+(\d+),')
+INPUT_RATE = re.compile(r'input rate:? (\d+) bits/sec,')
+OUTPUT_RATE = re.compile(r'output rate:? (\d+) bits/sec,')
+# we need re.S because long VLAN list will be separated by newlines
+SWITCHPORT = re.compile(r'''
+(?:\d{1,3})?GE\d{1,2}/\d{1,2}/\d{1,2}(?::\d)?\s+# interface name
+(access|trunk)\s+# switchport type
+(\d{1,4})\s+# PVID
+((?:\d|--).*)# Allowed VLAN list
+''', re.X | re.S)
+INTERFACE_NUMBER_ZERO = re.compile(r'interface number\s*:\s*0', flags=re.I)
+DDM_SUPPORTED = re.compile(r'Digital Diagnostic Monitoring\s+:(YES|NO)')
+VENDOR_NAME = re.compile(r'Vendor Name\s+:(.+)')
+VENDOR_PART_NUMBER = re.compile(r'Vendor Part Number\s+:(.+)')
+TRANSCEIVER_TYPE = re.compile(r'Transceiver Type\s+:(.+)')
+RX_POWER = re.compile(r'Current RX Power \(dBm\)\s+:(-?\d{1,2}\.\d{1,2})')
+LANE_RX_POWER = re.compile(r'(-?\d{1,2}\.\d{1,2})')
+MAC_TOTAL = re.compile(r'Total items: (\d+)')
+MAC_LINE = re.compile(
+        r'^([0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4})\s+(\d{1,4})/\S*\s+(\S+)')
+INTERFACE_BLOCK = re.compile(r'^(\S+) current state :', flags=re.M)
+CONFIG_CHECKPOINT = re.compile(r'CommitId\s*:\s*(\S+)')
+# lines of BGP peers verbose output parser is interested in, see
+# drivers.base.parse_bgp_neighbor_lines
+# peer header line lists neither VRF nor session type, their groups are
+# left empty; peers of all VPN instances are listed under VPN-Instance lines
+BGP_NEIGHBOR_HEADERS = (' BGP Peer is ', ' VPN-Instance ')
+BGP_NEIGHBOR_LINES = re.compile(
+        r' (?:BGP (?:(?P<neighbor>Peer is ([^,]+),()\s+remote AS '
+        r'(\d+(?:\.\d+)?)())|'
+        r'(?P<router_id>version \d+, Remote router ID (\S+))|'
+        r'(?P<state>current state: (\w+)))|'
+        r'(?P<vrf>VPN-Instance ([^,]+), Router ID)|'
+        r'(?P<link>Type: (\w+) link)|'
+        r'(?P<learned>Received total routes: (\d+))|'
+        r'(?P<sent>Advertised total routes: (\d+)))')
+# peer and VPN instance header lines, string output is split into peer
+# blocks by; parameters are searched for at the top of every block
+BGP_PEER_HEADER = re.compile(
+        r'BGP Peer is ([^,]+),\s+remote AS (\d+(?:\.\d+)?)')
+BGP_VRF_HEADER = re.compile(r' VPN-Instance ([^,]+), Router ID')
+BGP_LINK = re.compile(r'Type: (\w+) link')
+BGP_ROUTER_ID = re.compile(r'Remote router ID (\S+)')
+BGP_STATE = re.compile(r'BGP current state: (\w+)')
+BGP_RECEIVED_ROUTES = re.compile(r'Received total routes: (\d+)')
+BGP_ADVERTISED_ROUTES = re.compile(r'Advertised total routes: (\d+)')
+
+
+@lru_cache(maxsize=None)
+def vrf_regexp(vrf_name):
+    '''Compile regular expression to find VPN instance in
+    'display ip vpn-instance' output.
+    Arguments:
+        * vrf_name - name of VRF
+    Returns:
+        * compiled regular expression
+    '''
+    return re.compile(r'\s{{2}}{}\s+\d+:'.format(re.escape(vrf_name)))
+
+
+class VRPv8Driver(BaseDriver):
+    '''Driver for Huawei VRPv8 (CE switches).'''
+    platform = 'huawei_vrpv8'
+    nos_name = 'Huawei VRPv8'
+    vendor_vars_key = 'Huawei CE'
+
+    def parse_interfaces_brief(self, output):
+        '''Parse 'display interface brief' output line by line.
+        Arguments:
+            * output - CLI output
+        Yields:
+            * tuples of (name as listed, full name, admin status, operational
+                status, mode, LAG name); mode is always None as output
+                doesn't contain it
+        '''
+        lag = None
+        for line in iter_lines(output):
+            columns = line.split()
+            # data lines are the only ones with digits in the first column
+            if not columns or not any(x.isdigit() for x in columns[0]):
+                continue
+            # LAG members are listed indented right after LAG itself
+            if line.startswith(' '):
+                member_of = lag
+            else:
+                member_of = None
+                lag = columns[0] if columns[0].startswith(
+                    'Eth-Trunk') and '.' not in columns[0] else None
+            # breakout interfaces are listed with speed, like 40GE1/0/1:1(10GE)
+            name = columns[0].split('(')[0]
+            if columns[1] == '*down':
+                admin_status, oper_status = 'down', 'down'
+            elif columns[1].startswith('up'):
+                admin_status, oper_status = 'up', 'up'
+            else:
+                admin_status, oper_status = 'up', 'down'
+            yield name, name, admin_status, oper_status, None, member_of
+
+    def parse_ipv4_addresses(self, output):
+        '''Grab IPv4 addresses out of 'display ip interface' output.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * list of tuples (address, prefix length, secondary flag)
+        '''
+        if 'Internet Address is' not in output:
+            return []
+        return IPV4_ADDRESS.findall(output)
+
+    def parse_ipv6_addresses(self, output):
+        '''Grab IPv6 addresses out of 'display ipv6 interface' output. There
+        is no primary IPv6 address concept for Huawei, unlike Cisco, so all
+        addresses are marked secondary.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * list of tuples (address, prefix length, secondary flag)
+        '''
+        if 'The IPv6 address does not exist' in output:
+            return []
+        addresses = [(IPV6_LINK_LOCAL.search(output).group(1), '64', True)]
+        for address in IPV6_ADDRESS.findall(output):
+            addresses.append((address[0], address[1], True))
+        return addresses
+
+    def count_interface_neighbors(self, output):
+        '''Grab number of dynamic IP neighbors out of ARP or ND table of
+        interface.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * number of neighbors
+        '''
+        return int(NEIGHBORS_DYNAMIC.search(output).group(1))
+
+    def iter_ip_neighbors(self, output, af):
+        '''Iterate over dynamic ARP or ND table entries.
+        Arguments:
+            * output - CLI output with full ARP or ND table
+            * af - either 'v4' or 'v6'
+        Yields:
+            * names of interfaces neighbors are learned on, one per neighbor
+        '''
+        if af == 'v4':
+            for line in iter_lines(output):
+                match = ARP_LINE.match(line)
+                if match and match.group(3) == 'D':
+                    yield match.group(4)
+            return
+        # ND table is printed as blocks of 'key : value' lines, where
+        # neighbor state precede interface name
+        state = None
+        for line in iter_lines(output):
+            state_match = ND_STATE.search(line)
+            if state_match:
+                state = state_match.group(1)
+            interface_match = ND_INTERFACE.match(line)
+            if interface_match and state != 'STATIC':
+                yield interface_match.group(1)
+
+    def iter_ip_neighbor_entries(self, output, af):
+        '''Iterate over dynamic ARP or ND table entries.
+        Arguments:
+            * output - CLI output with full ARP or ND table
+            * af - either 'v4' or 'v6'
+        Yields:
+            * tuples (IP address, MAC address as listed, interface name, VPN
+                instance name or None for public network)
+        '''
+        if af == 'v4':
+            for line in iter_lines(output):
+                match = ARP_LINE.match(line)
+                if match and match.group(3) == 'D':
+                    yield (match.group(1), match.group(2), match.group(4),
+                           match.group(5))
+            return
+        # ND table is printed as blocks of 'key : value' lines, starting with
+        # address line; VPN name line ends the block
+        entry = {}
+        for line in iter_lines(output):
+            address_match = ND_ADDRESS.search(line)
+            if address_match:
+                entry = {'address': address_match.group(1).lower()}
+                continue
+            for key, regex in (('mac', ND_LINK_LAYER), ('state', ND_STATE),
+                               ('interface', ND_INTERFACE)):
+                match = regex.search(line)
+                if match:
+                    entry[key] = match.group(1)
+            vpn_match = ND_VPN.match(line)
+            if vpn_match and entry.get('state') != 'STATIC' and \
+                    'interface' in entry:
+                vrf_name = vpn_match.group(1)
+                yield (entry['address'], entry['mac'], entry['interface'],
+                       None if vrf_name == '-' else vrf_name)
+                entry = {}
+
+    def parse_interface_mode(self, output):
+        '''Grab interface mode out of 'display interface' output.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * 'switched', 'routed' or None if mode can't be determined
+        '''
+        if 'Switch Port' in output:
+            return 'switched'
+        elif 'Route Port' in output:
+            return 'routed'
+        return None
+
+    def parse_interface_basics(self, output):
+        '''Grab description, MAC address and MTU out of 'display interface'.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * tuple (description, MAC address, MTU)
+        '''
+        descr = DESCRIPTION.search(output)
+        return (descr.group(1) if descr else None,
+                convert_mac_address(HARDWARE_ADDRESS.search(output).group(1)),
+                int(MTU.search(output).group(1)))
+
+    def parse_interface_rates(self, output, lag=False):
+        '''Grab speed, duplex and load out of 'display interface' output.
+        Arguments:
+            * output - CLI output
+            * lag (defaults to False) - True if interface is LAG
+        Returns:
+            * tuple (speed, duplex, load in, load out)
+        '''
+        if lag:
+            duplex = 'full'
+            speed = int(LAG_BANDWIDTH.search(output).group(1))
+        else:
+            duplex = DUPLEX.search(output).group(1).lower()
+            speed = int(SPEED.search(output).group(1))/1000
+        return (speed, duplex,
+                convert_load(INPUT_RATE.search(output).group(1)),
+                convert_load(OUTPUT_RATE.search(output).group(1)))
+
+    def parse_switchport(self, output):
+        '''Grab switching mode, PVID and VLAN list out of 'display port vlan'
+        output.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * tuple (mode, PVID, utils.switch_objects.VlanSet of allowed
+                VLANs) or None if interface is not switching
+        '''
+        # Huawei return nothing for non switched port
+        if not output:
+            return None
+        vlan_search = SWITCHPORT.search(output)
+        switch_mode = vlan_search.group(1)
+        pvid = int(vlan_search.group(2))
+        if switch_mode == 'access':
+            return switch_mode, pvid, VlanSet([pvid])
+        return switch_mode, pvid, VlanSet.from_string(vlan_search.group(3),
+                                                      separator=' ')
+
+    def parse_vrf_bindings(self, output):
+        '''Map interfaces to VRFs out of 'display ip vpn-instance interface'
+        output.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * dictionary with interface names as keys and VRF names as values
+        '''
+        vrf_bind_map = {}
+        for vrf in output.split('VPN-Instance Name and ID')[1:]:
+            vrf_name = vrf[vrf.index(':')+1:vrf.index(',')].strip()
+            if not INTERFACE_NUMBER_ZERO.search(vrf):
+                interfaces_list = vrf[vrf.index(
+                    'Interface list : ')+17:].split('\n')
+            else:
+                interfaces_list = []
+            # blank lines separating VPN instances are skipped
+            vrf_bind_map.update({interface.strip(
+                ', '): vrf_name for interface in interfaces_list
+                if interface.strip(', ')})
+        return vrf_bind_map
+
+    def is_breakout(self, interface_name):
+        '''Check if interface created by breakout, i.e. has ':' symbol in
+        name, like 40GE1/0/1:1.
+        Arguments:
+            * interface_name - full interface name
+        Returns:
+            * True or False
+        '''
+        return ':' in interface_name
+
+    def parse_transceiver(self, output, interface_name):
+        '''Grab optical module stats out of 'display interface transceiver
+        verbose' output.
+        Arguments:
+            * output - CLI output
+            * interface_name - name of interface
+        Returns:
+            * dictionary with transceiver, ddm, module_type, optical_lanes and
+                rx_power keys; values are None if they can't be gathered
+        '''
+        stats = dict.fromkeys(('transceiver', 'ddm', 'module_type',
+                               'optical_lanes', 'rx_power'))
+        if f'{interface_name} transceiver information' not in output:
+            return stats
+        stats['ddm'] = DDM_SUPPORTED.search(output).group(1) == 'YES'
+        stats['transceiver'] = VENDOR_NAME.search(output).group(
+            1) + ' ' + VENDOR_PART_NUMBER.search(output).group(1)
+        stats['module_type'] = TRANSCEIVER_TYPE.search(output).group(
+            1).replace('_', '-')
+        if not stats['ddm'] or 'Current RX Pow' not in output:
+            # DDM can be supported, but no stats listed
+            return stats
+        if 'Lane' not in output:
+            stats['optical_lanes'] = 1
+            stats['rx_power'] = float(RX_POWER.search(output).group(1))
+        else:
+            rx_pwr_start = output.index('Current RX Power (dBm)')
+            next_new_line = output.index('\n', rx_pwr_start)
+            rx_pwr_end = output.index('Default RX Power', rx_pwr_start)
+            stats['rx_power'] = list(map(float, LANE_RX_POWER.findall(
+                output[next_new_line:rx_pwr_end])))
+            stats['optical_lanes'] = len(stats['rx_power'])
+        return stats
+
+    def count_macs(self, mac_table):
+        '''Grab number of MACs in MAC table output.
+        Arguments:
+            * mac_table - CLI output with MAC table
+        Returns:
+            * number of MACs in table
+        '''
+        return int(MAC_TOTAL.search(mac_table).group(1))
+
+    def iter_mac_entries(self, mac_table):
+        '''Iterate over MAC table entries.
+        Arguments:
+            * mac_table - CLI output with full MAC table
+        Yields:
+            * tuples (VLAN number, port name, MAC address as listed)
+        '''
+        for line in iter_lines(mac_table):
+            match = MAC_LINE.match(line)
+            if match:
+                yield int(match.group(2)), match.group(3), match.group(1)
+
+    def vrf_exists(self, output, vrf_name):
+        '''Check if VPN instance is listed in 'display ip vpn-instance'
+        output.
+        Arguments:
+            * output - CLI output
+            * vrf_name - name of VRF
+        Returns:
+            * True or False
+        '''
+        return bool(vrf_regexp(vrf_name).search(output))
+
+    def parse_config_checkpoint(self, output):
+        '''Grab configuration checkpoint out of 'display configuration
+        commit list 1' output: ID of the latest configuration commit.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * checkpoint string or None if it is not found
+        '''
+        match = CONFIG_CHECKPOINT.search(output)
+        return match.group(1).strip() if match else None
+
+    def parse_vrf_names(self, output):
+        '''Grab VPN instance names out of 'display ip vpn-instance' output.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * list of VRF names
+        '''
+        start = output.find('VPN-Instance Name')
+        if start == -1:
+            return []
+        return [x.split()[0] for x in output[start:].strip().split('\n')[1:]
+                if x.strip()]
+
+    def iter_interface_blocks(self, output):
+        '''Split 'display ip interface' or 'display ipv6 interface' output
+        for all interfaces into per interface blocks.
+        Arguments:
+            * output - CLI output
+        Yields:
+            * tuples of (interface name, block of output)
+        '''
+        yield from iter_blocks(INTERFACE_BLOCK, output)
+
+    def parse_vrf_interfaces(self, output, vrf_name):
+        '''Grab interfaces names out of 'display ip vpn-instance X interface'
+        output.
+        Arguments:
+            * output - CLI output
+            * vrf_name - name of VRF
+        Returns:
+            * list of interface names
+        '''
+        if 'Interface Number : 0' in output:
+            return []
+        start_mark = 'Interface list : '
+        start = output.index(start_mark)
+        return [x.strip(' ,') for x in output[start+len(
+            start_mark):].strip().split('\n')]
+
+    def parse_bgp_neighbors(self, output, af_name):
+        '''Parse BGP peers verbose output for single address family. String
+        output is split into peer blocks by header lines and every block is
+        searched for parameters, which are all listed at its top, so rest of
+        block is never scanned; iterable of lines is parsed in a single pass
+        as lines come.
+        Arguments:
+            * output - CLI output string or iterable of its lines
+            * af_name - either 'v4' or 'v6'; output is per address family
+                already
+        Yields:
+            * dictionaries with neighbor parameters
+        '''
+        if not output:
+            return
+        if not isinstance(output, str):
+            yield from parse_bgp_neighbor_lines(
+                BGP_NEIGHBOR_LINES, BGP_NEIGHBOR_HEADERS, output)
+            return
+        vrf_name = None
+        headers = list(BGP_PEER_HEADER.finditer(output))
+        # output of all VPN instances starts with the first instance header,
+        # only then it is scanned for the rest of them
+        if headers and ' VPN-Instance ' in output[:headers[0].start()]:
+            headers = sorted(headers + list(BGP_VRF_HEADER.finditer(output)),
+                             key=lambda x: x.start())
+        for header, next_header in zip(headers, headers[1:] + [None]):
+            if header.re is BGP_VRF_HEADER:
+                vrf_name = header.group(1)
+                continue
+            start = header.end()
+            end = next_header.start() if next_header else len(output)
+            neighbor = new_bgp_neighbor(header.group(1))
+            neighbor['vrf'] = vrf_name
+            neighbor['as_number'] = header.group(2)
+            # parameters are listed in this order, so every search starts
+            # where previous parameter was found; peers not established have
+            # no routes lines
+            link = BGP_LINK.search(output, start, end)
+            if link:
+                neighbor['type'] = BGP_SESSION_TYPES.get(
+                    link.group(1).lower())
+                start = link.end()
+            router_id = BGP_ROUTER_ID.search(output, start, end)
+            if router_id:
+                neighbor['router_id'] = router_id.group(1)
+                start = router_id.end()
+            state = BGP_STATE.search(output, start, end)
+            if state:
+                neighbor['state'] = state.group(1).lower()
+                start = state.end()
+            learned = BGP_RECEIVED_ROUTES.search(output, start, end)
+            if learned:
+                neighbor['learned_routes'] = int(learned.group(1))
+                start = learned.end()
+            sent = BGP_ADVERTISED_ROUTES.search(output, start, end)
+            if sent:
+                neighbor['sent_routes'] = int(sent.group(1))
+            yield neighbor
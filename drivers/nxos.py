@@ -0,0 +1,472 @@
+import re
+import json
+from functools import lru_cache
+from drivers.base import (BaseDriver, iter_lines, iter_blocks,
+                          parse_bgp_neighbor_lines, cisco_compact_name,
+                          convert_mac_address, convert_load)
+from utils.switch_objects import VlanSet
+
+IPV4_ADDRESS = re.compile(r'IP address: '
+                          r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+                          r', '
+                          r'IP subnet: \d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}'
+                          r'/(\d{1,2})( secondary)?')
+IPV6_PRIMARY_ADDRESS = re.compile(r'IPv6 address: (\S+)')
+IPV6_PRIMARY_PREFIX_LENGTH = re.compile(r'IPv6 subnet:  \S+/(\d{1,3})')
+IPV6_LINK_LOCAL = re.compile(r'IPv6 link-local address: (\S+)')
+IPV6_SECONDARY_ADDRESS = re.compile(r'([0-9A-Fa-f:]+)/(\d{1,3})')
+NEIGHBORS_TOTAL = re.compile(r'Total number of entries:\s+(\d+)')
+NEIGHBOR_LINE = re.compile(
+        r'(?:[0-9a-f]{4}\.[0-9a-f]{4}\.[0-9a-f]{4}|INCOMPLETE)\s+(.+)$',
+        flags=re.I)
+NEIGHBOR_FLAGS = ('*', '+', '#', 'D', 'G')
+NEIGHBOR_ENTRY = re.compile(
+        r'^(\S+)?\s+\S+\s+([0-9a-f]{4}\.[0-9a-f]{4}\.[0-9a-f]{4})\s+(.+)$')
+NEIGHBOR_TABLE_VRF = re.compile(r'Table for (?:context|VRF) (\S+)')
+DESCRIPTION = re.compile(r'Description: (.+)\n')
+HARDWARE_ADDRESS = re.compile(r'address(?:: | is\s+)([a-z0-9.]+)\s')
+MTU = re.compile(r'MTU (\d{4}) bytes')
+# as it can be full or Full duplex - ignore case
+SPEED_AND_DUPLEX = re.compile(r'(full|half)-duplex, (\d{1,3}) gb/s',
+                              flags=re.I)
+INPUT_RATE = re.compile(r'input rate (\d+) bits/sec,')
+OUTPUT_RATE = re.compile(r'output rate (\d+) bits/sec,')
+SWITCHPORT_MODE = re.compile(r'Operational Mode: (trunk|access)')
+ACCESS_VLAN = re.compile(r'Access Mode VLAN: (\d{1,4})')
+NATIVE_VLAN = re.compile(r'Trunking Native Mode VLAN: (\d{1,4})')
+ALLOWED_VLANS = re.compile(r'Trunking VLANs Allowed: ([0-9,-]+)')
+VRF_BINDING = re.compile(r'([0-9A-Za-z/:.]+)\s+([0-9A-Za-z_:.-]+)\s+(\d+|N/A)')
+MAC_LINE = re.compile(
+        r'^\S?\s+(\d{1,4})\s+([0-9a-f]{4}\.[0-9a-f]{4}\.[0-9a-f]{4})\s'
+        r'.*\s(\S+)$')
+INTERFACE_BLOCK = re.compile(r'^(\S+), Interface status:', flags=re.M)
+CONFIG_CHECKPOINT = re.compile(r'accounting-log last-index\s*:\s*(\d+)')
+# lines of BGP neighbors detailed output parser is interested in, see
+# drivers.base.parse_bgp_neighbor_lines
+BGP_NEIGHBOR_HEADERS = ('BGP neighbor is ',)
+BGP_NEIGHBOR_LINES = re.compile(
+        r'(?P<neighbor>BGP neighbor is ([^,]+),(?:\s+vrf ([^,]+),)?\s+'
+        r'remote AS (\d+(?:\.\d+)?),(?:\s+(\w+) link)?)|  (?:BGP (?:'
+        r'(?P<router_id>version \d+, remote router ID (\S+))|'
+        r'(?P<state>state = (\w+)))|'
+        r'(?P<af>For address family: (\S+ \w+))|'
+        r'(?P<learned>(\d+) accepted paths)|'
+        r'(?P<sent>(\d+) sent paths))')
+
+
+@lru_cache(maxsize=None)
+def vrf_regexp(vrf_name):
+    '''Compile regular expression to find VRF in 'show vrf' output.
+    Arguments:
+        * vrf_name - name of VRF
+    Returns:
+        * compiled regular expression
+    '''
+    return re.compile(r'\n{}\s+\d{{1,2}}'.format(re.escape(vrf_name)))
+
+
+class NXOSDriver(BaseDriver):
+    '''Driver for Cisco NX-OS.'''
+    platform = 'nxos'
+    nos_name = 'Cisco NX-OS'
+    vendor_vars_key = 'Cisco Nexus'
+    brief_lists_mode = True
+    builtin_vrfs = ('default', 'management')
+
+    def parse_interfaces_brief(self, output):
+        '''Parse 'show interface brief' output line by line.
+        Arguments:
+            * output - CLI output
+        Yields:
+            * tuples of (name as listed, full name, admin status, operational
+                status, mode, LAG name)
+        '''
+        for line in iter_lines(output):
+            columns = line.split()
+            # data lines are the only ones with digits in the first column
+            if not columns or not any(x.isdigit() for x in columns[0]):
+                continue
+            if ' up ' in line:
+                admin_status, oper_status = 'up', 'up'
+            elif 'Administratively down' in line:
+                admin_status, oper_status = 'down', 'down'
+            else:
+                admin_status, oper_status = 'up', 'down'
+            if 'routed' in columns:
+                mode = 'routed'
+            elif 'trunk' in columns or 'access' in columns:
+                mode = 'switched'
+            else:
+                mode = None
+            if columns[0].startswith('Eth') and columns[-1].isdigit():
+                lag = 'port-channel' + columns[-1]
+            else:
+                lag = None
+            if columns[0].startswith('Eth'):
+                full_name = 'Ethernet' + columns[0][3:]
+            elif columns[0].startswith('Po'):
+                full_name = 'port-channel' + columns[0][2:]
+            else:
+                full_name = columns[0]
+            yield (columns[0], full_name, admin_status, oper_status, mode,
+                   lag)
+
+    def parse_ipv4_addresses(self, output):
+        '''Grab IPv4 addresses out of 'show ip interface' output.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * list of tuples (address, prefix length, secondary flag)
+        '''
+        if 'IP is disabled' in output:
+            return []
+        return IPV4_ADDRESS.findall(output)
+
+    def parse_ipv6_addresses(self, output):
+        '''Grab IPv6 addresses out of 'show ipv6 interface' output.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * list of tuples (address, prefix length, secondary flag)
+        '''
+        if 'IPv6 is disabled' in output:
+            return []
+        addresses = [
+            (IPV6_PRIMARY_ADDRESS.search(output).group(1),
+             IPV6_PRIMARY_PREFIX_LENGTH.search(output).group(1), None),
+            (IPV6_LINK_LOCAL.search(output).group(1), '64', True)]
+        sec_start = output.find('Secondary configured addresses')
+        if sec_start != -1:
+            sec_end = output.index('IPv6 link-local address')
+            for address in IPV6_SECONDARY_ADDRESS.findall(
+                    output[sec_start:sec_end]):
+                addresses.append((address[0], address[1], True))
+        return addresses
+
+    def count_interface_neighbors(self, output):
+        '''Grab number of IP neighbors out of ARP or ND table of interface.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * number of neighbors
+        '''
+        return int(NEIGHBORS_TOTAL.search(output).group(1))
+
+    def iter_ip_neighbors(self, output, af):
+        '''Iterate over ARP or ND table entries.
+        Arguments:
+            * output - CLI output with full ARP or ND table
+            * af - either 'v4' or 'v6'
+        Yields:
+            * names of interfaces neighbors are learned on, one per neighbor
+        '''
+        for line in iter_lines(output):
+            match = NEIGHBOR_LINE.search(line)
+            if not match:
+                continue
+            for column in reversed(match.group(1).split()):
+                if column not in NEIGHBOR_FLAGS:
+                    yield column
+                    break
+
+    def iter_ip_neighbor_entries(self, output, af):
+        '''Iterate over resolved ARP or ND table entries. Tables of many VRFs
+        are listed one by one, every with its own header. Long IPv6 address
+        is listed on a line of its own.
+        Arguments:
+            * output - CLI output with full ARP or ND table
+            * af - either 'v4' or 'v6'
+        Yields:
+            * tuples (IP address, MAC address as listed, interface name, VRF
+                name)
+        '''
+        vrf_name = None
+        address = None
+        for line in iter_lines(output):
+            vrf_match = NEIGHBOR_TABLE_VRF.search(line)
+            if vrf_match:
+                vrf_name = vrf_match.group(1)
+                continue
+            match = NEIGHBOR_ENTRY.match(line.rstrip())
+            if not match:
+                # address wrapped on its own line, columns follow on next one
+                address = line.strip() if ':' in line and \
+                    len(line.split()) == 1 else None
+                continue
+            if match.group(1):
+                address = match.group(1)
+            for column in reversed(match.group(3).split()):
+                if column not in NEIGHBOR_FLAGS:
+                    yield address, match.group(2), column, vrf_name
+                    break
+            address = None
+
+    def parse_interface_basics(self, output):
+        '''Grab description, MAC address and MTU out of 'show interface'.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * tuple (description, MAC address, MTU)
+        '''
+        if 'Description:' not in output:
+            description = None
+        else:
+            description = DESCRIPTION.search(output).group(1)
+        mac_address = convert_mac_address(
+            HARDWARE_ADDRESS.search(output).group(1))
+        mtu = int(MTU.search(output).group(1))
+        return description, mac_address, mtu
+
+    def parse_interface_rates(self, output, lag=False):
+        '''Grab speed, duplex and load out of 'show interface' output.
+        Arguments:
+            * output - CLI output
+            * lag (defaults to False) - True if interface is LAG
+        Returns:
+            * tuple (speed, duplex, load in, load out)
+        '''
+        speed_and_duplex = SPEED_AND_DUPLEX.search(output)
+        return (int(speed_and_duplex.group(2)), speed_and_duplex.group(1),
+                convert_load(INPUT_RATE.search(output).group(1)),
+                convert_load(OUTPUT_RATE.search(output).group(1)))
+
+    def parse_switchport(self, output):
+        '''Grab switching mode, PVID and VLAN list out of switchport output.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * tuple (mode, PVID, utils.switch_objects.VlanSet of allowed
+                VLANs) or None if interface is not switching
+        '''
+        if 'switchport: disabled' in output.lower():
+            return None
+        switch_mode = SWITCHPORT_MODE.search(output).group(1)
+        if switch_mode == 'access':
+            pvid = int(ACCESS_VLAN.search(output).group(1))
+            return switch_mode, pvid, VlanSet([pvid])
+        pvid = int(NATIVE_VLAN.search(output).group(1))
+        return switch_mode, pvid, VlanSet.from_string(
+            ALLOWED_VLANS.search(output).group(1))
+
+    def parse_vrf_bindings(self, output):
+        '''Map interfaces to VRFs out of 'show vrf interface' output.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * dictionary with interface names as keys and VRF names as values
+        '''
+        output = '\n'.join(output.strip().split('\n')[1:])
+        return {m[0]: m[1] for m in VRF_BINDING.findall(output)}
+
+    def is_breakout(self, interface_name):
+        '''Check if interface created by breakout, i.e. has 2 '/' symbols in
+        name, like Ethernet1/1/1.
+        Arguments:
+            * interface_name - full interface name
+        Returns:
+            * True or False
+        '''
+        return interface_name.count('/') == 2
+
+    def mac_table_port_name(self, interface_name):
+        return cisco_compact_name(interface_name)
+
+    def count_macs(self, mac_table):
+        '''Count number of MACs in MAC table output.
+        Arguments:
+            * mac_table - CLI output with MAC table
+        Returns:
+            * number of MACs in table
+        '''
+        delimeter = mac_table.find('---')
+        # Cisco returns empty output if no MACs learned
+        if delimeter == -1:
+            return 0
+        else:
+            table_start = mac_table.index('\n', delimeter)
+            return len(mac_table[table_start:].strip().split('\n'))
+
+    def iter_mac_entries(self, mac_table):
+        '''Iterate over MAC table entries.
+        Arguments:
+            * mac_table - CLI output with full MAC table
+        Yields:
+            * tuples (VLAN number, port name, MAC address as listed)
+        '''
+        for line in iter_lines(mac_table):
+            match = MAC_LINE.match(line.rstrip())
+            if match:
+                yield int(match.group(1)), match.group(3), match.group(2)
+
+    def vrf_exists(self, output, vrf_name):
+        '''Check if VRF is listed in 'show vrf' output.
+        Arguments:
+            * output - CLI output
+            * vrf_name - name of VRF
+        Returns:
+            * True or False
+        '''
+        return bool(vrf_regexp(vrf_name).search(output))
+
+    def parse_config_checkpoint(self, output):
+        '''Grab configuration checkpoint out of 'show accounting log
+        last-index' output: index of the last accounting log record, which
+        grows with every configuration command (and with show commands too,
+        if 'terminal log-all' is set, making facts expire more often).
+        Arguments:
+            * output - CLI output
+        Returns:
+            * checkpoint string or None if it is not found
+        '''
+        match = CONFIG_CHECKPOINT.search(output)
+        return match.group(1).strip() if match else None
+
+    def parse_vrf_names(self, output):
+        '''Grab VRF names out of 'show vrf' output.
+        Arguments:
+            * output - CLI output
+        Returns:
+            * list of VRF names
+        '''
+        return [x.split()[0] for x in output.strip().split('\n')[1:]
+                if x.strip()]
+
+    def iter_interface_blocks(self, output):
+        '''Split 'show ip interface vrf all' or 'show ipv6 interface vrf all'
+        output into per interface blocks.
+        Arguments:
+            * output - CLI output
+        Yields:
+            * tuples of (interface name, block of output)
+        '''
+        yield from iter_blocks(INTERFACE_BLOCK, output)
+
+    def parse_vrf_interfaces(self, output, vrf_name):
+        '''Grab interfaces names out of 'show vrf X interface' output.
+        Arguments:
+            * output - CLI output
+            * vrf_name - name of VRF
+        Returns:
+            * list of interface names
+        '''
+        if vrf_name not in output:
+            return []
+        return [x.split(' ')[0] for x in output.strip().split('\n')[1:]]
+
+    def parse_bgp_neighbors(self, output, af_name):
+        '''Parse BGP neighbors detailed output for single address family in
+        a single pass over output lines.
+        Arguments:
+            * output - CLI output string or iterable of its lines
+            * af_name - either 'v4' or 'v6'
+        Yields:
+            * dictionaries with neighbor parameters
+        '''
+        if not output:
+            return
+        yield from parse_bgp_neighbor_lines(
+            BGP_NEIGHBOR_LINES, BGP_NEIGHBOR_HEADERS, output, af_name)
+
+
+def iter_rows(data, table_name):
+    '''Iterate over rows of NX-OS structured output table. NX-OS returns
+    single row as dictionary, but multiple ones as a list of dictionaries.
+    Arguments:
+        * data - dictionary with decoded output
+        * table_name - table name without prefix, like 'interface' for
+            TABLE_interface
+    Yields:
+        * dictionaries, one per table row
+    '''
+    rows = data.get('TABLE_{}'.format(table_name), {}).get(
+        'ROW_{}'.format(table_name), [])
+    if isinstance(rows, dict):
+        yield rows
+    else:
+        yield from rows
+
+
+class NXOSJSONDriver(NXOSDriver):
+    '''Driver for Cisco NX-OS which requests structured '| json' output for
+    commands listed in structured_commands and decodes it instead of
+    screen-scraping. Other commands are served by NXOSDriver parsers.
+    '''
+    output_format = 'json'
+    structured_commands = frozenset((
+        'show interfaces brief',
+        'show bgp ipv4 vrf neighbors',
+        'show bgp ipv6 vrf neighbors',
+        'show bgp ipv4 all neighbors',
+        'show bgp ipv6 all neighbors'))
+
+    def command(self, name, *args):
+        command = super().command(name, *args)
+        if name in self.structured_commands:
+            command += ' | json'
+        return command
+
+    def parse_interfaces_brief(self, output):
+        '''Decode 'show interface brief | json' output.
+        Arguments:
+            * output - CLI output
+        Yields:
+            * tuples of (compact name, full name, admin status, operational
+                status, mode, LAG name)
+        '''
+        for row in iter_rows(json.loads(output), 'interface'):
+            name = row['interface']
+            if 'svi_admin_state' in row:
+                admin_status = row['svi_admin_state']
+                oper_status = 'up' if row.get(
+                    'svi_rsn_desc') == '--' else 'down'
+            else:
+                admin_status = 'down' if row.get(
+                    'state_rsn_desc') == 'Administratively down' else 'up'
+                oper_status = row['state']
+            if row.get('portmode') == 'routed':
+                mode = 'routed'
+            elif row.get('portmode') in ('trunk', 'access'):
+                mode = 'switched'
+            else:
+                mode = None
+            if row.get('portchan'):
+                lag = 'port-channel' + row['portchan']
+            else:
+                lag = None
+            yield (cisco_compact_name(name), name, admin_status, oper_status,
+                   mode, lag)
+
+    def parse_bgp_neighbors(self, output, af_name):
+        '''Decode BGP neighbors '| json' output for single address family.
+        Arguments:
+            * output - CLI output
+            * af_name - either 'v4' or 'v6'
+        Yields:
+            * dictionaries with neighbor parameters
+        '''
+        if not output or not output.strip():
+            return
+        data = json.loads(output)
+        # VRF scoped commands may wrap neighbors into VRF table
+        vrfs = list(iter_rows(data, 'vrf')) or [data]
+        af_title = 'IP{} Unicast'.format(af_name).lower()
+        for vrf in vrfs:
+            for neighbor in iter_rows(vrf, 'neighbor'):
+                learned_routes, sent_routes = 0, 0
+                for per_af in iter_rows(neighbor, 'peraf'):
+                    for per_saf in iter_rows(per_af, 'persaf'):
+                        if per_saf.get('per-af-name', '').lower() == \
+                                af_title:
+                            learned_routes = int(per_saf['pfxrecvd'])
+                            sent_routes = int(per_saf['pfxsent'])
+                link = neighbor.get('link')
+                yield {
+                    'address': neighbor['neighbor'],
+                    'vrf': vrf.get('vrf-name-out'),
+                    'state': neighbor['state'].lower(),
+                    'as_number': neighbor['remoteas'],
+                    'router_id': neighbor['remote-id'],
+                    'type': {'ebgp': 'external',
+                             'ibgp': 'internal'}.get(link),
+                    'learned_routes': learned_routes,
+                    'sent_routes': sent_routes}
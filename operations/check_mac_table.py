@@ -1,66 +1,119 @@
 import re
+from collections import Counter
 from nornir.core.task import Result
-from app_exception import UnsupportedNOS
-from utils.switch_objects import SwitchInterface
+from drivers import get_driver, get_host_driver
+from drivers.base import convert_mac_address
+from utils.command_cache import send_command
+from utils.switch_objects import SwitchInterface, InterfaceSet
 
+# number of switched interfaces and SVIs after which MACs are counted from
+# full MAC table instead of sending command per interface
+BULK_MACS_THRESHOLD = 10
+SVI_VLAN_ID = re.compile(r'(?i)^vlan(?:if)?(\d+)$')
 
-def get_interfaces_macs(task, interface_list=None):
+
+class MacCountIndex:
+    '''Number of MAC addresses learned on a switch, counted both per port and
+    per VLAN out of full MAC table.
+    Attributes:
+        * ports - collections.Counter with port names as keys (in a form they
+            are listed in MAC table)
+        * vlans - collections.Counter with VLAN numbers as keys
+    '''
+    def __init__(self):
+        self.ports = Counter()
+        self.vlans = Counter()
+
+    def __len__(self):
+        return sum(self.vlans.values())
+
+
+def index_mac_table(nos, mac_table):
+    '''Build MacCountIndex out of full MAC table in a single pass over output.
+    Arguments:
+        * nos - NOS name
+        * mac_table - CLI output with full MAC table
+    Returns:
+        * instance of MacCountIndex
+    '''
+    index = MacCountIndex()
+    for vlan_id, port, _ in get_driver(nos).iter_mac_entries(mac_table):
+        index.vlans[vlan_id] += 1
+        index.ports[port] += 1
+    return index
+
+
+def get_interfaces_macs(task, interface_list=None, bulk=None,
+                        bulk_threshold=BULK_MACS_THRESHOLD):
     '''Nornir task to get MAC addresses learned on switch interfaces. If
-    interface list is provided, new list of
-    utils.switch_objects.SwitchInterface will be generated and assigned to
+    interface list is provided, new
+    utils.switch_objects.InterfaceSet will be generated and assigned to
     task.host['interfaces'], so existed ones would be dropped. Otherwise
-    existed list in task.host['interfaces'].
+    existed set in task.host['interfaces']. In bulk mode full MAC table is
+    grabbed once and MACs counted from it for both SVIs and L2 ports, instead
+    of sending command per interface.
     Arguments:
         * task - instance or nornir.core.task.Task
         * interface_list (defaults to None) - list of strings, which represents
             switch interface names
+        * bulk (defaults to None) - True or False to force or forbid bulk
+            mode; if None, bulk mode used when number of SVIs and switched
+            interfaces is greater than bulk_threshold
+        * bulk_threshold (defaults to BULK_MACS_THRESHOLD) - number of SVIs
+            and switched interfaces to switch into bulk mode automatically
     Returns:
         * instance of nornir.core.task.Result
     '''
-    def count_macs(nos, mac_table):
-        '''Grab number of MACs from output, in case of NX-OS we must count
-        lines, for VRPv8 we can found number listed.
-        Arguments:
-            * nos - NOS name
-            * mac_table - CLI output with MAC table
-        Returns:
-            * number of MACs in table
-        '''
-        if nos == 'nxos':
-            delimeter = mac_table.find('---')
-            # Cisco returns empty output if no MACs learned
-            if delimeter == -1:
-                return 0
-            else:
-                table_start = mac_table.index('\n', delimeter)
-                return len(mac_table[table_start:].strip().split('\n'))
-        elif nos == 'huawei_vrpv8':
-            return int(re.search(r'Total items: (\d+)', mac_table).group(1))
-        else:
-            raise UnsupportedNOS('task received unsupported NOS - {}'.format(
-                nos))
     if interface_list:
-        task.host['interfaces'] = [SwitchInterface(x) for x in interface_list]
-    connection = task.host.get_connection('netmiko', None)
+        task.host['interfaces'] = InterfaceSet(
+            SwitchInterface(x) for x in interface_list)
+    driver = get_host_driver(task.host)
+    if bulk is None:
+        bulk = len([x for x in task.host['interfaces'] if x.svi or
+                    x.mode != 'routed']) > bulk_threshold
+    if bulk:
+        mac_index = index_mac_table(task.host.platform, send_command(
+            task, driver.command('show mac table')))
     result = 'MACs learned on interfaces:\n'
     for interface in task.host['interfaces']:
         if interface.svi:
-            vlan_id = re.match(r'(?i)^vlan(?:if)?(\d+)$',
-                               interface.name).group(1)
-            mac_table = connection.send_command(task.host['vendor_vars'][
-                'show mac table vlan'].format(vlan_id))
-            interface.macs_learned = count_macs(task.host.platform,
-                                                mac_table)
+            vlan_id = SVI_VLAN_ID.match(interface.name).group(1)
+            if bulk:
+                interface.macs_learned = mac_index.vlans[int(vlan_id)]
+            else:
+                interface.macs_learned = driver.count_macs(send_command(
+                    task, driver.command('show mac table vlan', vlan_id)))
         elif interface.mode == 'routed':
             interface.macs_learned = 0
             result += '\tInterface {} is routing\n'.format(interface.name)
             continue
+        elif bulk:
+            interface.macs_learned = mac_index.ports[
+                driver.mac_table_port_name(interface.name)]
         else:
-            mac_table = connection.send_command(
-                    task.host['vendor_vars'][
-                        'show mac table interface'].format(interface.name))
-            interface.macs_learned = count_macs(task.host.platform,
-                                                mac_table)
+            interface.macs_learned = driver.count_macs(send_command(
+                task, driver.command('show mac table interface',
+                                     interface.name)))
         result += '\tInterface {} learned {} MACs\n'.format(
                 interface.name, interface.macs_learned)
     return Result(host=task.host, result=result)
+
+
+def get_mac_table(task):
+    '''Nornir task to grab full MAC table of a switch, to locate MAC
+    addresses across hosts later (see utils.mac_index). Entries are assigned
+    to task.host['mac_table'] as list of (MAC address, VLAN number, port
+    name) tuples, MAC addresses converted into standard notation and port
+    names as they are listed in MAC table.
+    Arguments:
+        * task - instance or nornir.core.task.Task
+    Returns:
+        * instance of nornir.core.task.Result
+    '''
+    driver = get_host_driver(task.host)
+    task.host['mac_table'] = [
+        (convert_mac_address(mac), vlan_id, port) for vlan_id, port, mac in
+        driver.iter_mac_entries(send_command(
+            task, driver.command('show mac table')))]
+    return Result(host=task.host, result='{} MAC addresses learned'.format(
+        len(task.host['mac_table'])))
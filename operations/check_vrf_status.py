@@ -1,8 +1,10 @@
-import re
 import ipaddress
 from nornir.core.task import Result
-from app_exception import UnsupportedNOS
-from utils.switch_objects import SwitchInterface, BGPNeighbor, AddressFamily
+from drivers import get_host_driver
+from utils.command_cache import send_command
+from utils.facts_cache import get_host_facts
+from utils.switch_objects import (SwitchInterface, InterfaceSet, BGPNeighbor,
+                                  AddressFamily)
 
 
 def find_vrf(task):
@@ -14,10 +16,9 @@ def find_vrf(task):
     Returns:
         * instance of nornir.core.task.Result
     '''
-    connection = task.host.get_connection('netmiko', None)
-    output = connection.send_command(task.host['vendor_vars']['show vrf'])
-    if not re.search(task.host['vendor_vars']['vrf regexp'].format(
-            task.host['vrf_name']), output):
+    driver = get_host_driver(task.host)
+    output = send_command(task, driver.command('show vrf'))
+    if not driver.vrf_exists(output, task.host['vrf_name']):
         return Result(host=task.host, failed=True,
                       result='VRF {} is not exist on device'.format(
                           task.host['vrf_name']))
@@ -27,9 +28,31 @@ def find_vrf(task):
                         task.host['vrf_name']))
 
 
+def find_vrfs(task):
+    '''Nornir task to grab names of all VRFs configured on a switch, except
+    ones NOS creates by itself (like 'default' and 'management' on NX-OS).
+    Names are assigned to task.host['vrf_names']. Task will fail if no VRF
+    found, which prevents other tasks on same host from being executed.
+    Arguments:
+        * task - instance or nornir.core.task.Task
+    Returns:
+        * instance of nornir.core.task.Result
+    '''
+    driver = get_host_driver(task.host)
+    output = send_command(task, driver.command('show vrf'))
+    task.host['vrf_names'] = [x for x in driver.parse_vrf_names(output)
+                              if x not in driver.builtin_vrfs]
+    if not task.host['vrf_names']:
+        return Result(host=task.host, failed=True,
+                      result='No VRFs configured on device')
+    return Result(host=task.host,
+                  result='VRFs configured on device: {}'.format(
+                      ', '.join(task.host['vrf_names'])))
+
+
 def get_vrf_interfaces(task):
     '''Nornir task to grab all interfaces assigned to VRF on a switch. It will
-    create list of utils.switch_objects.SwitchInterface and assign it to
+    create utils.switch_objects.InterfaceSet and assign it to
     task.host['interfaces']. Task will fail if there are no interfaces assigned
     to VRF, precluding other tasks run on that host.
     Arguments:
@@ -37,30 +60,18 @@ def get_vrf_interfaces(task):
     Returns:
         * instance of nornir.core.task.Result
     '''
-    connection = task.host.get_connection('netmiko', None)
-    output = connection.send_command(
-            task.host['vendor_vars']['show vrf interfaces'].format(
-                task.host['vrf_name']))
-    if task.host.platform == 'nxos':
-        if task.host['vrf_name'] not in output:
-            interfaces_list = []
-        else:
-            interfaces_list = [SwitchInterface(
-                x.split(' ')[0], mode='routed') for x in output.strip().split(
-                    '\n')[1:]]
-    elif task.host.platform == 'huawei_vrpv8':
-        if 'Interface Number : 0' in output:
-            interfaces_list = []
-        else:
-            start_mark = 'Interface list : '
-            start = output.index(start_mark)
-            interfaces_list = [SwitchInterface(
-                x.strip(' ,'), mode='routed') for x in output[start+len(
-                    start_mark):].strip().split('\n')]
-    else:
-        raise UnsupportedNOS(
-                'task received unsupported NOS - {}'.format(
-                    task.host.platform))
+    driver = get_host_driver(task.host)
+    facts = get_host_facts(task)
+    vrf_interfaces = (facts.get('vrf_interfaces') if facts else None) or {}
+    if task.host['vrf_name'] not in vrf_interfaces:
+        output = send_command(task, driver.command('show vrf interfaces',
+                                                   task.host['vrf_name']))
+        vrf_interfaces[task.host['vrf_name']] = driver.parse_vrf_interfaces(
+            output, task.host['vrf_name'])
+        if facts:
+            facts.put('vrf_interfaces', vrf_interfaces)
+    interfaces_list = InterfaceSet(SwitchInterface(x, mode='routed') for x in
+                                   vrf_interfaces[task.host['vrf_name']])
     task.host['interfaces'] = interfaces_list
     if len(task.host['interfaces']) == 0:
         return Result(host=task.host, failed=True,
@@ -73,121 +84,81 @@ def get_vrf_interfaces(task):
                     [x.name for x in interfaces_list])))
 
 
-def check_vrf_bgp_neighbors(task, af='both'):
-    '''Nornir task to check state of BGP sessions with neighbors and grab they
-    essintial parameters (ASN, session type, routed ID and number of prefixes
-    learned for IPv4 unicast and/or IPv6 unicast.
+def get_all_vrf_interfaces(task):
+    '''Nornir task to grab interfaces of all VRFs in task.host['vrf_names']
+    with a single command. It will create utils.switch_objects.InterfaceSet
+    for every VRF and assign dictionary with VRF names as keys and sets as
+    values to task.host['vrf_interfaces']; set with interfaces of all that
+    VRFs is assigned to task.host['interfaces'], so operations run on it fill
+    the same interface objects. VRFs without interfaces get empty sets.
     Arguments:
         * task - instance or nornir.core.task.Task
-        * af (defaults to 'both') - which AF we are interested in: both, v4 or
-            v6
     Returns:
         * instance of nornir.core.task.Result
     '''
-    def get_n_record(host, raw_address):
-        '''Check if utils.switch_objects.BGPNeighbor instance already exist in
-        task.host['bgp_neighbors'] and grab it. If not create new and assign to
-        that list.
-        Arguments:
-            * host - instance or nornir.core.task.Host
-            * raw_address - string, which represents neighbor IP address
-        Returns:
-            * instance of utils.switch_objects.BGPNeighbor
-        '''
-        address = ipaddress.ip_address(raw_address).compressed
-        if address not in host['bgp_neighbors'].keys():
-            neighbor = BGPNeighbor(raw_address)
-            host['bgp_neighbors'][neighbor.address.compressed] = neighbor
-        else:
-            neighbor = host['bgp_neighbors'][address]
-        return neighbor
-
-    connection = task.host.get_connection('netmiko', None)
-    result = 'BGP neighbors in VRF {}:\n'.format(task.host['vrf_name'])
-    if 'bgp_neighbors' not in task.host.keys():
-        task.host['bgp_neighbors'] = {}
-    check_af_v4 = True
-    check_af_v6 = True
-    if af == 'v4':
-        check_af_v6 = False
-    elif af == 'v6':
-        check_af_v4 = False
-    if check_af_v4:
-        v4_output = connection.send_command(task.host['vendor_vars'][
-            'show bgp ipv4 vrf neighbors'].format(task.host['vrf_name']))
-    else:
-        v4_output = None
-    if check_af_v6:
-        v6_output = connection.send_command(task.host['vendor_vars'][
-            'show bgp ipv6 vrf neighbors'].format(task.host['vrf_name']))
-    else:
-        v6_output = None
-    for output, af_name in zip([v4_output, v6_output], ['v4', 'v6']):
-        if task.host.platform == 'nxos':
-            if not output or 'BGP neighbor is' not in output:
-                continue
-            neighbors = output.strip().split('BGP neighbor is ')
-            for neighbor in neighbors:
-                if not neighbor:
-                    continue
-                n_record = get_n_record(task.host,
-                                        neighbor[:neighbor.index(',')])
-                n_record.state = re.search(r'BGP state = (\w+),',
-                                           neighbor).group(1).lower()
-                n_record.as_number = re.search(r'remote AS (\d+(?:\.\d+)?),',
-                                               neighbor).group(1)
-                n_record.router_id = ipaddress.ip_address(re.search(
-                    r'remote router ID (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})',
-                    neighbor).group(1))
-                if 'ebgp link' in neighbor[:neighbor.index('Peer index')]:
-                    n_record._type = 'external'
-                elif 'ibgp link' in neighbor[:neighbor.index('Peer index')]:
-                    n_record._type = 'internal'
-                routes_count_start = neighbor.index(
-                    'For address family: IP{} Unicast'.format(af_name))
-                routes_count_end = neighbor.index('sent paths',
-                                                  routes_count_start)
-                # +10 will retain 'sent paths' words
-                routes_count = neighbor[routes_count_start:routes_count_end+10]
-                new_af = AddressFamily(af_name)
-                new_af.learned_routes = int(re.search(
-                    r'(\d+) accepted paths', routes_count).group(1))
-                new_af.sent_routes = int(re.search(
-                    r'(\d+) sent paths', routes_count).group(1))
-                n_record.af['ip{}'.format(af_name)] = new_af
-        elif task.host.platform == 'huawei_vrpv8':
-            if not output or 'BGP Peer is' not in output:
-                continue
-            neighbors = output.strip().split('BGP Peer is ')
-            for neighbor in neighbors:
-                if not neighbor:
-                    continue
-                n_record = get_n_record(task.host,
-                                        neighbor[:neighbor.index(',')])
-                n_record.state = re.search(r'BGP current state: (\w+),',
-                                           neighbor).group(1).lower()
-                n_record.as_number = re.search(r'remote AS (\d+(?:\.\d+)?)',
-                                               neighbor).group(1)
-                n_record.router_id = ipaddress.ip_address(re.search(
-                    r'Remote router ID (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})',
-                    neighbor).group(1))
-                if 'EBGP link' in neighbor[:neighbor.index('BGP version')]:
-                    n_record._type = 'external'
-                elif 'IBGP link' in neighbor[:neighbor.index('BGP version')]:
-                    n_record._type = 'internal'
-                task.host['bgp_neighbors'][
-                        n_record.address.compressed] = n_record
-                new_af = AddressFamily(af_name)
-                new_af.learned_routes = int(re.search(
-                    r'Received total routes: (\d+)', neighbor).group(1))
-                new_af.sent_routes = int(re.search(
-                    r'Advertised total routes: (\d+)', neighbor).group(1))
-                n_record.af['ip{}'.format(af_name)] = new_af
-        else:
-            raise UnsupportedNOS(
-                    'task received unsupported NOS - {}'.format(
-                        task.host.platform))
-    for neighbor in task.host['bgp_neighbors'].values():
+    driver = get_host_driver(task.host)
+    vrf_bind_map = driver.parse_vrf_bindings(send_command(
+            task, driver.command('show vrf interfaces', '')))
+    vrf_interfaces = {x: InterfaceSet() for x in task.host['vrf_names']}
+    interfaces_list = InterfaceSet()
+    for interface_name, vrf_name in vrf_bind_map.items():
+        if vrf_name not in vrf_interfaces:
+            continue
+        interface = SwitchInterface(interface_name, mode='routed')
+        interface.vrf = vrf_name
+        vrf_interfaces[vrf_name].append(interface)
+        interfaces_list.append(interface)
+    task.host['vrf_interfaces'] = vrf_interfaces
+    task.host['interfaces'] = interfaces_list
+    result = 'Interfaces bound to VRFs:\n'
+    for vrf_name, interfaces in vrf_interfaces.items():
+        result += '\tVRF {}: {}\n'.format(vrf_name, ', '.join(
+            interfaces.names) or 'no interfaces')
+    return Result(host=task.host, result=result)
+
+
+def update_bgp_neighbor(neighbors, parsed, af_name):
+    '''Update utils.switch_objects.BGPNeighbor with parameters parsed out
+    of BGP neighbors output for single address family. Neighbor is created
+    and added to dictionary if it doesn't exist yet.
+    Arguments:
+        * neighbors - dictionary with compressed IP addresses as keys and
+            utils.switch_objects.BGPNeighbor as values
+        * parsed - dictionary with neighbor parameters, yielded by driver
+        * af_name - either 'v4' or 'v6'
+    Returns:
+        * instance of utils.switch_objects.BGPNeighbor
+    '''
+    # parse address once, new neighbor takes parsed one
+    address = ipaddress.ip_address(parsed['address'])
+    neighbor = neighbors.get(address.compressed)
+    if neighbor is None:
+        neighbor = BGPNeighbor(address)
+        neighbors[address.compressed] = neighbor
+    neighbor.state = parsed['state']
+    neighbor.as_number = parsed['as_number']
+    # idle neighbors may have no router ID
+    neighbor.router_id = ipaddress.ip_address(
+        parsed['router_id']) if parsed['router_id'] else None
+    if parsed['type']:
+        neighbor._type = parsed['type']
+    new_af = AddressFamily(af_name)
+    new_af.learned_routes = parsed['learned_routes']
+    new_af.sent_routes = parsed['sent_routes']
+    neighbor.af['ip{}'.format(af_name)] = new_af
+    return neighbor
+
+
+def format_bgp_neighbors(neighbors):
+    '''Format BGP neighbors state, one per line, with routes numbers for
+    established ones.
+    Arguments:
+        * neighbors - iterable of utils.switch_objects.BGPNeighbor
+    Returns:
+        * string
+    '''
+    result = ''
+    for neighbor in neighbors:
         result += '\t{} AS {} (router ID {}) of type {} is {}'.format(
                 neighbor.address, neighbor.as_number, neighbor.router_id,
                 neighbor._type, neighbor.state)
@@ -198,4 +169,72 @@ def check_vrf_bgp_neighbors(task, af='both'):
             x, neighbor.af[x].learned_routes, neighbor.af[x].sent_routes)
             for x in neighbor.af if neighbor.af[x]])
         result += '\n'
+    return result
+
+
+def af_names(af):
+    '''Convert AF choice of BGP tasks into list of address family names.
+    Arguments:
+        * af - both, v4 or v6
+    Returns:
+        * list of 'v4' and/or 'v6'
+    '''
+    if af == 'both':
+        return ['v4', 'v6']
+    return [af]
+
+
+def check_vrf_bgp_neighbors(task, af='both'):
+    '''Nornir task to check state of BGP sessions with neighbors and grab they
+    essintial parameters (ASN, session type, routed ID and number of prefixes
+    learned for IPv4 unicast and/or IPv6 unicast.
+    Arguments:
+        * task - instance or nornir.core.task.Task
+        * af (defaults to 'both') - which AF we are interested in: both, v4 or
+            v6
+    Returns:
+        * instance of nornir.core.task.Result
+    '''
+    driver = get_host_driver(task.host)
+    result = 'BGP neighbors in VRF {}:\n'.format(task.host['vrf_name'])
+    if 'bgp_neighbors' not in task.host.keys():
+        task.host['bgp_neighbors'] = {}
+    for af_name in af_names(af):
+        output = send_command(task, driver.command(
+            'show bgp ip{} vrf neighbors'.format(af_name),
+            task.host['vrf_name']))
+        for parsed in driver.parse_bgp_neighbors(output, af_name):
+            update_bgp_neighbor(task.host['bgp_neighbors'], parsed, af_name)
+    result += format_bgp_neighbors(task.host['bgp_neighbors'].values())
+    return Result(host=task.host, result=result)
+
+
+def check_all_vrfs_bgp_neighbors(task, af='both'):
+    '''Nornir task to check state of BGP sessions with neighbors in all VRFs
+    in task.host['vrf_names'], like check_vrf_bgp_neighbors does for single
+    one, but with a single command per address family. Neighbors are
+    partitioned by VRF into task.host['vrf_bgp_neighbors'] dictionary with
+    VRF names as keys and dictionaries of neighbors as values; neighbors of
+    other VRFs are skipped.
+    Arguments:
+        * task - instance or nornir.core.task.Task
+        * af (defaults to 'both') - which AF we are interested in: both, v4 or
+            v6
+    Returns:
+        * instance of nornir.core.task.Result
+    '''
+    driver = get_host_driver(task.host)
+    vrf_neighbors = {x: {} for x in task.host['vrf_names']}
+    for af_name in af_names(af):
+        output = send_command(task, driver.command(
+            'show bgp ip{} all neighbors'.format(af_name)))
+        for parsed in driver.parse_bgp_neighbors(output, af_name):
+            neighbors = vrf_neighbors.get(parsed['vrf'])
+            if neighbors is not None:
+                update_bgp_neighbor(neighbors, parsed, af_name)
+    task.host['vrf_bgp_neighbors'] = vrf_neighbors
+    result = ''
+    for vrf_name, neighbors in vrf_neighbors.items():
+        result += 'BGP neighbors in VRF {}:\n'.format(vrf_name)
+        result += format_bgp_neighbors(neighbors.values())
     return Result(host=task.host, result=result)
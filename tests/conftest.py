@@ -1,5 +1,6 @@
 import json
 import pytest
+from utils import inventory_cache
 
 
 @pytest.fixture
@@ -10,3 +11,75 @@ def set_vendor_vars(scope='session'):
     with open('operations/vendor_vars.json', 'r', encoding='utf-8')as jsonf:
         vendor_vars = json.load(jsonf)
     return vendor_vars
+
+
+@pytest.fixture(autouse=True)
+def tmp_inventory_cache(tmp_path, monkeypatch):
+    '''Keep inventory snapshots created by tests in temporary directory.'''
+    cache_dir = tmp_path / 'inventory_cache'
+    monkeypatch.setattr(inventory_cache, 'DEFAULT_CACHE_DIR', str(cache_dir))
+    return cache_dir
+
+
+@pytest.fixture
+def tmp_inventory_files(tmp_path):
+    conf = tmp_path / "conf.yml"
+    inv_hosts = tmp_path / "hosts.yml"
+    inv_groups = tmp_path / "groups.yml"
+    test_config = '''
+---
+core:
+    num_workers: 10
+inventory:
+  plugin: nornir.plugins.inventory.simple.SimpleInventory
+  options:
+    host_file: "{}"
+    group_file: "{}"
+'''.format(inv_hosts, inv_groups)
+    hosts = '''
+---
+cisco-dc1:
+  hostname: 10.1.1.1
+  groups:
+    - dc_1
+    - cisco_tors
+huawei-dc2:
+  hostname: 10.2.2.2
+  groups:
+    - dc_2
+    - huawei_tors
+'''
+    groups = '''
+---
+global:
+  data:
+    domain: grt.dc
+    asn: 65666
+dc_1:
+  data:
+    dc_name: one_dc
+dc_2:
+  data:
+    dc_name: two_dc
+tors:
+  data:
+    role: tor_switch
+cisco_tors:
+  groups:
+    - tors
+  platform: nxos
+  data:
+    vendor: cisco
+    lineup: nexus
+huawei_tors:
+  groups:
+    - tors
+  platform: huawei_vrpv8
+  data:
+    vendor: huawei
+    lineup: ce
+'''
+    conf.write_text(test_config)
+    inv_hosts.write_text(hosts)
+    inv_groups.write_text(groups)
+    return conf
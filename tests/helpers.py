@@ -1,5 +1,6 @@
 from unittest.mock import Mock
 from nornir.core.inventory import Host
+from nornir.core.connections import ConnectionPlugin
 from nornir.core.task import Task
 
 
@@ -56,3 +57,76 @@ def create_fake_task(output, vendor_vars, vrf_name, nos, test_obj,
     fake_task = Task(test_obj)
     fake_task.host = host
     return fake_task
+
+
+class FakeNetmiko:
+    '''Stand-in for netmiko connection, which records sent commands and
+    answers with file outputs.
+    Attributes:
+        * outputs - dictionary with commands as keys and file names in
+            cmd_outputs directory as values
+    '''
+    outputs = {'display ip vpn-instance': 'huawei_show_vrf.txt'}
+
+    def __init__(self):
+        self.alive = True
+        self.commands = []
+
+    def send_command(self, command):
+        self.commands.append(command)
+        return get_file_contents(self.outputs[command])
+
+    def is_alive(self):
+        return self.alive
+
+
+class FakeNetmikoPlugin(ConnectionPlugin):
+    '''Nornir connection plugin opening FakeNetmiko connections, counts
+    opened and closed connections.'''
+    opened = 0
+    closed = 0
+
+    def open(self, *args, **kwargs):
+        FakeNetmikoPlugin.opened += 1
+        self.connection = FakeNetmiko()
+
+    def close(self):
+        FakeNetmikoPlugin.closed += 1
+
+
+def write_nornir_config(directory, hosts, groups='{}', num_workers=1):
+    '''Write Nornir config with SimpleInventory and inventory files.
+    Arguments:
+        * directory - pathlib.Path of directory to write files to
+        * hosts - string with YAML host inventory
+        * groups (defaults to empty mapping) - string with YAML group
+            inventory
+        * num_workers (defaults to 1) - number of Nornir workers
+    Returns:
+        * string with config location
+    '''
+    conf = directory / 'conf.yml'
+    host_file = directory / 'hosts.yml'
+    group_file = directory / 'groups.yml'
+    conf.write_text('''
+---
+core:
+    num_workers: {}
+inventory:
+  plugin: nornir.plugins.inventory.simple.SimpleInventory
+  options:
+    host_file: "{}"
+    group_file: "{}"
+'''.format(num_workers, host_file, group_file))
+    host_file.write_text(hosts)
+    group_file.write_text(groups)
+    return str(conf)
+
+
+class FakeClock:
+    '''Clock function returning time set in its now attribute.'''
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
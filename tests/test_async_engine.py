@@ -0,0 +1,153 @@
+import time
+import json
+import asyncio
+import pytest
+from nornir import InitNornir
+from tests.helpers import get_file_contents
+from operations import check_vrf_status
+from utils.async_engine import AsyncEngine, HostTimeout
+
+LATENCY = 0.2
+
+
+class StandInConnection:
+    '''Local stand-in for async SSH connection serving recorded outputs with
+    network latency.
+    Attributes:
+        * host - instance of nornir.core.inventory.Host; used in __init__
+    '''
+    outputs = {
+        'display ip vpn-instance': 'huawei_show_vrf.txt',
+        'display ip vpn-instance Stars interface':
+        'huawei_vrf_interfaces_present.txt'}
+    open_sessions = 0
+    max_open_sessions = 0
+
+    def __init__(self, host):
+        self.host = host
+        self.latency = host.get('latency', LATENCY)
+
+    async def open(self):
+        StandInConnection.open_sessions += 1
+        StandInConnection.max_open_sessions = max(
+            StandInConnection.max_open_sessions,
+            StandInConnection.open_sessions)
+
+    async def send_command(self, command):
+        await asyncio.sleep(self.latency)
+        return get_file_contents(self.outputs[command])
+
+    async def close(self):
+        StandInConnection.open_sessions -= 1
+
+
+def check_vrf(task):
+    task.run(task=check_vrf_status.find_vrf)
+    task.run(task=check_vrf_status.get_vrf_interfaces)
+
+
+def create_nornir(tmp_path, num_hosts, **data):
+    '''Create Nornir with inventory of VRPv8 switches.
+    Arguments:
+        * tmp_path - directory to write inventory files to
+        * num_hosts - number of hosts in inventory
+        * data - additional host data
+    Returns:
+        * instance of nornir.core.Nornir
+    '''
+    hosts = {'tor{}'.format(x): {'hostname': '127.0.0.1',
+                                 'platform': 'huawei_vrpv8',
+                                 'data': dict(vrf_name='Stars', **data)}
+             for x in range(num_hosts)}
+    host_file = tmp_path / 'hosts.yml'
+    group_file = tmp_path / 'groups.yml'
+    # JSON is valid YAML
+    host_file.write_text(json.dumps(hosts))
+    group_file.write_text('{}')
+    return InitNornir(inventory={
+        'plugin': 'nornir.plugins.inventory.simple.SimpleInventory',
+        'options': {'host_file': str(host_file),
+                    'group_file': str(group_file)}})
+
+
+def test_async_engine_concurrency(tmp_path):
+    StandInConnection.max_open_sessions = 0
+    nornir = create_nornir(tmp_path, 30)
+    engine = AsyncEngine(max_sessions=100,
+                         connection_factory=StandInConnection)
+    start = time.monotonic()
+    result = engine.run(nornir, check_vrf)
+    elapsed = time.monotonic() - start
+    assert not result.failed
+    assert len(result) == 30
+    # two commands per host, hosts are processed at once
+    assert elapsed < LATENCY * 2 * 3
+    assert StandInConnection.max_open_sessions == 30
+    assert StandInConnection.open_sessions == 0
+    host = nornir.inventory.hosts['tor0']
+    assert 'command_channel' not in host.data
+    assert [x.name for x in host['interfaces']] == [
+        'Vlanif136', 'LoopBack136']
+
+
+def test_async_engine_bounded_sessions(tmp_path):
+    StandInConnection.max_open_sessions = 0
+    nornir = create_nornir(tmp_path, 6, latency=0.01)
+    engine = AsyncEngine(max_sessions=2, connection_factory=StandInConnection)
+    assert not engine.run(nornir, check_vrf).failed
+    assert StandInConnection.max_open_sessions == 2
+
+
+def test_async_engine_host_timeout(tmp_path):
+    nornir = create_nornir(tmp_path, 3)
+    nornir.inventory.hosts['tor1']['latency'] = 5
+    engine = AsyncEngine(timeout=1, connection_factory=StandInConnection)
+    result = engine.run(nornir, check_vrf)
+    assert list(result.failed_hosts) == ['tor1']
+    assert isinstance(result['tor1'][0].exception, HostTimeout)
+    assert nornir.data.failed_hosts == {'tor1'}
+    assert 'command_channel' not in nornir.inventory.hosts['tor1'].data
+    # failed hosts are skipped on next runs
+    assert 'tor1' not in engine.run(nornir, check_vrf)
+
+
+def test_async_engine_command_error(tmp_path):
+    nornir = create_nornir(tmp_path, 2)
+    nornir.inventory.hosts['tor1']['vrf_name'] = 'Lasers'
+    engine = AsyncEngine(connection_factory=StandInConnection)
+    result = engine.run(nornir, check_vrf)
+    # stand-in connection has no output for Lasers interfaces
+    assert list(result.failed_hosts) == ['tor1']
+    for host in nornir.inventory.hosts.values():
+        assert 'command_channel' not in host.data
+
+
+def test_async_engine_ssh_stand_in(tmp_path):
+    asyncssh = pytest.importorskip('asyncssh')
+
+    class NoAuthServer(asyncssh.SSHServer):
+        def begin_auth(self, username):
+            return False
+
+    async def serve(process):
+        process.stdout.write(get_file_contents(
+            StandInConnection.outputs[process.command]))
+        process.exit(0)
+
+    async def run():
+        server_key = asyncssh.generate_private_key('ssh-rsa')
+        server = await asyncssh.create_server(
+            NoAuthServer, '127.0.0.1', 0, server_host_keys=[server_key],
+            process_factory=serve)
+        port = server.sockets[0].getsockname()[1]
+        nornir = create_nornir(tmp_path, 5)
+        for host in nornir.inventory.hosts.values():
+            host.port = port
+            host.username = 'admin'
+            host.password = 'admin'
+        try:
+            return await AsyncEngine().run_async(nornir, check_vrf)
+        finally:
+            server.close()
+
+    assert not asyncio.run(run()).failed
@@ -0,0 +1,159 @@
+import pytest
+from click.testing import CliRunner
+from nornir.core.connections import Connections
+from nornir.core.task import Result
+from tests.helpers import FakeNetmiko, FakeNetmikoPlugin, write_nornir_config
+from bindings import tors_vrf_check
+from operations import check_vrf_status
+from utils import runner, metrics
+from utils.nornir_utils import PASSWORD_ENV
+from utils.command_cache import send_command
+from utils.batch import parse_jobs, read_job_file, MalformedJobFile
+
+HOSTS = '''
+---
+tor-1:
+  hostname: 10.1.1.1
+  platform: huawei_vrpv8
+  data:
+    role: tor_switch
+tor-2:
+  hostname: 10.1.1.2
+  platform: huawei_vrpv8
+  data:
+    role: tor_switch
+tor-3:
+  hostname: 10.1.1.3
+  platform: eos
+'''
+JOBS = '''
+---
+- binding: tors_vrf_check
+  filters:
+    role: tor_switch
+  parameters:
+    - vrf_name: Lasers
+    - vrf_name: Galaxy
+- binding: tors_vrf_check
+  hosts: tor-*
+  workers: 2
+  parameters:
+    vrf_name: Lasers
+'''
+
+
+def fake_check_vrf(task, vrf_name):
+    output = send_command(task, 'display ip vpn-instance')
+    if vrf_name not in output:
+        raise ValueError('no VRF {}'.format(vrf_name))
+    return Result(task.host, result='{} found'.format(vrf_name))
+
+
+def bgp_check_vrf(task, vrf_name):
+    task.host['vrf_name'] = vrf_name
+    task.run(task=check_vrf_status.check_vrf_bgp_neighbors, af='v6')
+    return Result(task.host, result='{} BGP neighbors: {}'.format(
+        vrf_name, ', '.join(sorted(task.host['bgp_neighbors']))))
+
+
+def test_parse_jobs(tmp_path):
+    job_file = tmp_path / 'jobs.yml'
+    job_file.write_text(JOBS)
+    jobs = read_job_file(str(job_file))
+    assert [(x.number, x.parameters) for x in jobs] == [
+        (1, {'vrf_name': 'Lasers'}), (2, {'vrf_name': 'Galaxy'}),
+        (3, {'vrf_name': 'Lasers'})]
+    assert jobs[0].filters == {'role': 'tor_switch'}
+    assert jobs[2].hosts == ['tor-*']
+    assert jobs[2].workers == 2
+    # VRF names looking like numbers are passed as strings
+    assert parse_jobs([{'binding': 'tors_vrf_check', 'hosts': 'tor-1',
+                        'parameters': {'vrf_name': 100}}])[0].parameters == {
+                            'vrf_name': '100'}
+    for entries in ({'binding': 'tors_vrf_check'},
+                    [{'binding': 'no_such_binding', 'hosts': 'tor-1'}],
+                    [{'binding': 'tors_vrf_check', 'hosts': 'tor-1'}],
+                    [{'binding': 'tors_vrf_check',
+                      'parameters': {'vrf_name': 'Lasers'}}],
+                    [{'binding': 'tors_vrf_check', 'host': 'tor-1',
+                      'parameters': {'vrf_name': 'Lasers'}}]):
+        with pytest.raises(MalformedJobFile):
+            parse_jobs(entries)
+    job_file.write_text('- binding: [\n')
+    with pytest.raises(MalformedJobFile):
+        read_job_file(str(job_file))
+
+
+def test_batch_run(tmp_path, monkeypatch):
+    conf = write_nornir_config(tmp_path, HOSTS)
+    job_file = tmp_path / 'jobs.yml'
+    job_file.write_text(JOBS + '''
+- binding: tors_vrf_check
+  hosts: tor-3
+  parameters:
+    vrf_name: Lasers
+''')
+    monkeypatch.setenv(PASSWORD_ENV, 'secret')
+    monkeypatch.setitem(Connections.available, 'netmiko', FakeNetmikoPlugin)
+    # Nornir is initialized by runner, keep it from registering netmiko
+    monkeypatch.setattr('nornir.init_nornir.register_default_connection_'
+                        'plugins', lambda: None)
+    monkeypatch.setattr(tors_vrf_check, 'check_vrf', fake_check_vrf)
+    FakeNetmikoPlugin.opened = 0
+    result = CliRunner().invoke(runner.main, ['-c', conf, '-j',
+                                              str(job_file)])
+    # Galaxy VRF is not configured on hosts
+    assert result.exit_code == 1
+    assert result.output.count('Lasers found') == 4
+    assert 'Binding run on 2 hosts, 2 failed: tor-1, tor-2' in result.output
+    assert 'Binding does not support platform of hosts: tor-3' in \
+        result.output
+    assert 'No hosts matched.' in result.output
+    # connections are shared between jobs
+    assert FakeNetmikoPlugin.opened == 2
+    result = CliRunner().invoke(runner.main, ['-c', conf, '-j',
+                                              str(job_file), 'tor-1'])
+    assert result.exit_code == 2
+    # every job is exported as own snapshot
+    database = str(tmp_path / 'fleet.db')
+    result = CliRunner().invoke(runner.main, ['-c', conf, '-j',
+                                              str(job_file), '-e', database])
+    assert result.output.count('Exported to {}'.format(database)) == 3
+    metrics_dir = tmp_path / 'metrics'
+    result = CliRunner().invoke(runner.main, ['-c', conf, '-j',
+                                              str(job_file), '-m',
+                                              str(metrics_dir)])
+    metrics.disable()
+    assert 'Metrics written to {}'.format(metrics_dir) in result.output
+    assert 'command="display ip vpn-instance"' in (
+        metrics_dir / 'nornir_bindings.prom').read_text()
+
+
+def test_batch_run_host_data(tmp_path, monkeypatch):
+    conf = write_nornir_config(tmp_path, HOSTS)
+    job_file = tmp_path / 'jobs.yml'
+    job_file.write_text('''
+---
+- binding: tors_vrf_check
+  hosts: tor-1
+  parameters:
+    - vrf_name: Galaxy
+    - vrf_name: Lasers
+''')
+    monkeypatch.setenv(PASSWORD_ENV, 'secret')
+    monkeypatch.setitem(Connections.available, 'netmiko', FakeNetmikoPlugin)
+    monkeypatch.setattr('nornir.init_nornir.register_default_connection_'
+                        'plugins', lambda: None)
+    monkeypatch.setattr(tors_vrf_check, 'check_vrf', bgp_check_vrf)
+    for vrf_name, file_name in (
+            ('Galaxy', 'huawei_show_bgp_ipv6_vrf_neighbors.txt'),
+            ('Lasers', 'huawei_show_bgp_ipv6_vrf_neighbors_lasers.txt')):
+        monkeypatch.setitem(FakeNetmiko.outputs, 'display bgp vpnv6 '
+                            'vpn-instance {} peer verbose'.format(vrf_name),
+                            file_name)
+    result = CliRunner().invoke(runner.main, ['-c', conf, '-j',
+                                              str(job_file)])
+    assert result.exit_code == 0
+    assert 'Galaxy BGP neighbors: fe80::dd:a1, fe80::dd:a2' in result.output
+    # neighbors of previous job are not merged into the next one
+    assert 'Lasers BGP neighbors: fe80::dd:a2\n' in result.output
@@ -0,0 +1,51 @@
+import os
+import pytest
+from utils.binding_registry import (get_bindings, get_binding,
+                                    read_binding_info, unsupported_hosts,
+                                    UnknownBinding, MalformedBinding)
+
+
+class FakeHost:
+    def __init__(self, name, platform):
+        self.name = name
+        self.platform = platform
+
+
+def test_bindings_metadata():
+    bindings = get_bindings()
+    assert list(bindings) == ['ip_locator', 'mac_locator',
+                              'switch_interfaces_check', 'tors_vrf_check']
+    vrf_check = bindings['tors_vrf_check']
+    assert vrf_check.parameters == {
+        'vrf_name': "Enter VRF name ('all' to check every VRF)"}
+    assert vrf_check.platforms == ('nxos', 'huawei_vrpv8')
+    assert vrf_check.description
+    with pytest.raises(UnknownBinding):
+        get_binding('no_such_binding')
+    hosts = [FakeHost('tor-1', 'nxos'), FakeHost('tor-2', 'eos')]
+    assert unsupported_hosts(vrf_check, hosts) == ['tor-2']
+
+
+def test_read_binding_info(tmp_path):
+    binding = tmp_path / 'fake_check.py'
+    # binding is never imported, so missing imports don't matter
+    binding.write_text('import no_such_module\n'
+                       'DESCRIPTION = "Fake check"\n'
+                       'PARAMETERS = {"name": "Enter name"}\n')
+    info = read_binding_info(str(binding))
+    assert info.name == 'fake_check'
+    assert info.description == 'Fake check'
+    assert info.platforms == ()
+    assert unsupported_hosts(info, [FakeHost('tor-2', 'eos')]) == []
+    (tmp_path / '_helpers.py').write_text('')
+    assert list(get_bindings(str(tmp_path))) == ['fake_check']
+    binding.write_text('PLATFORMS = ("nxos",)\n')
+    stat = os.stat(str(binding))
+    os.utime(str(binding), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert get_binding('fake_check', str(tmp_path)).platforms == ('nxos',)
+    binding.write_text('PLATFORMS = get_platforms()\n')
+    with pytest.raises(MalformedBinding):
+        read_binding_info(str(binding))
+    binding.write_text('PLATFORMS = (\n')
+    with pytest.raises(MalformedBinding):
+        read_binding_info(str(binding))
@@ -129,6 +129,45 @@ def test_convert_mac_address():
             'bc3F-0a2B-1672') == 'bc:3f:0a:2b:16:72'
 
 
+def test_interface_brief_table():
+    cisco_table = check_interfaces.InterfaceBriefTable(
+            'nxos', get_file_contents('cisco_show_int_brief.txt'))
+    assert cisco_table.get('Ethernet1/31') is cisco_table.get('Eth1/31')
+    assert cisco_table.get('Ethernet1/31').lag == 'port-channel2'
+    assert cisco_table.get('Ethernet1/1/3').mode == 'switched'
+    assert cisco_table.get('port-channel1.3000').mode == 'routed'
+    assert cisco_table.get('Vlan1').admin_status == 'down'
+    # prefix of existing interfaces name must not match
+    assert cisco_table.get('Ethernet1/1') is None
+    assert 'Eth1/1' not in cisco_table
+    assert cisco_table.lags == {'port-channel2': ['Ethernet1/31'],
+                                'port-channel1': ['Ethernet1/32']}
+    huawei_table = check_interfaces.InterfaceBriefTable(
+            'huawei_vrpv8', get_file_contents('huawei_show_int_brief.txt'))
+    assert huawei_table.get('40GE1/0/1:1').oper_status == 'up'
+    assert huawei_table.get('40GE1/0/28:1').admin_status == 'down'
+    assert huawei_table.get('40GE1/0/18').lag == 'Eth-Trunk2'
+    assert huawei_table.get('Eth-Trunk1.3000').lag is None
+    assert huawei_table.get('NULL0').oper_status == 'up'
+
+
+def test_interface_brief_table_json():
+    text_table = check_interfaces.InterfaceBriefTable(
+            'nxos', get_file_contents('cisco_show_int_brief.txt'))
+    json_table = check_interfaces.InterfaceBriefTable(
+            'nxos', get_file_contents('cisco_show_int_brief.json'), 'json')
+    for name in ['Ethernet1/1/3', 'Eth1/11/2', 'Ethernet1/11/3',
+                 'Ethernet1/31', 'port-channel1.3000', 'Po2', 'Vlan1',
+                 'Vlan604', 'Vlan688']:
+        text_record = text_table.get(name)
+        json_record = json_table.get(name)
+        assert (json_record.admin_status, json_record.oper_status,
+                json_record.mode, json_record.lag) == (
+                    text_record.admin_status, text_record.oper_status,
+                    text_record.mode, text_record.lag)
+    assert json_table.lags == text_table.lags
+
+
 def test_check_interfaces_status_cisco(set_vendor_vars):
     vendor_vars = set_vendor_vars
     interfaces = {
@@ -148,6 +187,22 @@ def test_check_interfaces_status_cisco(set_vendor_vars):
     do_interface_checks(interfaces, interface_objects)
 
 
+def test_check_interfaces_status_cisco_json(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    fake_task = create_fake_task(
+            get_file_contents('cisco_show_int_brief.json'),
+            vendor_vars['Cisco Nexus'], None, 'nxos',
+            check_interfaces.check_interfaces_status)
+    fake_task.host['output_format'] = 'json'
+    interfaces = prepare_interfaces(fake_task, ['Ethernet1/22/2', 'Vlan604'])
+    check_interfaces.check_interfaces_status(fake_task)
+    assert (interfaces[0].admin_status, interfaces[0].oper_status) == (
+            'down', 'down')
+    assert (interfaces[1].admin_status, interfaces[1].oper_status) == (
+            'up', 'down')
+    assert fake_task.host['interfaces_brief'].output_format == 'json'
+
+
 def test_check_interfaces_status_huawei(set_vendor_vars):
     vendor_vars = set_vendor_vars
     interfaces = {
@@ -244,6 +299,48 @@ def test_check_arbitrary_interface(set_vendor_vars):
     assert len(fake_task.host['interfaces'][0].ipv6_addresses) == 3
 
 
+def test_get_interfaces_ip_addresses_bulk(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    outputs = [get_file_contents('cisco_show_ipv{}_int_vrf_all.txt'.format(
+        x)) for x in ('4', '6')]
+    task = create_fake_task(
+            None, vendor_vars['Cisco Nexus'], None, 'nxos',
+            check_interfaces.get_interfaces_ip_addresses, effect=outputs)
+    eth1_22_2_int, eth1_25_int, po1_3000_int, vlan604_int = \
+        prepare_interfaces(task, ['Ethernet1/22/2', 'Ethernet1/25',
+                                  'port-channel1.3000', 'Vlan604'])
+    check_interfaces.get_interfaces_ip_addresses(task, bulk=True)
+    # interfaces missing in outputs have no addresses
+    assert len(eth1_22_2_int.ipv4_addresses) == 0
+    assert len(eth1_22_2_int.ipv6_addresses) == 0
+    assert eth1_25_int.ipv4_addresses[0].address.exploded == '172.18.10.9'
+    assert len(eth1_25_int.ipv6_addresses) == 0
+    assert len(po1_3000_int.ipv4_addresses) == 3
+    assert po1_3000_int.ipv4_addresses[2].primary is False
+    assert len(po1_3000_int.ipv6_addresses) == 2
+    assert len(vlan604_int.ipv4_addresses) == 0
+    assert len(vlan604_int.ipv6_addresses) == 4
+    connection = task.host.get_connection('netmiko', None)
+    assert connection.send_command.call_count == 2
+    outputs = [get_file_contents('huawei_show_ipv{}_int_all.txt'.format(
+        x)) for x in ('4', '6')]
+    task = create_fake_task(
+            None, vendor_vars['Huawei CE'], None, 'huawei_vrpv8',
+            check_interfaces.get_interfaces_ip_addresses, effect=outputs)
+    int_40ge1_0_28_1, int_40ge1_0_32_4, int_vlanif1517, int_vlanif762 = \
+        prepare_interfaces(task, ['40GE1/0/28:1', '40GE1/0/32:4',
+                                  'Vlanif1517', 'Vlanif762'])
+    check_interfaces.get_interfaces_ip_addresses(task, bulk_threshold=1)
+    assert int_40ge1_0_28_1.ipv4_addresses[0].prefix_length == 24
+    assert len(int_40ge1_0_28_1.ipv6_addresses) == 0
+    assert len(int_40ge1_0_32_4.ipv4_addresses) == 0
+    assert len(int_40ge1_0_32_4.ipv6_addresses) == 3
+    assert len(int_vlanif1517.ipv4_addresses) == 3
+    assert len(int_vlanif1517.ipv6_addresses) == 0
+    assert len(int_vlanif762.ipv4_addresses) == 0
+    assert int_vlanif762.ipv6_addresses[1].prefix_length == 64
+
+
 def test_get_interfaces_ip_neighbors_cisco_no_neighbors(set_vendor_vars):
     vendor_vars = set_vendor_vars
     task = create_fake_task('placeholder', vendor_vars['Cisco Nexus'],
@@ -283,6 +380,73 @@ def test_get_interfaces_ip_neighbors_huawei(set_vendor_vars):
     assert int_vlanif761.ipv6_neighbors == 0
 
 
+def test_get_interfaces_ip_neighbors_bulk_cisco(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    file_name = 'cisco_show_ipv{}_neighbors_vrf_galaxy.txt'
+    outputs = [get_file_contents(file_name.format(x)) for x in ('4', '6')]
+    task = create_fake_task(
+            None, vendor_vars['Cisco Nexus'], 'Galaxy', 'nxos',
+            check_interfaces.get_interfaces_ip_neighbors, effect=outputs)
+    subinterface, svi, empty_svi = prepare_interfaces(
+            task, ['Ethernet1/31.3013', 'Vlan604', 'Vlan605'])
+    check_interfaces.get_interfaces_ip_neighbors(task, bulk_threshold=2)
+    assert subinterface.ipv4_neighbors == 5
+    assert subinterface.ipv6_neighbors == 3
+    assert svi.ipv4_neighbors == 3
+    assert svi.ipv6_neighbors == 1
+    assert empty_svi.ipv4_neighbors == 0
+    assert empty_svi.ipv6_neighbors == 0
+    connection = task.host.get_connection('netmiko', None)
+    assert connection.send_command.call_count == 2
+
+
+def test_get_interfaces_ip_neighbors_bulk_huawei(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    file_name = 'huawei_show_ipv{}_neighbors_vrf_lasers.txt'
+    outputs = [get_file_contents(file_name.format(x)) for x in ('4', '6')]
+    task = create_fake_task(
+            None, vendor_vars['Huawei CE'], 'Lasers', 'huawei_vrpv8',
+            check_interfaces.get_interfaces_ip_neighbors, effect=outputs)
+    subinterface, svi, idle_svi = prepare_interfaces(
+            task, ['100GE1/0/2.3000', 'Vlanif762', 'Vlanif761'])
+    check_interfaces.get_interfaces_ip_neighbors(task, bulk=True)
+    assert subinterface.ipv4_neighbors == 2
+    assert subinterface.ipv6_neighbors == 3
+    assert svi.ipv4_neighbors == 1
+    assert svi.ipv6_neighbors == 1
+    assert idle_svi.ipv4_neighbors == 0
+    assert idle_svi.ipv6_neighbors == 0
+
+
+def test_get_ip_neighbors(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    file_name = 'cisco_show_ipv{}_neighbors_vrf_galaxy.txt'
+    outputs = [get_file_contents(file_name.format(x)) for x in ('4', '6')]
+    task = create_fake_task(
+            None, vendor_vars['Cisco Nexus'], 'Galaxy', 'nxos',
+            check_interfaces.get_ip_neighbors, effect=outputs)
+    check_interfaces.get_ip_neighbors(task)
+    neighbors = task.host['ip_neighbors']
+    assert len(neighbors) == 11
+    assert ('192.168.139.254', '00:1b:21:a1:1a:0d', 'Ethernet1/31.3013',
+            'Galaxy') in neighbors
+    # long IPv6 address is wrapped on its own line
+    assert ('2a02:6b8:c0e:1200:5054:ff:fe12:3401', '52:54:00:12:34:01',
+            'Vlan604', 'Galaxy') in neighbors
+    file_name = 'huawei_show_ipv{}_neighbors_vrf_lasers.txt'
+    outputs = [get_file_contents(file_name.format(x)) for x in ('4', '6')]
+    task = create_fake_task(
+            None, vendor_vars['Huawei CE'], 'Lasers', 'huawei_vrpv8',
+            check_interfaces.get_ip_neighbors, effect=outputs)
+    check_interfaces.get_ip_neighbors(task)
+    neighbors = task.host['ip_neighbors']
+    assert len(neighbors) == 7
+    assert ('172.18.180.17', '0c:42:a1:b2:c3:d4', 'Vlanif762',
+            'Lasers') in neighbors
+    assert ('fe80::ee1:5', '0c:42:a1:b2:c3:d4', 'Vlanif762',
+            'Lasers') in neighbors
+
+
 def test_get_interfaces_mode_cisco(set_vendor_vars):
     vendor_vars = set_vendor_vars
     interfaces = {
@@ -39,3 +39,57 @@ def test_get_interfaces_macs(set_vendor_vars):
                                                            mode='routed')]
     check_mac_table.get_interfaces_macs(routing_int_task)
     assert routing_int_task.host['interfaces'][0].macs_learned == 0
+
+
+def test_index_mac_table():
+    cisco_index = check_mac_table.index_mac_table(
+            'nxos', get_file_contents('cisco_show_mac_table.txt'))
+    assert len(cisco_index) == 6
+    assert cisco_index.vlans[412] == 3
+    assert cisco_index.ports['Po2'] == 2
+    assert cisco_index.ports['Eth1/6/2'] == 2
+    huawei_index = check_mac_table.index_mac_table(
+            'huawei_vrpv8', get_file_contents('huawei_show_mac_table.txt'))
+    assert len(huawei_index) == 6
+    assert huawei_index.vlans[762] == 2
+    assert huawei_index.ports['10GE1/0/28'] == 4
+
+
+def test_get_interfaces_macs_bulk(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    cisco_task = create_fake_task(get_file_contents(
+            'cisco_show_mac_table.txt'), vendor_vars['Cisco Nexus'], None,
+            'nxos', check_mac_table.get_interfaces_macs)
+    check_mac_table.get_interfaces_macs(
+            cisco_task, interface_list=['Vlan412', 'Ethernet1/6/2',
+                                        'port-channel2', 'Ethernet1/15'],
+            bulk=True)
+    assert [x.macs_learned for x in cisco_task.host['interfaces']] == [
+            3, 2, 2, 0]
+    huawei_task = create_fake_task(get_file_contents(
+            'huawei_show_mac_table.txt'), vendor_vars['Huawei CE'], None,
+            'huawei_vrpv8', check_mac_table.get_interfaces_macs)
+    check_mac_table.get_interfaces_macs(
+            huawei_task, interface_list=['Vlanif762', '10GE1/0/28',
+                                         'Vlanif515'], bulk_threshold=2)
+    assert [x.macs_learned for x in huawei_task.host['interfaces']] == [
+            2, 4, 0]
+    connection = huawei_task.host.get_connection('netmiko', None)
+    assert connection.send_command.call_count == 1
+
+
+def test_get_mac_table(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    cisco_task = create_fake_task(get_file_contents(
+            'cisco_show_mac_table.txt'), vendor_vars['Cisco Nexus'], None,
+            'nxos', check_mac_table.get_mac_table)
+    check_mac_table.get_mac_table(cisco_task)
+    assert len(cisco_task.host['mac_table']) == 6
+    assert cisco_task.host['mac_table'][0] == ('00:15:b2:a9:90:16', 412,
+                                               'Eth1/2/2')
+    huawei_task = create_fake_task(get_file_contents(
+            'huawei_show_mac_table.txt'), vendor_vars['Huawei CE'], None,
+            'huawei_vrpv8', check_mac_table.get_mac_table)
+    check_mac_table.get_mac_table(huawei_task)
+    assert huawei_task.host['mac_table'][-1] == ('0c:42:a1:b2:c3:d5', 762,
+                                                 'Eth-Trunk1')
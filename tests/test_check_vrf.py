@@ -103,3 +103,101 @@ def test_check_vrf_bgp_neighbors(set_vendor_vars):
     v6 = huawei_v6_task.host['bgp_neighbors']['fe80::dd:a1'].af['ipv6']
     assert v6.learned_routes == 1980
     assert v6.sent_routes == 1982
+
+
+def test_check_vrf_bgp_neighbors_json(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    cisco_v6_task = create_fake_task(get_file_contents(
+        'cisco_show_bgp_ipv6_vrf_neighbors.json'), vendor_vars['Cisco Nexus'],
+        'Galaxy', 'nxos', check_vrf_status.check_vrf_bgp_neighbors)
+    cisco_v6_task.host['output_format'] = 'json'
+    check_vrf_status.check_vrf_bgp_neighbors(cisco_v6_task, af='v6')
+    connection = cisco_v6_task.host.get_connection('netmiko', None)
+    connection.send_command.assert_called_once_with(
+        'show bgp vrf Galaxy ipv6 unicast neighbors | json')
+    assert len(cisco_v6_task.host['bgp_neighbors']) == 2
+    neighbor = cisco_v6_task.host['bgp_neighbors']['fe80::152:12']
+    assert neighbor.state == 'established'
+    assert neighbor._type == 'external'
+    assert neighbor.as_number == '65001'
+    assert neighbor.router_id.compressed == '172.20.134.2'
+    assert neighbor.af['ipv4'] is None
+    assert neighbor.af['ipv6'].learned_routes == 1975
+    assert neighbor.af['ipv6'].sent_routes == 7
+    huawei_task = create_fake_task(None, vendor_vars['Huawei CE'], 'Galaxy',
+                                   'huawei_vrpv8',
+                                   check_vrf_status.check_vrf_bgp_neighbors)
+    huawei_task.host['output_format'] = 'json'
+    with pytest.raises(UnsupportedNOS):
+        check_vrf_status.check_vrf_bgp_neighbors(huawei_task, af='v6')
+
+
+def test_find_vrfs(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    task = create_fake_task(get_file_contents('cisco_show_vrf.txt'),
+                            vendor_vars['Cisco Nexus'], None, 'nxos',
+                            check_vrf_status.find_vrfs)
+    result = check_vrf_status.find_vrfs(task)
+    assert result.failed is False
+    # built-in VRFs are skipped
+    assert task.host['vrf_names'] == ['Stars', 'Lasers', 'Planets']
+    task = create_fake_task(get_file_contents('huawei_show_vrf.txt'),
+                            vendor_vars['Huawei CE'], None, 'huawei_vrpv8',
+                            check_vrf_status.find_vrfs)
+    check_vrf_status.find_vrfs(task)
+    assert task.host['vrf_names'] == ['Stars', 'Lasers', 'Planets']
+    task = create_fake_task('', vendor_vars['Huawei CE'], None,
+                            'huawei_vrpv8', check_vrf_status.find_vrfs)
+    assert check_vrf_status.find_vrfs(task).failed is True
+
+
+def test_get_all_vrf_interfaces(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    task = create_fake_task(get_file_contents(
+        'cisco_show_vrf_interfaces_all.txt'), vendor_vars['Cisco Nexus'],
+        None, 'nxos', check_vrf_status.get_all_vrf_interfaces)
+    task.host['vrf_names'] = ['Star', 'World', 'Lasers']
+    check_vrf_status.get_all_vrf_interfaces(task)
+    vrf_interfaces = task.host['vrf_interfaces']
+    assert vrf_interfaces['Star'].names == [
+        'Vlan215', 'Vlan416', 'Vlan999']
+    assert vrf_interfaces['World'].names == [
+        'Ethernet1/31.200', 'Ethernet1/32.144']
+    assert len(vrf_interfaces['Lasers']) == 0
+    # VRFs not asked for are skipped, interfaces are shared with VRF sets
+    assert len(task.host['interfaces']) == 5
+    assert task.host['interfaces'].get('Vlan416') is \
+        vrf_interfaces['Star'].get('Vlan416')
+    assert task.host['interfaces'].get('Vlan416').vrf == 'Star'
+    assert task.host['interfaces'].get('Vlan416').mode == 'routed'
+    task = create_fake_task(get_file_contents(
+        'huawei_show_vrf_interfaces_all.txt'), vendor_vars['Huawei CE'],
+        None, 'huawei_vrpv8', check_vrf_status.get_all_vrf_interfaces)
+    task.host['vrf_names'] = ['Star', 'Galaxy']
+    check_vrf_status.get_all_vrf_interfaces(task)
+    assert len(task.host['vrf_interfaces']['Star']) == 4
+    assert task.host['vrf_interfaces']['Galaxy'].names == [
+        'Vlanif516', '10GE1/0/32']
+
+
+def test_check_all_vrfs_bgp_neighbors(set_vendor_vars):
+    vendor_vars = set_vendor_vars
+    for nos, file_prefix, vendor, address in (
+            ('nxos', 'cisco', 'Cisco Nexus', 'fe80::162:15'),
+            ('huawei_vrpv8', 'huawei', 'Huawei CE', 'fe80::dd:a1')):
+        task = create_fake_task(get_file_contents(
+            '{}_show_bgp_ipv6_vrf_all_neighbors.txt'.format(file_prefix)),
+            vendor_vars[vendor], None, nos,
+            check_vrf_status.check_all_vrfs_bgp_neighbors)
+        task.host['vrf_names'] = ['Galaxy', 'Stars']
+        check_vrf_status.check_all_vrfs_bgp_neighbors(task, af='v6')
+        vrf_neighbors = task.host['vrf_bgp_neighbors']
+        # neighbors of VRFs not asked for are skipped
+        assert list(vrf_neighbors['Galaxy']) == [address]
+        assert vrf_neighbors['Stars'] == {}
+        neighbor = vrf_neighbors['Galaxy'][address]
+        assert neighbor.state == 'established'
+        assert neighbor.af['ipv6'].learned_routes
+        connection = task.host.get_connection('netmiko', None)
+        connection.send_command.assert_called_once_with(vendor_vars[vendor][
+            'show bgp ipv6 all neighbors'])
@@ -0,0 +1,40 @@
+from tests.helpers import create_fake_task
+from utils.command_cache import CommandCache, send_command
+from operations import check_interfaces
+
+
+def test_command_cache_hits_and_misses():
+    cache = CommandCache()
+    assert cache.get('show vrf') is None
+    cache.put('show vrf', 'output')
+    assert cache.get('show vrf') == 'output'
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_command_cache_ttl_and_size():
+    expired_cache = CommandCache(ttl=0)
+    expired_cache.put('show vrf', 'output')
+    assert expired_cache.get('show vrf') is None
+    assert len(expired_cache) == 0
+    small_cache = CommandCache(max_entries=2)
+    small_cache.put('show vrf', 'vrf output')
+    small_cache.put('show interface brief', 'brief output')
+    # touch first entry, so second one becomes least recently used
+    small_cache.get('show vrf')
+    small_cache.put('show ip arp', 'arp output')
+    assert len(small_cache) == 2
+    assert small_cache.get('show interface brief') is None
+    assert small_cache.get('show vrf') == 'vrf output'
+
+
+def test_send_command_cached():
+    task = create_fake_task('output', None, None, 'nxos',
+                            check_interfaces.check_interfaces_status)
+    connection = task.host.get_connection('netmiko', None)
+    assert send_command(task, 'show interface brief') == 'output'
+    assert send_command(task, 'show interface brief') == 'output'
+    assert connection.send_command.call_count == 1
+    send_command(task, 'show interface brief', use_cache=False)
+    assert connection.send_command.call_count == 2
+    assert task.host['command_cache'].hits == 1
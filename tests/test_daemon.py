@@ -0,0 +1,141 @@
+import getpass
+import threading
+import pytest
+from nornir.core.connections import Connections
+from nornir.core.task import Result
+from tests.helpers import FakeNetmiko, FakeNetmikoPlugin, write_nornir_config
+from bindings import tors_vrf_check
+from utils.command_cache import send_command
+from utils.daemon import (ConnectionPool, RunnerDaemon, RequestError,
+                          DaemonUnavailable, send_request)
+from utils.mac_index import InvalidMacAddress
+
+
+def fake_check_vrf(task, vrf_name):
+    assert 'vrf_name' not in task.host.keys()
+    task.host['vrf_name'] = vrf_name
+    output = send_command(task, 'display ip vpn-instance')
+    return Result(task.host, result='{} found: {}'.format(
+        vrf_name, vrf_name in output))
+
+
+@pytest.fixture
+def runner_daemon(tmp_path, monkeypatch):
+    conf = write_nornir_config(tmp_path, '''
+---
+huawei-dc2:
+  hostname: 10.2.2.2
+  platform: huawei_vrpv8
+''')
+    monkeypatch.setattr(getpass, 'getpass', lambda: 'secret')
+    daemon = RunnerDaemon(conf, str(tmp_path / 'daemon.sock'),
+                          username='admin')
+    # plugin is replaced after Nornir registered default ones
+    monkeypatch.setitem(Connections.available, 'netmiko', FakeNetmikoPlugin)
+    monkeypatch.setattr(tors_vrf_check, 'check_vrf', fake_check_vrf)
+    FakeNetmikoPlugin.opened = 0
+    FakeNetmikoPlugin.closed = 0
+    daemon.bind()
+    thread = threading.Thread(target=daemon.server.serve_forever,
+                              kwargs={'poll_interval': 0.1})
+    thread.start()
+    yield daemon
+    daemon.server.shutdown()
+    thread.join()
+    daemon.close()
+
+
+def test_connection_pool_eviction():
+    host = type('FakeHost', (), {})()
+    host.name = 'tor'
+    host.connections = {'netmiko': FakeNetmikoPlugin()}
+    host.connections['netmiko'].connection = FakeNetmiko()
+    host.close_connection = lambda x: host.connections.pop(x).close()
+    pool = ConnectionPool(idle_timeout=10)
+    pool.checkout(host)
+    # host in use is never evicted
+    assert pool.evict_idle(now=float('inf')) == []
+    pool.release(host)
+    assert len(pool) == 1
+    assert pool.evict_idle() == []
+    assert pool.evict_idle(now=float('inf')) == ['tor']
+    assert 'netmiko' not in host.connections
+    assert len(pool) == 0
+    # connection closed by device is dropped on checkout
+    host.connections['netmiko'] = FakeNetmikoPlugin()
+    host.connections['netmiko'].connection = FakeNetmiko()
+    host.connections['netmiko'].connection.alive = False
+    pool.checkout(host)
+    assert 'netmiko' not in host.connections
+    pool.release(host)
+
+
+def test_runner_daemon_requests(runner_daemon):
+    socket_path = runner_daemon.socket_path
+    assert send_request({'action': 'hosts', 'patterns': ['huawei-*']},
+                        socket_path)['hosts'] == ['huawei-dc2']
+    assert send_request({'action': 'hosts', 'patterns': ['cisco-dc1']},
+                        socket_path)['hosts'] == []
+    assert send_request({'action': 'hosts', 'filters': {
+        'platform': 'huawei_vrpv8'}}, socket_path)['hosts'] == ['huawei-dc2']
+    bindings = {x['name']: x for x in send_request(
+        {'action': 'bindings'}, socket_path)['bindings']}
+    assert bindings['tors_vrf_check']['parameters'] == {
+        'vrf_name': "Enter VRF name ('all' to check every VRF)"}
+    with pytest.raises(RequestError):
+        send_request({'action': 'run', 'hosts': ['cisco-dc1'],
+                      'binding': 'tors_vrf_check',
+                      'parameters': {'vrf_name': 'Lasers'}}, socket_path)
+    with pytest.raises(RequestError):
+        send_request({'action': 'run', 'hosts': ['huawei-dc2'],
+                      'binding': 'tors_vrf_check', 'parameters': {}},
+                     socket_path)
+    with pytest.raises(RequestError):
+        send_request({'action': 'reboot'}, socket_path)
+
+
+def test_runner_daemon_run(runner_daemon):
+    socket_path = runner_daemon.socket_path
+    for vrf_name in ('Lasers', 'Galaxy'):
+        response = send_request({'action': 'run', 'hosts': ['huawei-dc2'],
+                                 'binding': 'tors_vrf_check',
+                                 'parameters': {'vrf_name': vrf_name},
+                                 'workers': 2}, socket_path)
+        assert not response['results']['huawei-dc2']['failed']
+    assert response['results']['huawei-dc2']['result'] == \
+        'Galaxy found: False'
+    host = runner_daemon.nornir.inventory.hosts['huawei-dc2']
+    # connection is reused, but command is sent on every run
+    assert FakeNetmikoPlugin.opened == 1
+    assert len(host.connections['netmiko'].connection.commands) == 2
+    assert runner_daemon.pool.evict_idle(now=float('inf')) == ['huawei-dc2']
+    assert FakeNetmikoPlugin.closed == 1
+    # workers number is not leaked into daemon configuration
+    assert runner_daemon.nornir.config.core.num_workers == 1
+
+
+def test_runner_daemon_binding_error(runner_daemon, monkeypatch):
+    socket_path = runner_daemon.socket_path
+    request = {'action': 'run', 'hosts': ['huawei-dc2'],
+               'binding': 'tors_vrf_check',
+               'parameters': {'vrf_name': 'Lasers'}}
+    execute_binding = tors_vrf_check.execute
+    for exception, message in (
+            (InvalidMacAddress('bad MAC'), 'bad MAC'),
+            (KeyError('vrf_name'), "KeyError: 'vrf_name'")):
+        def execute(nornir, vrf_name):
+            raise exception
+        monkeypatch.setattr(tors_vrf_check, 'execute', execute)
+        with pytest.raises(RequestError, match=message):
+            send_request(request, socket_path)
+    # host is released after failed run
+    monkeypatch.setattr(tors_vrf_check, 'execute', execute_binding)
+    response = send_request(request, socket_path)
+    assert not response['results']['huawei-dc2']['failed']
+    with pytest.raises(RequestError, match='malformed request'):
+        send_request(['run'], socket_path)
+
+
+def test_send_request_no_daemon(tmp_path):
+    with pytest.raises(DaemonUnavailable):
+        send_request({'action': 'bindings'}, str(tmp_path / 'daemon.sock'))
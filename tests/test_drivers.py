@@ -0,0 +1,165 @@
+import io
+import pytest
+from app_exception import UnsupportedNOS
+from drivers import get_driver, register_driver, DRIVERS
+from drivers.base import BaseDriver
+from tests.helpers import get_file_contents
+
+NXOS_IDLE_NEIGHBOR = '''
+BGP neighbor is 10.0.0.9,  remote AS 65009, ibgp link,  Peer index 5
+  BGP version 4, remote router ID 0.0.0.0
+  BGP state = Idle, down for never
+  For address family: IPv4 Unicast
+  BGP table version 1, neighbor version 0
+  3 accepted paths consume 0 bytes of memory
+  4 sent paths
+'''
+
+
+def test_get_driver():
+    assert str(get_driver('nxos')) == 'Cisco NX-OS'
+    assert str(get_driver('huawei_vrpv8')) == 'Huawei VRPv8'
+    assert get_driver('nxos') is get_driver('nxos')
+    with pytest.raises(UnsupportedNOS):
+        get_driver('junos')
+    assert get_driver('nxos', 'json').output_format == 'json'
+    with pytest.raises(UnsupportedNOS):
+        get_driver('huawei_vrpv8', 'json')
+
+
+def test_register_driver():
+    @register_driver
+    class FakeDriver(BaseDriver):
+        platform = 'fake_nos'
+        nos_name = 'Fake NOS'
+        vendor_vars_key = 'Cisco Nexus'
+
+    try:
+        driver = get_driver('fake_nos')
+        assert driver.command('show vrf interfaces', 'Galaxy') == \
+            'show vrf Galaxy interface'
+        assert driver.mac_table_port_name('Ethernet1/1') == 'Ethernet1/1'
+    finally:
+        del DRIVERS[('fake_nos', 'text')]
+
+
+def test_driver_commands():
+    nxos = get_driver('nxos')
+    huawei = get_driver('huawei_vrpv8')
+    assert nxos.command('show interface', 'Ethernet1/1') == \
+        'show interface Ethernet1/1'
+    assert huawei.command('show interface', '10GE1/0/1') == \
+        'display interface 10GE1/0/1'
+    assert 'show interface transceiver detail' not in nxos.commands
+    assert 'show interface transceiver detail' in huawei.commands
+    nxos_json = get_driver('nxos', 'json')
+    assert nxos_json.command('show interfaces brief') == \
+        'show interface brief | json'
+    assert nxos_json.command('show bgp ipv6 all neighbors') == \
+        'show bgp vrf all ipv6 unicast neighbors | json'
+    assert nxos_json.command('show interface', 'Ethernet1/1') == \
+        'show interface Ethernet1/1'
+
+
+def test_driver_vrf_exists():
+    nxos = get_driver('nxos')
+    huawei = get_driver('huawei_vrpv8')
+    nxos_output = get_file_contents('cisco_show_vrf.txt')
+    huawei_output = get_file_contents('huawei_show_vrf.txt')
+    assert nxos.vrf_exists(nxos_output, 'Lasers')
+    assert not nxos.vrf_exists(nxos_output, 'Galaxy')
+    # VRF name is escaped, not treated as regular expression
+    assert not nxos.vrf_exists(nxos_output, 'La.ers')
+    assert huawei.vrf_exists(huawei_output, 'Lasers')
+    assert not huawei.vrf_exists(huawei_output, 'La.ers')
+
+
+def test_driver_breakout():
+    assert get_driver('nxos').is_breakout('Ethernet1/1/1')
+    assert not get_driver('nxos').is_breakout('Ethernet1/1')
+    assert get_driver('huawei_vrpv8').is_breakout('40GE1/0/1:1')
+    assert not get_driver('huawei_vrpv8').is_breakout('40GE1/0/1')
+
+
+def test_driver_parse_bgp_neighbors():
+    nxos = get_driver('nxos')
+    output = 'BGP neighbors for VRF Galaxy\n' + get_file_contents(
+        'cisco_show_bgp_ipv6_vrf_neighbors.txt') + NXOS_IDLE_NEIGHBOR
+    neighbors = list(nxos.parse_bgp_neighbors(output, 'v6'))
+    assert [x['address'] for x in neighbors] == [
+        'fe80::162:15', 'fe80::152:12', '10.0.0.9']
+    assert neighbors[1] == {
+        'address': 'fe80::152:12', 'vrf': None, 'state': 'established',
+        'as_number': '65001', 'router_id': '172.20.134.2',
+        'type': 'external', 'learned_routes': 1975, 'sent_routes': 7}
+    # routes of other address family are not counted
+    assert neighbors[2]['state'] == 'idle'
+    assert neighbors[2]['type'] == 'internal'
+    assert neighbors[2]['learned_routes'] == 0
+    assert list(nxos.parse_bgp_neighbors(output, 'v4'))[2][
+        'sent_routes'] == 4
+    # output is consumed from any iterable of lines, like streaming reader
+    assert list(nxos.parse_bgp_neighbors(io.StringIO(output), 'v6')) == \
+        neighbors
+    assert list(nxos.parse_bgp_neighbors('', 'v6')) == []
+    huawei = get_driver('huawei_vrpv8')
+    output = get_file_contents('huawei_show_bgp_ipv6_vrf_neighbors.txt')
+    neighbors = list(huawei.parse_bgp_neighbors(
+        io.StringIO(output), 'v6'))
+    assert neighbors == list(huawei.parse_bgp_neighbors(output, 'v6'))
+    assert neighbors[0] == {
+        'address': 'FE80::DD:A1', 'vrf': None, 'state': 'established',
+        'as_number': '65012', 'router_id': '172.24.16.1',
+        'type': 'external', 'learned_routes': 1980, 'sent_routes': 1982}
+    assert len(neighbors) == 2
+
+
+def test_driver_parse_bgp_neighbors_all_vrfs():
+    for platform, file_name, addresses in (
+            ('nxos', 'cisco_show_bgp_ipv6_vrf_all_neighbors.txt',
+             ['fe80::162:15', 'fe80::152:12']),
+            ('huawei_vrpv8', 'huawei_show_bgp_ipv6_vrf_all_neighbors.txt',
+             ['FE80::DD:A1', 'FE80::DD:A2'])):
+        driver = get_driver(platform)
+        output = get_file_contents(file_name)
+        neighbors = list(driver.parse_bgp_neighbors(output, 'v6'))
+        assert [(x['address'], x['vrf']) for x in neighbors] == list(
+            zip(addresses, ['Galaxy', 'Lasers']))
+        assert neighbors[1]['sent_routes'] and neighbors[1]['state']
+        assert list(driver.parse_bgp_neighbors(
+            io.StringIO(output), 'v6')) == neighbors
+
+
+def test_driver_parse_vrf_names():
+    nxos = get_driver('nxos')
+    assert nxos.parse_vrf_names(get_file_contents('cisco_show_vrf.txt')) == [
+        'Stars', 'Lasers', 'Planets', 'default', 'management']
+    assert nxos.builtin_vrfs == ('default', 'management')
+    huawei = get_driver('huawei_vrpv8')
+    assert huawei.parse_vrf_names(get_file_contents(
+        'huawei_show_vrf.txt')) == ['Stars', 'Lasers', 'Planets']
+    assert huawei.parse_vrf_names('') == []
+
+
+def test_driver_iter_interface_blocks():
+    nxos = get_driver('nxos')
+    blocks = dict(nxos.iter_interface_blocks(get_file_contents(
+        'cisco_show_ipv6_int_vrf_all.txt')))
+    assert list(blocks) == ['Vlan604', 'port-channel1.3000']
+    assert nxos.parse_ipv6_addresses(blocks['Vlan604'])[0] == (
+        '2001:db8:164:16::34', '64', None)
+    huawei = get_driver('huawei_vrpv8')
+    blocks = dict(huawei.iter_interface_blocks(get_file_contents(
+        'huawei_show_ipv4_int_all.txt')))
+    assert list(blocks) == ['Vlanif1517', '40GE1/0/28:1', 'Vlanif762']
+    assert huawei.parse_ipv4_addresses(blocks['40GE1/0/28:1']) == [
+        ('192.168.13.13', '24', '')]
+
+
+def test_driver_parse_config_checkpoint():
+    assert get_driver('nxos').parse_config_checkpoint(get_file_contents(
+        'cisco_show_config_checkpoint.txt')) == '7443'
+    huawei = get_driver('huawei_vrpv8')
+    assert huawei.parse_config_checkpoint(get_file_contents(
+        'huawei_show_config_checkpoint.txt')) == '1000000283'
+    assert huawei.parse_config_checkpoint('') is None
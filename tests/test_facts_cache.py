@@ -0,0 +1,93 @@
+from tests.helpers import create_fake_task, get_file_contents
+from operations import check_interfaces, check_vrf_status
+from utils.facts_cache import load_facts, get_host_facts
+
+
+def create_cached_task(vendor_vars, func, outputs, tmp_path, ttl=None):
+    '''Create fake Huawei task with facts cache enabled; probe output is
+    answered first.'''
+    task = create_fake_task(
+        None, vendor_vars['Huawei CE'], 'Star', 'huawei_vrpv8', func,
+        effect=outputs)
+    task.host['facts_cache'] = True
+    task.host['facts_cache_dir'] = str(tmp_path)
+    if ttl is not None:
+        task.host['facts_cache_ttl'] = ttl
+    return task
+
+
+def sent_commands(task):
+    return [x[0][0] for x in task.host.get_connection(
+        'netmiko', None).send_command.call_args_list]
+
+
+def test_load_facts(tmp_path):
+    facts = load_facts('tor-1', '1000000283', cache_dir=str(tmp_path))
+    assert facts.get('vrf_bindings') is None
+    facts.put('vrf_bindings', {'Vlanif761': 'Lasers'})
+    facts = load_facts('tor-1', '1000000283', cache_dir=str(tmp_path))
+    assert facts.get('vrf_bindings') == {'Vlanif761': 'Lasers'}
+    assert (facts.hits, facts.misses) == (1, 0)
+    # facts of other hosts, other checkpoints or expired ones are not used
+    assert load_facts('tor-2', '1000000283',
+                      cache_dir=str(tmp_path)).facts == {}
+    assert load_facts('tor-1', '1000000284',
+                      cache_dir=str(tmp_path)).facts == {}
+    assert load_facts('tor-1', '1000000283', ttl=0,
+                      cache_dir=str(tmp_path)).facts == {}
+    # facts learned at unknown checkpoint are never written
+    facts = load_facts('tor-3', None, cache_dir=str(tmp_path))
+    facts.put('vrf_bindings', {})
+    assert load_facts('tor-3', None, cache_dir=str(tmp_path)).facts == {}
+
+
+def test_get_host_facts_disabled(set_vendor_vars):
+    task = create_fake_task(None, set_vendor_vars['Huawei CE'], None,
+                            'huawei_vrpv8', get_host_facts)
+    assert get_host_facts(task) is None
+    assert sent_commands(task) == []
+
+
+def test_sanitize_interface_list_cached(set_vendor_vars, tmp_path):
+    probe = get_file_contents('huawei_show_config_checkpoint.txt')
+    outputs = [probe, get_file_contents('huawei_show_int_eth_trunk0.txt'),
+               '''"^\nError: Wrong parameter found at '^' position."''']
+    task = create_cached_task(set_vendor_vars,
+                              check_interfaces.sanitize_interface_list,
+                              outputs, tmp_path)
+    check_interfaces.sanitize_interface_list(task, 'Eth-Trunk0, 24GE1/77')
+    assert len(sent_commands(task)) == 3
+    # the next run only probes configuration checkpoint
+    task = create_cached_task(set_vendor_vars,
+                              check_interfaces.sanitize_interface_list,
+                              [probe], tmp_path)
+    check_interfaces.sanitize_interface_list(task, 'Eth-Trunk0, 24GE1/77')
+    assert sent_commands(task) == ['display configuration commit list 1']
+    assert [x.name for x in task.host['interfaces']] == ['Eth-Trunk0']
+    assert str(task.host['facts']).endswith('1 hits, 0 misses')
+    # changed configuration makes names to be checked again
+    task = create_cached_task(set_vendor_vars,
+                              check_interfaces.sanitize_interface_list,
+                              [probe.replace('283', '284'), outputs[1]],
+                              tmp_path)
+    check_interfaces.sanitize_interface_list(task, 'Eth-Trunk0')
+    assert len(sent_commands(task)) == 2
+
+
+def test_get_vrf_interfaces_cached(set_vendor_vars, tmp_path):
+    probe = get_file_contents('huawei_show_config_checkpoint.txt')
+    output = get_file_contents('huawei_vrf_interfaces_present.txt')
+    task = create_cached_task(set_vendor_vars,
+                              check_vrf_status.get_vrf_interfaces,
+                              [probe, output], tmp_path)
+    expected = check_vrf_status.get_vrf_interfaces(task).result
+    # expired facts are learned again
+    task = create_cached_task(set_vendor_vars,
+                              check_vrf_status.get_vrf_interfaces,
+                              [probe, output], tmp_path, ttl=0)
+    assert check_vrf_status.get_vrf_interfaces(task).result == expected
+    task = create_cached_task(set_vendor_vars,
+                              check_vrf_status.get_vrf_interfaces,
+                              [probe], tmp_path)
+    assert check_vrf_status.get_vrf_interfaces(task).result == expected
+    assert len(sent_commands(task)) == 1
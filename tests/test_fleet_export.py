@@ -0,0 +1,122 @@
+import csv
+import sqlite3
+import pytest
+from nornir.core.inventory import Host
+from utils.switch_objects import (SwitchInterface, IPAddress, BGPNeighbor,
+                                  AddressFamily, VlanSet)
+from utils.fleet_export import (export_fleet, collect_rows, TABLES,
+                                ExportException)
+
+
+def create_hosts():
+    trunk = SwitchInterface('Eth1/1')
+    trunk.oper_status = 'up'
+    trunk.switch_mode = 'trunk'
+    trunk.pvid = 1
+    trunk.vlan_list = VlanSet.from_string('1,512,600')
+    trunk.macs_learned = 0
+    svi = SwitchInterface('Vlan512')
+    svi.ipv4_addresses = [IPAddress('10.0.0.1', 24),
+                          IPAddress('10.0.1.1', 24, secondary=True)]
+    svi.ipv6_addresses = [IPAddress('2001:db8::1', 64)]
+    established = BGPNeighbor('10.0.0.2')
+    established.state = 'established'
+    established.as_number = 65001
+    established.router_id = established.address
+    established._type = 'external'
+    established.af['ipv4'] = AddressFamily('v4')
+    established.af['ipv4'].learned_routes = 10
+    established.af['ipv6'] = AddressFamily('v6')
+    idle = BGPNeighbor('10.0.0.3')
+    idle.state = 'idle'
+    tor_1 = Host('tor-1', data={
+        'interfaces': [trunk, svi], 'vrf_name': 'Lasers',
+        'bgp_neighbors': {'10.0.0.2': established, '10.0.0.3': idle}})
+    tor_2 = Host('tor-2', data={'interfaces': [SwitchInterface('Eth1/2')]})
+    return [tor_1, tor_2, Host('tor-3')]
+
+
+def test_collect_rows():
+    tables = collect_rows(create_hosts(), snapshot='s1')
+    assert {x: len(y) for x, y in tables.items()} == {
+        'interfaces': 3, 'interface_addresses': 3, 'interface_vlans': 3,
+        'bgp_neighbors': 3, 'record_hashes': 5}
+    for table, rows in tables.items():
+        assert all(len(x) == len(TABLES[table]) for x in rows)
+    trunk = dict(zip([x for x, _ in TABLES['interfaces']],
+                     tables['interfaces'][0]))
+    assert trunk['host'] == 'tor-1'
+    assert trunk['switch_mode'] == 'trunk'
+    assert trunk['lag'] == 0
+    assert trunk['vlan_list'] == '1,512,600'
+    # attributes not gathered by binding are left empty
+    assert trunk['description'] is None
+    assert ('s1', 'tor-1', 'Lasers', '10.0.0.3', None, None, None, 'idle',
+            None, None, None) in tables['bgp_neighbors']
+    assert ('s1', 'tor-1', 'Lasers', '10.0.0.2', 65001, '10.0.0.2',
+            'external', 'established', 'ipv6 unicast', 0, 0) in tables[
+                'bgp_neighbors']
+
+
+def test_export_sqlite(tmp_path):
+    database = str(tmp_path / 'fleet.db')
+    export_fleet(create_hosts(), database, snapshot='s1')
+    export_fleet(create_hosts(), database, snapshot='s2')
+    connection = sqlite3.connect(database)
+    rows = connection.execute('''
+        SELECT i.snapshot, i.host, i.interface FROM interfaces i
+        JOIN interface_vlans v ON (v.snapshot, v.host, v.interface) =
+            (i.snapshot, i.host, i.interface)
+        WHERE v.vlan = 512 AND i.switch_mode = 'trunk' AND
+            i.macs_learned = 0
+        ORDER BY i.snapshot''').fetchall()
+    assert rows == [('s1', 'tor-1', 'Eth1/1'), ('s2', 'tor-1', 'Eth1/1')]
+    assert connection.execute(
+        'SELECT address FROM interface_addresses WHERE "primary" = 0 AND '
+        'version = 4').fetchall() == [('10.0.1.1',), ('10.0.1.1',)]
+    connection.close()
+
+
+def test_export_sqlite_old_schema(tmp_path):
+    database = str(tmp_path / 'fleet.db')
+    connection = sqlite3.connect(database)
+    # interfaces table as exported before VLAN lists were added
+    connection.execute('CREATE TABLE interfaces ({})'.format(', '.join(
+        '"{}" {}'.format(x, y) for x, y in TABLES['interfaces']
+        if x != 'vlan_list')))
+    connection.execute('INSERT INTO interfaces (snapshot, host, interface) '
+                       'VALUES (?, ?, ?)', ('s0', 'tor-1', 'Eth1/1'))
+    connection.commit()
+    export_fleet(create_hosts(), database, snapshot='s1')
+    assert connection.execute(
+        'SELECT snapshot, vlan_list, switch_mode FROM interfaces WHERE '
+        'interface = ? ORDER BY snapshot', ('Eth1/1',)).fetchall() == [
+            ('s0', None, None), ('s1', '1,512,600', 'trunk')]
+    connection.close()
+
+
+def test_export_csv(tmp_path):
+    export_fleet(create_hosts(), str(tmp_path), 'csv', snapshot='s1')
+    export_fleet(create_hosts(), str(tmp_path), 'csv', snapshot='s2')
+    with open(str(tmp_path / 'bgp_neighbors.csv'), newline='') as in_file:
+        rows = list(csv.DictReader(in_file))
+    assert len(rows) == 6
+    assert {x['snapshot'] for x in rows} == {'s1', 's2'}
+    assert rows[0]['vrf'] == 'Lasers'
+    with pytest.raises(ExportException):
+        export_fleet(create_hosts(), str(tmp_path), 'xlsx')
+    # files written by another version are left intact
+    header = ','.join(x for x, _ in TABLES['interfaces'] if x != 'vlan_list')
+    (tmp_path / 'interfaces.csv').write_text(header + '\n')
+    with pytest.raises(ExportException):
+        export_fleet(create_hosts(), str(tmp_path), 'csv', snapshot='s3')
+    with open(str(tmp_path / 'bgp_neighbors.csv'), newline='') as in_file:
+        assert len(list(csv.DictReader(in_file))) == 6
+
+
+def test_export_parquet(tmp_path):
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+    export_fleet(create_hosts(), str(tmp_path), 'parquet', snapshot='s1')
+    table = pyarrow.parquet.read_table(str(tmp_path / 'interface_vlans'))
+    assert table.column('vlan').to_pylist() == [1, 512, 600]
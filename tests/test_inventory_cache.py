@@ -0,0 +1,79 @@
+import os
+import pytest
+from ruamel.yaml.scanner import ScannerError
+from utils import inventory_cache
+from utils.inventory_cache import load_yaml, snapshot_path, get_hosts
+from utils.cached_inventory import init_nornir
+
+
+@pytest.fixture
+def count_parses(monkeypatch):
+    parses = []
+    parse_yaml = inventory_cache.parse_yaml
+
+    def counting_parse_yaml(path):
+        parses.append(path)
+        return parse_yaml(path)
+
+    monkeypatch.setattr(inventory_cache, 'parse_yaml', counting_parse_yaml)
+    return parses
+
+
+def test_load_yaml_snapshot(tmp_path, tmp_inventory_cache, count_parses):
+    hosts = tmp_path / 'hosts.yml'
+    hosts.write_text('tor-1:\n  hostname: 10.1.1.1\n')
+    assert load_yaml(str(hosts)) == {'tor-1': {'hostname': '10.1.1.1'}}
+    assert os.path.exists(snapshot_path(str(hosts)))
+    assert os.path.dirname(snapshot_path(str(hosts))) == str(
+        tmp_inventory_cache)
+    assert load_yaml(str(hosts)) == {'tor-1': {'hostname': '10.1.1.1'}}
+    assert len(count_parses) == 1
+    # touched file with the same contents is not parsed again
+    stat = os.stat(str(hosts))
+    os.utime(str(hosts), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_yaml(str(hosts)) == {'tor-1': {'hostname': '10.1.1.1'}}
+    assert len(count_parses) == 1
+    with open(str(hosts), 'a') as f:
+        f.write('tor-2:\n  hostname: 10.1.1.2\n')
+    assert list(load_yaml(str(hosts))) == ['tor-1', 'tor-2']
+    assert len(count_parses) == 2
+
+
+def test_load_yaml_corrupted(tmp_path):
+    hosts = tmp_path / 'hosts.yml'
+    hosts.write_text('tor-1:\n  hostname: 10.1.1.1\n')
+    load_yaml(str(hosts))
+    hosts.write_text('tor-1:\n\thostname: 10.1.1.1\n')
+    with pytest.raises(ScannerError):
+        load_yaml(str(hosts))
+    # snapshot of broken file is never written, so error is raised again
+    with pytest.raises(ScannerError):
+        load_yaml(str(hosts))
+    with open(snapshot_path(str(hosts)), 'wb') as snapshot:
+        snapshot.write(b'garbage')
+    hosts.write_text('tor-1:\n  hostname: 10.1.1.1\n')
+    assert load_yaml(str(hosts)) == {'tor-1': {'hostname': '10.1.1.1'}}
+
+
+def test_init_nornir_cached(tmp_path, count_parses):
+    conf = tmp_path / 'conf.yml'
+    hosts = tmp_path / 'hosts.yml'
+    groups = tmp_path / 'groups.yml'
+    conf.write_text('''
+---
+core:
+    num_workers: 7
+inventory:
+  plugin: nornir.plugins.inventory.simple.SimpleInventory
+  options:
+    host_file: "{}"
+    group_file: "{}"
+'''.format(hosts, groups))
+    hosts.write_text('tor-1:\n  hostname: 10.1.1.1\n  groups: [tors]\n')
+    groups.write_text('tors:\n  data:\n    role: tor_switch\n')
+    assert list(get_hosts(str(conf))) == ['tor-1']
+    nornir = init_nornir(str(conf))
+    assert nornir.config.core.num_workers == 7
+    assert nornir.inventory.hosts['tor-1']['role'] == 'tor_switch'
+    # config, hosts and groups are parsed once
+    assert len(count_parses) == 3
@@ -0,0 +1,97 @@
+import json
+import socket
+import threading
+import pytest
+from click.testing import CliRunner
+from utils import runner, inventory_import
+from utils.inventory_import import (DNSCache, read_import_file, prepare_hosts,
+                                    MalformedImportFile)
+
+
+class FakeDNS:
+    def __init__(self):
+        self.lookups = []
+        self.lock = threading.Lock()
+
+    def __call__(self, name):
+        with self.lock:
+            self.lookups.append(name)
+        if name.endswith('.grt.dc'):
+            return '10.9.9.{}'.format(len(name))
+        raise socket.gaierror('Name or service not known')
+
+
+def test_dns_cache():
+    dns = FakeDNS()
+    cache = DNSCache(dns)
+    assert cache.resolve('tor.grt.dc') == '10.9.9.10'
+    assert cache.resolve('tor.grt.dc') == '10.9.9.10'
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            cache.resolve('tor.nowhere')
+    assert dns.lookups == ['tor.grt.dc', 'tor.nowhere']
+    assert len(cache) == 2
+
+
+def test_read_import_file(tmp_path):
+    csv_file = tmp_path / 'hosts.csv'
+    csv_file.write_text('hostname,address,groups\n'
+                        'tor-1,10.1.1.1,"dc_1, cisco_tors"\n')
+    assert read_import_file(str(csv_file)) == [(2, {
+        'hostname': 'tor-1', 'address': '10.1.1.1',
+        'groups': 'dc_1, cisco_tors'})]
+    jsonl_file = tmp_path / 'hosts.jsonl'
+    jsonl_file.write_text(json.dumps({'hostname': 'tor-1', 'address': 'grt.dc',
+                                      'groups': ['dc_1']}) + '\n\n')
+    assert read_import_file(str(jsonl_file))[0][1]['groups'] == ['dc_1']
+    jsonl_file.write_text('{"hostname": "tor-1"}\n')
+    with pytest.raises(MalformedImportFile):
+        read_import_file(str(jsonl_file))
+    jsonl_file.write_text('{"hostname"\n')
+    with pytest.raises(MalformedImportFile):
+        read_import_file(str(jsonl_file))
+
+
+def test_prepare_hosts(tmp_inventory_files):
+    dns = FakeDNS()
+    records = [
+        (2, {'hostname': 'tor-1', 'address': 'grt.dc', 'groups': 'dc_1'}),
+        (3, {'hostname': 'tor-2', 'address': '10.1.1.2',
+             'groups': ['dc_2', 'huawei_tors']}),
+        (4, {'hostname': 'tor-3', 'address': 'grt.dc', 'groups': 'dc_3'}),
+        (5, {'hostname': 'cisco-dc1', 'address': 'grt.dc', 'groups': 'dc_1'}),
+        (6, {'hostname': 'tor-4', 'address': 'nowhere', 'groups': 'dc_1'}),
+        (7, {'hostname': 'tor-1', 'address': 'grt.dc', 'groups': 'dc_1'})]
+    hosts, errors = prepare_hosts(tmp_inventory_files, records, DNSCache(dns),
+                                  workers=4)
+    assert hosts == {
+        'tor-1': {'hostname': '10.9.9.12', 'groups': ['dc_1']},
+        'tor-2': {'hostname': '10.1.1.2', 'groups': ['dc_2', 'huawei_tors']}}
+    assert [x.split(':')[0] for x in errors] == [
+        'line 4', 'line 5', 'line 7', 'line 6']
+    assert sorted(dns.lookups) == ['tor-1.grt.dc', 'tor-4.nowhere']
+
+
+def test_import_command(tmp_inventory_files, tmp_path, monkeypatch):
+    monkeypatch.setattr(inventory_import, 'DNSCache',
+                        lambda: DNSCache(FakeDNS()))
+    config = str(tmp_inventory_files)
+    import_file = tmp_path / 'import.csv'
+    import_file.write_text('hostname,address,groups\n'
+                           'tor-1,grt.dc,dc_1\n'
+                           'tor-2,10.1.1.2,"dc_2,huawei_tors"\n'
+                           'tor-3,nowhere,dc_1\n')
+    cli = CliRunner()
+    result = cli.invoke(inventory_import.main,
+                        ['-c', config, str(import_file)])
+    assert result.exit_code == 1
+    assert 'Nothing added' in result.output
+    assert not runner.is_in_inventory(config, 'tor-1')
+    result = cli.invoke(inventory_import.main,
+                        ['-c', config, '--skip-errors', str(import_file)])
+    assert result.exit_code == 0
+    assert '2 hosts added' in result.output
+    assert runner.is_in_inventory(config, 'tor-1')
+    assert runner.is_in_inventory(config, 'tor-2')
+    assert runner.is_in_inventory(config, 'cisco-dc1')
+    runner.check_config(config)
@@ -0,0 +1,101 @@
+import pytest
+from nornir.core.connections import Connections
+from nornir import InitNornir
+from tests.helpers import FakeNetmiko, FakeNetmikoPlugin, write_nornir_config
+from utils import mac_index
+from utils.mac_index import MacIndexDependencyMissing
+from utils.ip_index import IPIndex, InvalidIPAddress, parse_ip_address
+
+HOSTS = '''
+---
+tor-1:
+  hostname: 10.1.1.1
+  platform: nxos
+  data:
+    vrf_name: Galaxy
+tor-2:
+  hostname: 10.1.1.2
+  platform: huawei_vrpv8
+  data:
+    vrf_name: Lasers
+'''
+ENTRIES = [
+    ('tor-1', '10.12.60.2', '52:54:00:12:34:01', 'Vlan604', 'Galaxy'),
+    ('tor-1', '10.12.60.3', '52:54:00:12:34:02', 'Vlan604', 'Galaxy'),
+    ('tor-2', '10.12.60.2', '0c:42:a1:b2:c3:d4', 'Vlanif762', 'Lasers'),
+    ('tor-1', '2a02:6b8:c0e:1200:5054:ff:fe12:3401', '52:54:00:12:34:01',
+     'Vlan604', 'Galaxy'),
+    ('tor-1', '2a02:6b8:c0e:1200::1', '52:54:00:12:34:02', 'Vlan604',
+     'Galaxy'),
+    ('tor-2', '2a02:6b8::1', '0c:42:a1:b2:c3:d4', 'Vlanif762', None),
+]
+
+
+def test_parse_ip_address():
+    assert parse_ip_address(' 2A02:6B8::1 ').compressed == '2a02:6b8::1'
+    with pytest.raises(InvalidIPAddress):
+        parse_ip_address('10.0.0.256')
+
+
+def test_numpy_missing(monkeypatch):
+    monkeypatch.setattr(mac_index, 'numpy', None)
+    with pytest.raises(MacIndexDependencyMissing):
+        IPIndex(ENTRIES)
+
+
+def test_ip_index():
+    pytest.importorskip('numpy')
+    index = IPIndex(ENTRIES)
+    assert len(index) == 6
+    assert [(x.host, x.mac, x.vrf) for x in index.locate('10.12.60.2')] == [
+        ('tor-1', '52:54:00:12:34:01', 'Galaxy'),
+        ('tor-2', '0c:42:a1:b2:c3:d4', 'Lasers')]
+    assert len(index.locate('10.12.60.2', vrf_name='Lasers')) == 1
+    assert index.locate('10.12.60.4') == []
+    location, = index.locate('2a02:6b8:c0e:1200::1')
+    assert location.mac == '52:54:00:12:34:02'
+    assert location.ports == []
+    location, = index.locate('2a02:6b8::1')
+    assert location.vrf is None
+    assert index.locate('2a02:6b8:c0e:1200::2') == []
+    macs = mac_index.MacIndex([('tor-1', '5254.0012.3402', 604, 'Po2')])
+    location, = index.locate('10.12.60.3', macs)
+    assert location.ports == [('52:54:00:12:34:02', 'tor-1', 'Po2', 604)]
+    assert IPIndex().locate('10.12.60.2') == []
+
+
+def test_ip_locator(tmp_path, monkeypatch, capsys):
+    pytest.importorskip('numpy')
+    from bindings import ip_locator
+    monkeypatch.setitem(Connections.available, 'netmiko', FakeNetmikoPlugin)
+    monkeypatch.setattr('nornir.init_nornir.register_default_connection_'
+                        'plugins', lambda: None)
+    monkeypatch.setattr(FakeNetmiko, 'outputs', {
+        'show ip arp vrf Galaxy': 'cisco_show_ipv4_neighbors_vrf_galaxy.txt',
+        'show ipv6 neighbor vrf Galaxy':
+            'cisco_show_ipv6_neighbors_vrf_galaxy.txt',
+        'display arp vpn-instance Lasers':
+            'huawei_show_ipv4_neighbors_vrf_lasers.txt',
+        'display ipv6 neighbors vpn-instance Lasers':
+            'huawei_show_ipv6_neighbors_vrf_lasers.txt',
+        'show mac address-table': 'cisco_show_mac_table.txt',
+        'display mac-address': 'huawei_show_mac_table.txt'})
+    nrnr = InitNornir(config_file=write_nornir_config(tmp_path, HOSTS))
+    result = ip_locator.execute(nrnr, ip_address='10.12.60.2')
+    assert not result.failed_hosts
+    # report is returned, not printed out
+    assert capsys.readouterr().out == ''
+    report = result['tor-1'][0].result
+    assert report.startswith('10.12.60.2 found in ARP/ND or MAC tables:\n')
+    assert ('10.12.60.2 (52:54:00:12:34:01) resolved on tor-1 interface '
+            'Vlan604, VRF Galaxy') in report
+    assert 'learned on tor-1 port Po2, VLAN 604' in report
+    assert result['tor-2'][0].result == \
+        '10.12.60.2 not found in ARP/ND or MAC tables'
+    result = ip_locator.execute(nrnr, ip_address='fe80::ee1:5')
+    assert 'learned on tor-2 port Eth-Trunk1, VLAN 762' in \
+        result['tor-2'][0].result
+    result = ip_locator.execute(nrnr, ip_address='10.0.0.1')
+    assert [x[0].result for x in result.values()] == [
+        '10.0.0.1 not found in ARP/ND or MAC tables'] * 2
+    assert 'ip_neighbors' not in nrnr.inventory.hosts['tor-1'].data
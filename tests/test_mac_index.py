@@ -0,0 +1,103 @@
+import pytest
+from nornir.core.connections import Connections
+from nornir import InitNornir
+from tests.helpers import FakeNetmiko, FakeNetmikoPlugin, write_nornir_config
+from utils import mac_index
+from utils.mac_index import (parse_mac_prefix, mac_to_int, int_to_mac,
+                             InvalidMacAddress, MacIndexDependencyMissing)
+
+HOSTS = '''
+---
+tor-1:
+  hostname: 10.1.1.1
+  platform: nxos
+  data:
+    uplinks: [Po2]
+tor-2:
+  hostname: 10.1.1.2
+  platform: nxos
+tor-3:
+  hostname: 10.1.1.3
+  platform: huawei_vrpv8
+'''
+ENTRIES = [
+    ('tor-1', '00:15:b2:aa:06:c6', 412, 'Eth1/6/2'),
+    ('tor-1', '00:15:b2:aa:06:c6', 741, 'Eth1/6/2'),
+    ('tor-2', '00:15:b2:aa:06:c6', 412, '10GE1/0/1'),
+    ('tor-1', '52:54:00:12:34:01', 604, 'Po2'),
+    ('tor-2', '52:54:00:12:34:01', 604, 'Eth-Trunk1'),
+    ('tor-2', 'e0:d5:5e:19:49:b4', 15, '10GE1/0/28'),
+]
+
+
+def test_parse_mac_address():
+    assert parse_mac_prefix('E0-D5-5E') == (0xe0d55e, 24)
+    assert mac_to_int('e0d5.5e19.49b4') == mac_to_int('e0:d5:5e:19:49:b4')
+    assert int_to_mac(mac_to_int('e0d5-5e19-49b4')) == 'e0:d5:5e:19:49:b4'
+    for bad in ('', 'zz:00', 'e0d5.5e19.49b4.00'):
+        with pytest.raises(InvalidMacAddress):
+            parse_mac_prefix(bad)
+    with pytest.raises(InvalidMacAddress):
+        mac_to_int('e0:d5:5e')
+
+
+def test_numpy_missing(monkeypatch):
+    monkeypatch.setattr(mac_index, 'numpy', None)
+    with pytest.raises(MacIndexDependencyMissing):
+        mac_index.MacIndex(ENTRIES)
+
+
+def test_mac_index():
+    pytest.importorskip('numpy')
+    index = mac_index.MacIndex(ENTRIES)
+    assert len(index) == 6
+    assert index.locate('0015.b2aa.06c6') == [
+        ('00:15:b2:aa:06:c6', 'tor-1', 'Eth1/6/2', 412),
+        ('00:15:b2:aa:06:c6', 'tor-1', 'Eth1/6/2', 741),
+        ('00:15:b2:aa:06:c6', 'tor-2', '10GE1/0/1', 412)]
+    assert index.locate('00:15:b2:aa:06:c7') == []
+    assert [x[0] for x in index.locate_prefix('52:54:00')] == [
+        '52:54:00:12:34:01', '52:54:00:12:34:01']
+    assert len(index.locate_prefix('0')) == 3
+    assert len(index.locate_prefix('ff')) == 0
+    shared = index.shared_macs()
+    assert sorted(shared) == ['00:15:b2:aa:06:c6', '52:54:00:12:34:01']
+    assert len(shared['00:15:b2:aa:06:c6']) == 3
+    shared = index.shared_macs(lambda host, port: port != 'Po2')
+    assert list(shared) == ['00:15:b2:aa:06:c6']
+    assert mac_index.MacIndex().shared_macs(lambda x, y: True) == {}
+
+
+def test_mac_locator(tmp_path, monkeypatch, capsys):
+    pytest.importorskip('numpy')
+    from bindings import mac_locator
+    monkeypatch.setitem(Connections.available, 'netmiko', FakeNetmikoPlugin)
+    monkeypatch.setattr('nornir.init_nornir.register_default_connection_'
+                        'plugins', lambda: None)
+    monkeypatch.setattr(FakeNetmiko, 'outputs', {
+        'show mac address-table': 'cisco_show_mac_table.txt',
+        'display mac-address': 'huawei_show_mac_table.txt'})
+    nrnr = InitNornir(config_file=write_nornir_config(tmp_path, HOSTS))
+    result = mac_locator.execute(nrnr, mac_address='e0d5.5e')
+    assert not result.failed_hosts
+    # report is returned, not printed out
+    assert capsys.readouterr().out == ''
+    report = result['tor-3'][0].result
+    assert report.startswith('e0d5.5e found in MAC table:\n')
+    assert report.count('e0:d5:5e:19:49:b4 on tor-3 port 10GE1/0/28') == 4
+    assert result['tor-1'][0].result.startswith(
+        'e0d5.5e not found in MAC table\n')
+    # tor-1 and tor-2 learned the same MACs, but Po2 is tor-1 uplink
+    report = result['tor-2'][0].result
+    assert '3 MAC addresses learned on more than one edge port' in report
+    assert '00:15:b2:aa:06:c6 on tor-2 port Eth1/6/2, VLAN 741' in report
+    assert '52:54:00:12:34:01 on tor-2 port Po2' not in report
+    assert 'edge port' not in result['tor-3'][0].result
+    assert 'mac_table' not in nrnr.inventory.hosts['tor-1'].data
+    # hosts MAC table was not collected from are reported as failed
+    monkeypatch.delitem(FakeNetmiko.outputs, 'display mac-address')
+    nrnr.inventory.hosts['tor-3'].data.pop('command_cache')
+    result = mac_locator.execute(nrnr, mac_address='e0d5.5e')
+    assert list(result.failed_hosts) == ['tor-3']
+    assert sorted(result) == ['tor-1', 'tor-2', 'tor-3']
+    assert result['tor-1'][0].result.startswith('e0d5.5e not found')
@@ -0,0 +1,101 @@
+import json
+import pytest
+from nornir.core.inventory import Host
+from nornir.core.task import Result
+from tests.helpers import create_fake_task, get_file_contents
+from drivers import get_driver
+from operations import check_vrf_status
+from utils import metrics
+from utils.metrics import (Histogram, MetricsRegistry, command_template,
+                           timed_task, write_metrics)
+
+
+@pytest.fixture
+def registry():
+    yield metrics.enable()
+    metrics.disable()
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 1, 10))
+    for value in (0.05, 0.5, 0.7, 5, 50):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert (histogram.quantile(0.5), histogram.quantile(0.95)) == (1, 50)
+    other = Histogram((0.1, 1, 10))
+    other.observe(0.01)
+    histogram.merge(other)
+    assert (histogram.count, histogram.max, histogram.counts[0]) == (6, 50, 2)
+    registry = MetricsRegistry(max_series=1)
+    registry.observe('task_seconds', ('tor-1', 'nxos', 'check_vrf'), 1)
+    registry.observe('task_seconds', ('tor-2', 'nxos', 'check_vrf'), 1)
+    assert registry.dropped == 1
+
+
+def test_command_template():
+    nxos = Host('tor-1', platform='nxos')
+    assert command_template(nxos, 'show interface Ethernet1/1 switchport') \
+        == 'show interface {} switchport'
+    assert command_template(nxos, 'show vrf Lasers interface') == \
+        'show vrf {} interface'
+    assert command_template(nxos, 'show clock') == 'show clock'
+    json_nxos = Host('tor-2', platform='nxos', data={'output_format': 'json'})
+    assert command_template(json_nxos, 'show interface brief | json') == \
+        'show interface brief | json'
+    assert command_template(Host('tor-3', platform='eos'), 'show ver') == \
+        'show ver'
+
+
+def test_metrics_disabled():
+    metrics.disable()
+    output = get_file_contents('huawei_vrf_interfaces_present.txt')
+    task = create_fake_task(output, None, 'Star', 'huawei_vrpv8',
+                            check_vrf_status.get_vrf_interfaces)
+    metrics.record_command(task, 'display clock', output, 1)
+    assert get_driver('huawei_vrpv8').parse_vrf_interfaces(output, 'Star')
+    assert metrics.get_registry() is None
+
+
+def test_metrics_collected(registry, set_vendor_vars, tmp_path):
+    task = create_fake_task(get_file_contents(
+        'huawei_vrf_interfaces_present.txt'), set_vendor_vars['Huawei CE'],
+        'Star', 'huawei_vrpv8', check_vrf_status.get_vrf_interfaces)
+    check_vrf_status.get_vrf_interfaces(task)
+    [(labels, histogram)] = registry.series('command_seconds')
+    assert labels == ('test-host', 'huawei_vrpv8',
+                      'display ip vpn-instance {} interface')
+    assert histogram.count == 1
+    [(_, output_bytes)] = registry.series('command_bytes')
+    assert output_bytes.sum == len(get_file_contents(
+        'huawei_vrf_interfaces_present.txt').encode('utf-8'))
+    assert [x for x, _ in registry.series('parse_seconds')] == [
+        ('huawei_vrpv8', 'get_vrf_interfaces', 'parse_vrf_interfaces')]
+    # generator parsers are timed while consumed
+    list(get_driver('huawei_vrpv8').iter_ip_neighbors(get_file_contents(
+        'huawei_show_ipv4_neighbors_vrf_lasers.txt'), 'v4'))
+    assert ('huawei_vrpv8', 'get_vrf_interfaces', 'iter_ip_neighbors') in [
+        x for x, _ in registry.series('parse_seconds')]
+
+    @timed_task
+    def fake_binding_task(task):
+        return Result(task.host, result='done')
+
+    task = create_fake_task(None, None, None, 'nxos', fake_binding_task)
+    fake_binding_task(task)
+    assert [x for x, _ in registry.series('task_seconds')] == [
+        ('test-host', 'nxos', 'fake_binding_task')]
+    prometheus, summary = write_metrics(str(tmp_path / 'metrics'))
+    with open(prometheus, encoding='utf-8') as f:
+        text = f.read()
+    assert '# TYPE nornir_bindings_command_seconds histogram\n' in text
+    assert ('nornir_bindings_command_bytes_bucket{host="test-host",'
+            'platform="huawei_vrpv8",command="display ip vpn-instance {} '
+            'interface",le="+Inf"} 1\n') in text
+    assert 'nornir_bindings_dropped_observations 0\n' in text
+    with open(summary, encoding='utf-8') as f:
+        data = json.load(f)
+    assert data['commands'][0]['command'] == \
+        'display ip vpn-instance {} interface'
+    assert data['commands'][0]['bytes'] == output_bytes.sum
+    assert data['tasks'][0]['task'] == 'fake_binding_task'
+    assert data['slowest_host_commands'][0]['host'] == 'test-host'
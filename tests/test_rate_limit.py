@@ -0,0 +1,53 @@
+from unittest.mock import Mock
+from nornir.core.inventory import Host
+from tests.helpers import create_fake_task, FakeClock
+from utils.command_cache import send_command
+from utils.rate_limit import TokenBucket, CommandLimiter, build_limiters
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(2, 2, clock)
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+    clock.now = 2.0
+    # debt is paid off first, bucket never holds more than burst
+    assert bucket.reserve() == 0
+    clock.now = 100.0
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0.5]
+
+
+def test_command_limiter():
+    clock = FakeClock()
+    waits = []
+    site = TokenBucket(1, 1, clock)
+    limiters = [CommandLimiter([TokenBucket(10, 10, clock), site],
+                               waits.append) for _ in range(2)]
+    for limiter in limiters:
+        limiter.wait()
+    # the slowest bucket decides
+    assert waits == [1.0]
+    assert (limiters[0].waited, limiters[1].waited) == (0, 1.0)
+    CommandLimiter([], waits.append).wait()
+    assert waits == [1.0]
+
+
+def test_build_limiters():
+    hosts = [Host('tor-1', data={'site': 'ams', 'site_command_rate': 5}),
+             Host('tor-2', data={'site': 'ams', 'command_rate': 0}),
+             Host('tor-3', data={'command_burst': 1})]
+    limiters = build_limiters(hosts)
+    assert [len(limiters[x].buckets) for x in ('tor-1', 'tor-2', 'tor-3')] \
+        == [2, 1, 1]
+    assert limiters['tor-1'].buckets[1] is limiters['tor-2'].buckets[0]
+    assert limiters['tor-1'].buckets[1].rate == 5
+    assert limiters['tor-3'].buckets[0].burst == 1
+
+
+def test_send_command_limited():
+    task = create_fake_task('output', None, None, 'nxos', send_command)
+    task.host['command_limiter'] = Mock()
+    send_command(task, 'show vrf')
+    send_command(task, 'show vrf')
+    send_command(task, 'show vrf', use_cache=False)
+    # outputs answered from cache are not limited
+    assert task.host['command_limiter'].wait.call_count == 2
@@ -0,0 +1,69 @@
+import io
+import json
+from nornir import InitNornir
+from nornir.core.task import Result
+from tests.helpers import write_nornir_config
+from utils.result_sink import streaming, TextSink, NDJSONSink
+
+HOSTS = '''
+---
+tor-1:
+  hostname: 10.1.1.1
+  platform: huawei_vrpv8
+tor-2:
+  hostname: 10.1.1.2
+  platform: huawei_vrpv8
+spine-1:
+  hostname: 10.1.1.3
+  platform: nxos
+'''
+
+
+def greet(task):
+    if task.host.name == 'tor-2':
+        raise ValueError('host is down')
+    task.run(task=lambda x: Result(x.host, result='subtask output'))
+    return Result(task.host, result='hello from {}'.format(task.host.name))
+
+
+def get_nornir(tmp_path):
+    return InitNornir(config_file=write_nornir_config(tmp_path, HOSTS))
+
+
+def test_text_sink(tmp_path):
+    stream = io.StringIO()
+    nrnr = streaming(get_nornir(tmp_path), TextSink(stream))
+    result = nrnr.run(task=greet)
+    lines = stream.getvalue().splitlines()
+    headers = [x for x in lines if x.startswith('[')]
+    assert [x.split()[0] for x in headers] == ['[1/3]', '[2/3]', '[3/3]']
+    assert any(x.startswith('[') and 'tor-2 - greet failed' in x
+               for x in headers)
+    assert 'hello from spine-1' in lines
+    assert any('ValueError: host is down' in x for x in lines)
+    # results are released once written, failures are still recorded
+    assert result['tor-1'][0].result is None
+    assert result['tor-1'][1].result is None
+    assert result['tor-2'].failed
+    assert nrnr.data.failed_hosts == {'tor-2'}
+
+
+def test_ndjson_sink(tmp_path):
+    stream = io.StringIO()
+    nrnr = streaming(get_nornir(tmp_path), NDJSONSink(stream, release=False))
+    tors = nrnr.filter(filter_func=lambda x: x.name.startswith('tor'))
+    result = tors.run(task=greet)
+    records = [json.loads(x) for x in stream.getvalue().splitlines()]
+    assert sorted(x['host'] for x in records) == ['tor-1', 'tor-2']
+    assert [x['completed'] for x in records] == [1, 2]
+    assert {x['total'] for x in records} == {2}
+    assert {x['host']: x['failed'] for x in records} == {
+        'tor-1': False, 'tor-2': True}
+    assert result['tor-1'][0].result == 'hello from tor-1'
+    # only hosts not failed previously are counted on the next run
+    stream.truncate(0)
+    stream.seek(0)
+    nrnr.run(task=greet)
+    records = [json.loads(x) for x in stream.getvalue().splitlines()]
+    assert sorted(x['host'] for x in records) == ['spine-1', 'tor-1']
+    assert {x['total'] for x in records} == {2}
@@ -1,71 +1,10 @@
 import pytest
+import click
+from nornir import InitNornir
+from utils.nornir_utils import select_hosts
 from utils import runner
 
 
-@pytest.fixture
-def tmp_inventory_files(tmp_path):
-    conf = tmp_path / "conf.yml"
-    inv_hosts = tmp_path / "hosts.yml"
-    inv_groups = tmp_path / "groups.yml"
-    test_config = '''
----
-core:
-    num_workers: 10
-inventory:
-  plugin: nornir.plugins.inventory.simple.SimpleInventory
-  options:
-    host_file: "{}"
-    group_file: "{}"
-'''.format(inv_hosts, inv_groups)
-    hosts = '''
----
-cisco-dc1:
-  hostname: 10.1.1.1
-  groups:
-    - dc_1
-    - cisco_tors
-huawei-dc2:
-  hostname: 10.2.2.2
-  groups:
-    - dc_2
-    - huawei_tors
-'''
-    groups = '''
----
-global:
-  data:
-    domain: grt.dc
-    asn: 65666
-dc_1:
-  data:
-    dc_name: one_dc
-dc_2:
-  data:
-    dc_name: two_dc
-tors:
-  data:
-    role: tor_switch
-cisco_tors:
-  groups:
-    - tors
-  platform: nxos
-  data:
-    vendor: cisco
-    lineup: nexus
-huawei_tors:
-  groups:
-    - tors
-  platform: huawei_vrpv8
-  data:
-    vendor: huawei
-    lineup: ce
-'''
-    conf.write_text(test_config)
-    inv_hosts.write_text(hosts)
-    inv_groups.write_text(groups)
-    return conf
-
-
 def test_is_in_inventory(tmp_inventory_files):
     config = tmp_inventory_files
     assert runner.is_in_inventory(config, 'cisco-dc2') is False
@@ -107,6 +46,39 @@ def test_check_config(tmp_inventory_files):
         runner.check_config(config)
 
 
+def test_select_hosts(tmp_inventory_files):
+    nornir = InitNornir(config_file=str(tmp_inventory_files))
+
+    def selected(*args, **kwargs):
+        return sorted(select_hosts(nornir, *args, **kwargs).inventory.hosts)
+
+    assert selected() == ['cisco-dc1', 'huawei-dc2']
+    assert selected(['*-dc2']) == ['huawei-dc2']
+    assert selected(['cisco-*', 'huawei-dc2']) == ['cisco-dc1', 'huawei-dc2']
+    # parent groups are taken into account
+    assert selected(groups=['tors']) == ['cisco-dc1', 'huawei-dc2']
+    assert selected(groups=['dc_1', 'huawei_tors']) == [
+        'cisco-dc1', 'huawei-dc2']
+    assert selected(filters={'vendor': 'huawei'}) == ['huawei-dc2']
+    assert selected(filters={'role': 'tor_switch', 'dc_name': 'one_dc'}) == [
+        'cisco-dc1']
+    assert selected(filters={'no_such_key': 'None'}) == []
+    assert selected(['cisco-*'], ['dc_2']) == []
+    workers = select_hosts(nornir, num_workers=2)
+    assert workers.config.core.num_workers == 2
+    assert nornir.config.core.num_workers == 10
+
+
+def test_parse_filters():
+    assert runner.parse_filters(None, None, ('vendor=cisco', 'a=b=c')) == {
+        'vendor': 'cisco', 'a': 'b=c'}
+    with pytest.raises(click.BadParameter):
+        runner.parse_filters(None, None, ('vendor',))
+    assert runner.is_single_hostname(('cisco-dc1',), (), {})
+    assert not runner.is_single_hostname(('cisco-*',), (), {})
+    assert not runner.is_single_hostname(('cisco-dc1',), ('tors',), {})
+
+
 def test_get_host_ip_address():
     with pytest.raises(runner.IPRetrievalError):
         runner.get_host_ip_address('192.168.888.1', 'somehost')
@@ -0,0 +1,166 @@
+import io
+import time
+import threading
+import pytest
+from nornir.core.connections import Connections
+from nornir.core.task import Result
+from tests.helpers import FakeNetmikoPlugin, FakeClock, write_nornir_config
+from operations import check_vrf_status
+from utils import runner
+from utils.cached_inventory import init_nornir
+from utils.nornir_utils import nornir_set_credentials
+from utils.result_sink import TextSink
+from utils.scheduler import (parse_polls, read_schedule_file, find_operation,
+                             Scheduler, Poll, MalformedScheduleFile)
+
+HOSTS = '''
+---
+tor-1:
+  hostname: 10.1.1.1
+  platform: huawei_vrpv8
+  groups: [ams]
+tor-2:
+  hostname: 10.1.1.2
+  platform: huawei_vrpv8
+  groups: [ams]
+tor-3:
+  hostname: 10.1.1.3
+  platform: huawei_vrpv8
+'''
+GROUPS = '''
+---
+ams:
+  data:
+    site: ams
+    site_command_rate: 1
+    site_command_burst: 1
+'''
+POLLS = '''
+---
+- operation: find_vrf
+  groups: ams
+  interval: 60
+  data:
+    vrf_name: Lasers
+- operation: check_vrf_status.find_vrfs
+  hosts: tor-3
+  interval: 300
+  jitter: 0
+'''
+
+
+@pytest.fixture
+def nornir(tmp_path, monkeypatch):
+    conf = write_nornir_config(tmp_path, HOSTS, GROUPS)
+    monkeypatch.setenv('NORNIR_BINDINGS_PASSWORD', 'secret')
+    nrnr = init_nornir(conf)
+    nornir_set_credentials(nrnr, 'admin')
+    # plugin is replaced after Nornir registered default ones
+    monkeypatch.setitem(Connections.available, 'netmiko', FakeNetmikoPlugin)
+    FakeNetmikoPlugin.opened = 0
+    return nrnr
+
+
+def test_parse_polls(tmp_path):
+    schedule_file = tmp_path / 'polls.yml'
+    schedule_file.write_text(POLLS)
+    polls = read_schedule_file(str(schedule_file))
+    assert [(x.number, x.task, x.interval, x.jitter) for x in polls] == [
+        (1, check_vrf_status.find_vrf, 60, 0.1),
+        (2, check_vrf_status.find_vrfs, 300, 0)]
+    assert polls[0].groups == ['ams']
+    assert polls[0].data == {'vrf_name': 'Lasers'}
+    assert find_operation('check_interfaces_status').__name__ == \
+        'check_interfaces_status'
+    for entries in ({'operation': 'find_vrf'},
+                    [{'operation': 'no_such_operation', 'hosts': 'tor-1',
+                      'interval': 60}],
+                    [{'operation': 'no_such_module.find_vrf',
+                      'hosts': 'tor-1', 'interval': 60}],
+                    [{'operation': 'find_vrf', 'interval': 60}],
+                    [{'operation': 'find_vrf', 'hosts': 'tor-1'}],
+                    [{'operation': 'find_vrf', 'hosts': 'tor-1',
+                      'interval': 60, 'jitter': 1}],
+                    [{'operation': 'find_vrf', 'hosts': 'tor-1',
+                      'interval': 60, 'every': 60}]):
+        with pytest.raises(MalformedScheduleFile):
+            parse_polls(entries)
+
+
+def test_scheduler_run(nornir):
+    clock = FakeClock()
+    waits = []
+    output = io.StringIO()
+    scheduler = Scheduler(nornir, parse_polls([{
+        'operation': 'find_vrf', 'groups': 'ams', 'interval': 60,
+        'data': {'vrf_name': 'Lasers'}}]), workers=2,
+        sink=TextSink(output), clock=clock, sleep=waits.append, seed=1)
+    # first runs are spread over interval
+    assert sorted(x.host.name for x in scheduler.jobs) == ['tor-1', 'tor-2']
+    assert len({x.next_run for x in scheduler.jobs}) == 2
+    assert all(0 <= x.next_run < 60 for x in scheduler.jobs)
+    assert 0 < scheduler.tick() < 60
+    clock.now = 60
+    assert 0 < scheduler.tick() <= 66
+    scheduler.close()
+    assert output.getvalue().count('VRF Lasers configured on device') == 2
+    # hosts share site bucket of 1 command per second
+    assert waits == [1.0]
+    for job in scheduler.jobs:
+        assert job.runs == 1
+        assert 60 < job.slot < 120
+        assert abs(job.next_run - job.slot) <= 6
+        # gathered data is dropped before next run
+        assert 'command_cache' in job.host.keys()
+    assert scheduler.stats() == {1: {'runs': 2, 'failed': 0, 'skipped': 0}}
+    assert FakeNetmikoPlugin.opened == 2
+
+
+def test_scheduler_overrun(nornir):
+    clock = FakeClock()
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_poll(task):
+        started.set()
+        release.wait(5)
+        return Result(task.host, result='done')
+
+    scheduler = Scheduler(nornir, [Poll(1, 'slow_poll', slow_poll, ['tor-3'],
+                                        [], {}, 10, 0, {}, {})], clock=clock)
+    job = scheduler.jobs[0]
+    clock.now = job.next_run
+    scheduler.tick()
+    assert started.wait(5)
+    # run due while previous one is going on is skipped, not queued
+    clock.now += 10
+    scheduler.tick()
+    assert (job.running, job.skipped) == (True, 1)
+    release.set()
+    for _ in range(500):
+        if not job.running:
+            break
+        time.sleep(0.01)
+    # slots scheduler was late for are skipped too
+    clock.now += 35
+    scheduler.tick()
+    scheduler.close()
+    assert (job.runs, job.skipped) == (2, 3)
+    assert job.slot == pytest.approx(clock.now + 5)
+
+
+def test_run_schedule(tmp_path, monkeypatch, capsys):
+    conf = write_nornir_config(tmp_path, HOSTS, GROUPS)
+    schedule_file = tmp_path / 'polls.yml'
+    schedule_file.write_text(POLLS)
+    monkeypatch.setenv('NORNIR_BINDINGS_PASSWORD', 'secret')
+    stop = threading.Event()
+    stop.set()
+    runner.run_schedule(conf, str(schedule_file), None, stop=stop)
+    assert capsys.readouterr().out == (
+        'Polling 3 hosts\n'
+        'Poll 1: find_vrf - 0 runs, 0 failed, 0 skipped\n'
+        'Poll 2: check_vrf_status.find_vrfs - 0 runs, 0 failed, 0 skipped\n')
+    schedule_file.write_text('- operation: find_vrf\n')
+    with pytest.raises(SystemExit):
+        runner.run_schedule(conf, str(schedule_file), None, stop=stop)
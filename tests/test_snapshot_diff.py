@@ -0,0 +1,132 @@
+import sqlite3
+import pytest
+from click.testing import CliRunner
+from nornir.core.inventory import Host
+from utils.switch_objects import SwitchInterface, BGPNeighbor, VlanSet
+from utils.fleet_export import export_fleet, collect_rows, TABLES
+from utils.snapshot_diff import (diff_snapshots, format_change, main, Change,
+                                 SnapshotNotFound, SnapshotDiffException)
+
+
+def create_interface(name, oper_status='up', macs=100, vlans='1,512,600',
+                     load_in=0.1):
+    interface = SwitchInterface(name)
+    interface.oper_status = oper_status
+    interface.macs_learned = macs
+    interface.vlan_list = VlanSet.from_string(vlans)
+    interface.load_in = load_in
+    return interface
+
+
+def create_neighbor(address, state):
+    neighbor = BGPNeighbor(address)
+    neighbor.state = state
+    neighbor.as_number = 65001
+    return neighbor
+
+
+def create_hosts(changed=False):
+    '''Make hosts like binding left them on two runs; second run has changes
+    of every kind along with counters changing on every run.'''
+    interfaces = [
+        create_interface('Eth1/1', 'down' if changed else 'up'),
+        create_interface('Eth1/2', macs=30 if changed else 100),
+        # MAC count changes a bit on every run, that's not a swing
+        create_interface('Eth1/3', macs=95 if changed else 100),
+        create_interface('Eth1/4', vlans='1,512,700' if changed else
+                         '1,512,600'),
+        create_interface('Eth1/5', load_in=0.5 if changed else 0.1)]
+    neighbors = {'10.0.0.2': create_neighbor(
+        '10.0.0.2', 'idle' if changed else 'established')}
+    if not changed:
+        neighbors['10.0.0.3'] = create_neighbor('10.0.0.3', 'established')
+        neighbors['10.0.0.4'] = create_neighbor('10.0.0.4', 'idle')
+    hosts = [
+        Host('tor-1', data={'interfaces': interfaces, 'vrf_name': 'Lasers',
+                            'bgp_neighbors': neighbors}),
+        Host('tor-2', data={'vrf_bgp_neighbors': {
+            'Galaxy': {'fe80::1': create_neighbor(
+                'fe80::1', 'active' if changed else 'established')},
+            'Stars': {}}})]
+    # host failed on second run is not compared
+    if not changed:
+        hosts.append(Host('tor-3', data={'interfaces': [
+            create_interface('Eth1/1')]}))
+    return hosts
+
+
+def test_record_hashes():
+    digests = [{x[3]: x[4] for x in collect_rows(create_hosts(y), 's')[
+        'record_hashes']} for y in (False, True)]
+    assert digests[0]['Eth1/5'] == digests[1]['Eth1/5']
+    assert digests[0]['Eth1/1'] != digests[1]['Eth1/1']
+    assert 'Lasers/10.0.0.2' in digests[0]
+    assert 'Galaxy/fe80::1' in digests[1]
+
+
+def test_diff_snapshots(tmp_path):
+    database = str(tmp_path / 'fleet.db')
+    export_fleet(create_hosts(), database, snapshot='2024-01-01T00:00:00')
+    export_fleet(create_hosts(True), database,
+                 snapshot='2024-01-02T00:00:00')
+    changes = diff_snapshots(database)
+    assert sorted(changes) == [
+        Change('tor-1', 'Eth1/1', 'flapped', 'up', 'down'),
+        Change('tor-1', 'Eth1/2', 'macs', 100, 30),
+        Change('tor-1', 'Eth1/4', 'vlans', '1,512,600', '1,512,700'),
+        Change('tor-1', 'Lasers/10.0.0.2', 'bgp_down', 'established',
+               'idle'),
+        Change('tor-1', 'Lasers/10.0.0.3', 'bgp_down', 'established', None),
+        Change('tor-2', 'Galaxy/fe80::1', 'bgp_down', 'established',
+               'active')]
+    assert format_change(sorted(changes)[2]) == \
+        'tor-1 Eth1/4 VLANs added: 700; removed: 600'
+    # snapshots are compared in given order
+    assert Change('tor-1', 'Eth1/1', 'flapped', 'down', 'up') in \
+        diff_snapshots(database, '2024-01-02T00:00:00', '2024-01-01T00:00:00')
+    assert diff_snapshots(database, new='2024-01-01T00:00:00',
+                          old='2024-01-01T00:00:00') == []
+    with pytest.raises(SnapshotNotFound):
+        diff_snapshots(database, old='2023-01-01T00:00:00')
+    with pytest.raises(SnapshotNotFound):
+        diff_snapshots(database, new='2024-01-01T00:00:00')
+
+
+def test_diff_snapshots_old_database(tmp_path):
+    database = str(tmp_path / 'fleet.db')
+    sqlite3.connect(database).close()
+    with pytest.raises(SnapshotDiffException):
+        diff_snapshots(database)
+    # database exported before VLAN lists and record hashes were added
+    connection = sqlite3.connect(database)
+    connection.execute('CREATE TABLE interfaces ({})'.format(', '.join(
+        '"{}" {}'.format(x, y) for x, y in TABLES['interfaces']
+        if x != 'vlan_list')))
+    connection.execute('INSERT INTO interfaces (snapshot, host, interface) '
+                       'VALUES (?, ?, ?)', ('s0', 'tor-1', 'Eth1/1'))
+    connection.commit()
+    connection.close()
+    export_fleet(create_hosts(), database, snapshot='s1')
+    with pytest.raises(SnapshotNotFound, match='1 exported by older'):
+        diff_snapshots(database)
+    export_fleet(create_hosts(True), database, snapshot='s2')
+    assert len(diff_snapshots(database)) == 6
+    with pytest.raises(SnapshotNotFound, match='without record hashes'):
+        diff_snapshots(database, old='s0')
+
+
+def test_snapshot_diff_cli(tmp_path):
+    database = str(tmp_path / 'fleet.db')
+    export_fleet(create_hosts(), database, snapshot='s1')
+    runner = CliRunner()
+    result = runner.invoke(main, [database])
+    assert result.exit_code == 1
+    assert 'Two snapshots needed' in result.output
+    export_fleet(create_hosts(True), database, snapshot='s2')
+    assert runner.invoke(main, ['--list', database]).output == 's1\ns2\n'
+    result = runner.invoke(main, [database])
+    assert result.exit_code == 0
+    assert 'tor-1 Eth1/1 flapped up -> down\n' in result.output
+    assert 'tor-1 Lasers/10.0.0.3 BGP session left established, now ' \
+        'removed\n' in result.output
+    assert result.output.endswith('6 changes\n')
@@ -1,5 +1,9 @@
+import ipaddress
+import pickle
 from copy import copy
-from utils.switch_objects import SwitchInterface
+import pytest
+from utils.switch_objects import (SwitchInterface, InterfaceSet, IPAddress,
+                                  VlanSet)
 
 
 def test_interface_type_assignment():
@@ -29,3 +33,75 @@ def test_interface_type_assignment():
             interface_switches[_type] = True
         for switch in interface_switches:
             assert getattr(interface, switch) is interface_switches[switch]
+
+
+def test_interface_slots():
+    interface = SwitchInterface('Eth1/1')
+    with pytest.raises(AttributeError):
+        interface.macs_learned
+    interface.macs_learned = 3
+    with pytest.raises(AttributeError):
+        interface.no_such_attribute = 1
+    assert pickle.loads(pickle.dumps(interface)).macs_learned == 3
+    assert SwitchInterface(''.join(['Eth', '1/1'])).name is interface.name
+
+
+def test_interface_set():
+    names = ['Eth1/1', 'Vlan20', 'port-channel1', 'port-channel1.17',
+             'Eth1/2']
+    interfaces = InterfaceSet(SwitchInterface(x) for x in names)
+    assert len(interfaces) == 5
+    assert [x.name for x in interfaces] == names
+    assert interfaces.names == names
+    assert interfaces[0].name == 'Eth1/1'
+    assert interfaces['Vlan20'].svi
+    assert interfaces.get('Eth1/3') is None
+    assert 'Eth1/2' in interfaces and interfaces[-1] in interfaces
+    assert SwitchInterface('Eth1/2') not in interfaces
+    assert [x.name for x in interfaces.of_type('physical')] == [
+        'Eth1/1', 'Eth1/2']
+    assert [x.name for x in interfaces.of_type('lag', 'subinterface')] == [
+        'port-channel1', 'port-channel1.17']
+    replacement = SwitchInterface('Eth1/1', mode='routed')
+    interfaces.append(replacement)
+    assert len(interfaces) == 5
+    assert interfaces['Eth1/1'] is replacement
+    assert interfaces.of_type('physical')[-1] is replacement
+    assert not InterfaceSet()
+
+
+def test_ip_address():
+    v4 = IPAddress('10.1.1.1', '24')
+    v6 = IPAddress(ipaddress.ip_address('2001:db8::1'), 64, secondary=True)
+    assert v4.address == ipaddress.ip_address('10.1.1.1')
+    assert v4.version == 4 and v6.version == 6
+    assert str(v4) == '10.1.1.1/24 (P)'
+    assert str(v6) == '2001:db8::1/64'
+    assert IPAddress('fe80::1', 64).address.is_link_local
+
+
+def test_vlan_set():
+    trunk = VlanSet.from_string('1-10,20,30-4094')
+    assert len(trunk) == 4076
+    assert 5 in trunk and 4094 in trunk
+    assert 11 not in trunk and 0 not in trunk and 'x' not in trunk
+    assert str(trunk) == '1-10,20,30-4094'
+    huawei = VlanSet.from_string('507 599 670-673\n 1333', separator=' ')
+    assert list(huawei) == [507, 599, 670, 671, 672, 673, 1333]
+    assert huawei == [507, 599, 670, 671, 672, 673, 1333]
+    assert str(huawei & trunk) == '507,599,670-673,1333'
+    assert str(trunk - huawei) == \
+        '1-10,20,30-506,508-598,600-669,674-1332,1334-4094'
+    assert str(VlanSet([5, 3, 4]) | [1]) == '1,3-5'
+    assert str(VlanSet([1, 2]) ^ VlanSet([2, 3])) == '1,3'
+    assert huawei <= trunk and not trunk <= huawei and trunk >= huawei
+    assert VlanSet([100]) == VlanSet.from_string('100')
+    assert len({VlanSet([100]), VlanSet.from_string('100')}) == 1
+    assert not VlanSet() and str(VlanSet()) == ''
+    assert pickle.loads(pickle.dumps(huawei)) == huawei
+    assert eval(repr(huawei)) == huawei
+    for bad in ('0', '4095', '10-5'):
+        with pytest.raises(ValueError):
+            VlanSet.from_string(bad)
+    with pytest.raises(ValueError):
+        VlanSet([4096])
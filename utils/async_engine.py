@@ -0,0 +1,213 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from nornir.core.task import Task, Result, MultiResult, AggregatedResult
+from app_exception import AppException
+try:
+    import asyncssh
+except ImportError:
+    asyncssh = None
+
+DEFAULT_MAX_SESSIONS = 200
+DEFAULT_TIMEOUT = 120
+DEFAULT_COMMAND_TIMEOUT = 60
+
+
+class AsyncEngineException(AppException):
+    '''Top-level module exception for inheritance purposes.'''
+    pass
+
+
+class AsyncDependencyMissing(AsyncEngineException):
+    '''Exception to raise if asyncssh is needed, but not installed.'''
+    pass
+
+
+class HostTimeout(AsyncEngineException):
+    '''Exception to raise if host didn't complete task in time.'''
+    pass
+
+
+class AsyncSSHConnection:
+    '''SSH connection to a single host built on asyncssh. Every command is
+    executed in its own exec channel of one SSH session, so no paging or
+    prompt handling is needed.
+    Attributes:
+        * host - instance of nornir.core.inventory.Host; used in __init__
+        * connect_timeout - seconds to wait for SSH session establishment;
+            used in __init__
+    '''
+    def __init__(self, host, connect_timeout=DEFAULT_COMMAND_TIMEOUT):
+        if asyncssh is None:
+            raise AsyncDependencyMissing(
+                'asyncssh must be installed to use async engine')
+        self.host = host
+        self.connect_timeout = connect_timeout
+        self._connection = None
+
+    async def open(self):
+        self._connection = await asyncio.wait_for(asyncssh.connect(
+            self.host.hostname, port=self.host.port or 22,
+            username=self.host.username, password=self.host.password,
+            known_hosts=None), self.connect_timeout)
+
+    async def send_command(self, command):
+        '''Execute command on host.
+        Arguments:
+            * command - rendered command string
+        Returns:
+            * command output
+        '''
+        result = await self._connection.run(command, check=False)
+        return result.stdout
+
+    async def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            await self._connection.wait_closed()
+            self._connection = None
+
+
+class CommandChannel:
+    '''Blocking facade over async connection, which is handed to operations
+    running in worker threads through host['command_channel']. Commands are
+    scheduled into engine event loop, so SSH I/O of all hosts is multiplexed
+    in a single thread.
+    Attributes:
+        * connection - async connection, like AsyncSSHConnection; used in
+            __init__
+        * loop - engine event loop; used in __init__
+        * timeout - seconds to wait for a single command output; used in
+            __init__
+    '''
+    def __init__(self, connection, loop, timeout=DEFAULT_COMMAND_TIMEOUT):
+        self.connection = connection
+        self.loop = loop
+        self.timeout = timeout
+        self.closed = False
+
+    def send_command(self, command):
+        '''Send command and wait for its output.
+        Arguments:
+            * command - rendered command string
+        Returns:
+            * command output
+        '''
+        if self.closed:
+            raise AsyncEngineException('command channel is closed')
+        future = asyncio.run_coroutine_threadsafe(asyncio.wait_for(
+            self.connection.send_command(command), self.timeout), self.loop)
+        return future.result()
+
+
+class AsyncEngine:
+    '''Execute Nornir task on many hosts at once with SSH sessions handled
+    by asyncio event loop. Operations themselves stay synchronous and are
+    run in worker threads, sending commands through
+    utils.command_cache.send_command which picks up host['command_channel'].
+    Attributes:
+        * max_sessions - maximum number of hosts processed simultaneously;
+            used in __init__
+        * timeout - seconds given to every host to complete the task; used in
+            __init__
+        * command_timeout - seconds to wait for a single command output;
+            used in __init__
+        * connection_factory - callable which receives Nornir host and returns
+            async connection with open, send_command and close coroutines;
+            used in __init__
+    '''
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS,
+                 timeout=DEFAULT_TIMEOUT,
+                 command_timeout=DEFAULT_COMMAND_TIMEOUT,
+                 connection_factory=AsyncSSHConnection):
+        if connection_factory is AsyncSSHConnection and asyncssh is None:
+            raise AsyncDependencyMissing(
+                'asyncssh must be installed to use async engine')
+        self.max_sessions = max_sessions
+        self.timeout = timeout
+        self.command_timeout = command_timeout
+        self.connection_factory = connection_factory
+
+    def _run_task(self, task, host, nornir, **kwargs):
+        return Task(task, **kwargs).start(host, nornir)
+
+    async def _connect_and_run(self, task, host, nornir, connection,
+                               channel, executor, **kwargs):
+        loop = asyncio.get_running_loop()
+        await connection.open()
+        host['command_channel'] = channel
+        return await loop.run_in_executor(executor, lambda: self._run_task(
+            task, host, nornir, **kwargs))
+
+    async def _run_host(self, task, host, nornir, semaphore, executor,
+                        **kwargs):
+        '''Open connection to host and run task in worker thread. If host
+        didn't make it in time, its worker thread can't be stopped, but
+        command channel is closed, so next command sent by the thread fails
+        instead of waiting for device.
+        Returns:
+            * instance of nornir.core.task.MultiResult
+        '''
+        async with semaphore:
+            connection = self.connection_factory(host)
+            channel = CommandChannel(connection, asyncio.get_running_loop(),
+                                     self.command_timeout)
+            try:
+                return await asyncio.wait_for(self._connect_and_run(
+                    task, host, nornir, connection, channel, executor,
+                    **kwargs), self.timeout)
+            except asyncio.TimeoutError:
+                return self._failed(task, host, HostTimeout(
+                    'host did not complete task in {} seconds'.format(
+                        self.timeout)))
+            except Exception as e:
+                return self._failed(task, host, e)
+            finally:
+                # closed channel must not be picked up by commands sent to
+                # host later, outside of engine
+                host.data.pop('command_channel', None)
+                channel.closed = True
+                await connection.close()
+
+    def _failed(self, task, host, exception):
+        multi_result = MultiResult(task.__name__)
+        multi_result.append(Result(host, exception=exception,
+                                   result=str(exception), failed=True,
+                                   name=task.__name__))
+        return multi_result
+
+    async def run_async(self, nornir, task, **kwargs):
+        '''Coroutine version of run method.'''
+        semaphore = asyncio.Semaphore(self.max_sessions)
+        hosts = [x for name, x in nornir.inventory.hosts.items()
+                 if name not in nornir.data.failed_hosts]
+        # results are streamed if Nornir is utils.result_sink.StreamingNornir
+        sink = getattr(nornir, 'sink', None)
+        if sink is not None:
+            sink.start(len(hosts))
+            task = sink.wrap(task)
+        executor = ThreadPoolExecutor(max_workers=self.max_sessions)
+        try:
+            results = await asyncio.gather(*[self._run_host(
+                task, host, nornir, semaphore, executor, **kwargs)
+                for host in hosts])
+        finally:
+            # waiting for threads of timed out hosts would block event loop
+            # their pending commands are waiting for
+            executor.shutdown(wait=False)
+        aggregated = AggregatedResult(kwargs.get('name') or task.__name__)
+        for host, result in zip(hosts, results):
+            aggregated[host.name] = result
+        nornir.data.failed_hosts.update(aggregated.failed_hosts.keys())
+        return aggregated
+
+    def run(self, nornir, task, **kwargs):
+        '''Run task on all hosts of Nornir inventory, which have not failed
+        already, similar to nornir.core.Nornir.run.
+        Arguments:
+            * nornir - instance of nornir.core.Nornir
+            * task - Nornir task function
+            * kwargs - arguments for task
+        Returns:
+            * instance of nornir.core.task.AggregatedResult
+        '''
+        return asyncio.run(self.run_async(nornir, task, **kwargs))
@@ -0,0 +1,152 @@
+from collections import namedtuple
+from utils.binding_registry import (get_binding, load_binding,
+                                    unsupported_hosts,
+                                    BindingRegistryException)
+from utils.nornir_utils import select_hosts
+from app_exception import AppException
+
+JOB_KEYS = {'hosts', 'groups', 'filters', 'binding', 'parameters', 'workers'}
+# host data gathered by operations, which is shared between jobs
+SHARED_DATA = {'command_cache'}
+
+Job = namedtuple('Job', ['number', 'hosts', 'groups', 'filters', 'binding',
+                         'parameters', 'workers'])
+
+
+class BatchException(AppException):
+    '''Top-level module exception for inheritance purposes.'''
+    pass
+
+
+class MalformedJobFile(BatchException):
+    '''Exception to raise if job file can't be read or has invalid jobs.'''
+    pass
+
+
+def as_list(value):
+    '''Make list of single string or list of strings.'''
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(x) for x in value]
+
+
+def parse_jobs(entries):
+    '''Validate job file entries against binding metadata and expand them
+    into jobs. Entry is a dictionary with 'binding' and host selectors
+    ('hosts' - names or patterns, 'groups', 'filters' - dictionary of host
+    data), like runner options. 'parameters' is a dictionary of binding
+    parameters or a list of them, in which case entry is expanded into a
+    job per dictionary. Optional 'workers' sets number of hosts processed
+    at once.
+    Arguments:
+        * entries - list of dictionaries
+    Returns:
+        * list of Job
+    '''
+    if not isinstance(entries, list):
+        raise MalformedJobFile('job file must contain list of jobs')
+    jobs = []
+    for num, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            raise MalformedJobFile('job {} is not a mapping'.format(num))
+        unknown = set(entry) - JOB_KEYS
+        if unknown:
+            raise MalformedJobFile('job {} has unknown keys: {}'.format(
+                num, ', '.join(sorted(unknown))))
+        try:
+            binding = get_binding(entry.get('binding'))
+        except BindingRegistryException as e:
+            raise MalformedJobFile('job {}: {}'.format(num, e))
+        hosts = as_list(entry.get('hosts'))
+        groups = as_list(entry.get('groups'))
+        filters = {str(x): str(y) for x, y in (
+            entry.get('filters') or {}).items()}
+        if not any([hosts, groups, filters]):
+            raise MalformedJobFile('job {} selects no hosts'.format(num))
+        parameters_list = entry.get('parameters') or {}
+        if isinstance(parameters_list, dict):
+            parameters_list = [parameters_list]
+        for parameters in parameters_list:
+            if not isinstance(parameters, dict) or set(parameters) != set(
+                    binding.parameters):
+                raise MalformedJobFile(
+                    'job {}: binding {} expects parameters: {}'.format(
+                        num, binding.name, ', '.join(binding.parameters)))
+            # parameters are prompted for as strings in interactive runs
+            parameters = {x: str(y) for x, y in parameters.items()}
+            jobs.append(Job(len(jobs) + 1, hosts, groups, filters,
+                            binding, parameters, entry.get('workers')))
+    return jobs
+
+
+def read_job_file(path):
+    '''Read jobs from YAML (or JSON) job file, see parse_jobs for format.
+    Arguments:
+        * path - job file location
+    Returns:
+        * list of Job
+    '''
+    from ruamel.yaml import YAML, YAMLError
+    try:
+        with open(path, 'r', encoding='utf-8') as job_file:
+            entries = YAML(typ='safe').load(job_file)
+    except (OSError, YAMLError) as e:
+        raise MalformedJobFile('can not read job file: {}'.format(e))
+    return parse_jobs(entries)
+
+
+def select_job_hosts(nornir, job, workers=None):
+    '''Select hosts job is going to run on. Hosts with platforms binding
+    doesn't support are left out.
+    Arguments:
+        * nornir - instance of nornir.core.Nornir
+        * job - instance of Job
+        * workers (defaults to None) - number of hosts to process at once if
+            job doesn't set it; if None, configured number is used
+    Returns:
+        * tuple of instance of nornir.core.Nornir with selected hosts and
+            list of names of left out hosts
+    '''
+    selected = select_hosts(nornir, job.hosts, job.groups, job.filters,
+                            job.workers or workers)
+    unsupported = unsupported_hosts(job.binding,
+                                    selected.inventory.hosts.values())
+    if unsupported:
+        selected = selected.filter(
+            filter_func=lambda x: x.name not in unsupported)
+    return selected, unsupported
+
+
+def inventory_data(nornir):
+    '''Grab names of host data keys set by inventory, which run_job keeps.
+    Arguments:
+        * nornir - instance of nornir.core.Nornir
+    Returns:
+        * dictionary with host names as keys and sets of data keys as values
+    '''
+    return {name: set(host.data.keys()) for name, host in
+            nornir.inventory.hosts.items()}
+
+
+def run_job(nornir, job, initial_data):
+    '''Run job binding. Jobs are meant to be run one by one with the same
+    Nornir, so connections and per-host command caches are shared between
+    them. Other host data gathered by previous jobs is dropped, so bindings
+    (and export) only see results of the job. Hosts failed in previous jobs
+    are given another chance.
+    Arguments:
+        * nornir - instance of nornir.core.Nornir with hosts selected by
+            select_job_hosts
+        * job - instance of Job
+        * initial_data - host data keys set by inventory, grabbed with
+            inventory_data before the first job
+    Returns:
+        * instance of nornir.core.task.AggregatedResult
+    '''
+    for name, host in nornir.inventory.hosts.items():
+        for key in set(host.data.keys()) - initial_data[name] - SHARED_DATA:
+            del host.data[key]
+    nornir.data.reset_failed_hosts()
+    return load_binding(job.binding.name).execute(nornir, **job.parameters)
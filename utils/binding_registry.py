@@ -0,0 +1,121 @@
+import os
+import ast
+from collections import namedtuple
+from importlib import import_module
+from app_exception import AppException
+
+BINDINGS_PACKAGE = 'bindings'
+# module level constants read from binding source, with defaults
+METADATA = {'DESCRIPTION': '', 'PARAMETERS': {}, 'PLATFORMS': ()}
+
+BindingInfo = namedtuple('BindingInfo', ['name', 'description', 'parameters',
+                                         'platforms'])
+_registry = {}
+
+
+class BindingRegistryException(AppException):
+    '''Top-level module exception for inheritance purposes.'''
+    pass
+
+
+class UnknownBinding(BindingRegistryException):
+    '''Exception to raise if there is no binding with given name.'''
+    pass
+
+
+class MalformedBinding(BindingRegistryException):
+    '''Exception to raise if binding metadata can't be read.'''
+    pass
+
+
+def read_binding_info(path):
+    '''Read binding metadata from module level DESCRIPTION, PARAMETERS and
+    PLATFORMS constants of binding source, without importing it (and all of
+    Nornir with it). Constants must be literals.
+    Arguments:
+        * path - binding module file location
+    Returns:
+        * instance of BindingInfo
+    '''
+    with open(path, 'r', encoding='utf-8') as source:
+        try:
+            tree = ast.parse(source.read(), filename=path)
+        except SyntaxError as e:
+            raise MalformedBinding('binding {} is broken: {}'.format(path, e))
+    metadata = dict(METADATA)
+    for node in tree.body:
+        if not isinstance(node, ast.Assign):
+            continue
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id in METADATA:
+                try:
+                    metadata[target.id] = ast.literal_eval(node.value)
+                except ValueError:
+                    raise MalformedBinding(
+                        '{} of binding {} is not a literal'.format(
+                            target.id, path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    return BindingInfo(name, metadata['DESCRIPTION'],
+                       metadata['PARAMETERS'],
+                       tuple(metadata['PLATFORMS']))
+
+
+def get_bindings(directory=BINDINGS_PACKAGE):
+    '''Grab metadata of all bindings in directory. Metadata is re-read only
+    for binding modules changed since the last call.
+    Arguments:
+        * directory (defaults to BINDINGS_PACKAGE) - directory with binding
+            modules
+    Returns:
+        * dictionary with binding names as keys and BindingInfo as values
+    '''
+    bindings = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.py') or filename.startswith(('.', '_')):
+            continue
+        path = os.path.join(directory, filename)
+        mtime = os.stat(path).st_mtime_ns
+        cached = _registry.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _registry[path] = (mtime, read_binding_info(path))
+        bindings[cached[1].name] = cached[1]
+    return bindings
+
+
+def get_binding(name, directory=BINDINGS_PACKAGE):
+    '''Grab metadata of binding.
+    Arguments:
+        * name - binding name
+        * directory (defaults to BINDINGS_PACKAGE) - directory with binding
+            modules
+    Returns:
+        * instance of BindingInfo
+    '''
+    try:
+        return get_bindings(directory)[name]
+    except KeyError:
+        raise UnknownBinding('no such binding - {}'.format(name))
+
+
+def unsupported_hosts(binding, hosts):
+    '''Find hosts with platform binding doesn't support.
+    Arguments:
+        * binding - instance of BindingInfo
+        * hosts - iterable of nornir.core.inventory.Host
+    Returns:
+        * list of host names; empty if binding declares no platforms
+    '''
+    if not binding.platforms:
+        return []
+    return [x.name for x in hosts if x.platform not in binding.platforms]
+
+
+def load_binding(name):
+    '''Import binding module, pulling in Nornir and all dependencies.
+    Arguments:
+        * name - binding name
+    Returns:
+        * binding module
+    '''
+    get_binding(name)
+    return import_module('.' + name, package=BINDINGS_PACKAGE)
@@ -0,0 +1,41 @@
+import os
+from nornir import InitNornir
+from nornir.plugins.inventory.simple import SimpleInventory
+from utils.inventory_cache import load_yaml
+
+SIMPLE_INVENTORY = 'nornir.plugins.inventory.simple.SimpleInventory'
+
+
+class CachedInventory(SimpleInventory):
+    '''SimpleInventory, which loads host, group and defaults files through
+    compiled snapshots of utils.inventory_cache. Accepts the same options
+    as SimpleInventory.
+    '''
+    def __init__(self, host_file='hosts.yaml', group_file='groups.yaml',
+                 defaults_file='defaults.yaml', *args, **kwargs):
+        kwargs['hosts'] = load_yaml(host_file)
+        for key, location in (('groups', group_file),
+                              ('defaults', defaults_file)):
+            if location and os.path.exists(location):
+                kwargs[key] = load_yaml(location) or {}
+            else:
+                kwargs[key] = {}
+        super().__init__(host_file, group_file, defaults_file, *args,
+                         **kwargs)
+
+
+def init_nornir(config, **kwargs):
+    '''Initialize Nornir from config file, replacing SimpleInventory with
+    CachedInventory, so repeated initializations don't parse unchanged
+    inventory files. Other inventory plugins are used as configured.
+    Arguments:
+        * config - Nornir configuration file location
+        * kwargs - additional arguments for nornir.InitNornir
+    Returns:
+        * instance of nornir.core.Nornir
+    '''
+    inventory = dict(load_yaml(config).get('inventory') or {})
+    if inventory.get('plugin', SIMPLE_INVENTORY) == SIMPLE_INVENTORY:
+        inventory['plugin'] = CachedInventory
+        kwargs['inventory'] = inventory
+    return InitNornir(config_file=config, **kwargs)
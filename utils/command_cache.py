@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from utils import metrics
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 512
+
+
+class CommandCache:
+    '''Cache of CLI command outputs for a single host. Outputs are keyed by
+    rendered command string, expire after TTL seconds and least recently used
+    ones are evicted after number of entries reach the limit.
+    Attributes:
+        * ttl (defaults to DEFAULT_TTL) - number of seconds cached output
+            considered valid; None means outputs never expire; used in __init__
+        * max_entries (defaults to DEFAULT_MAX_ENTRIES) - maximum number of
+            outputs kept in cache; used in __init__
+        * hits - number of lookups answered from cache
+        * misses - number of lookups that required command to be sent
+    '''
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, command):
+        '''Grab output for command from cache, counting hit or miss.
+        Arguments:
+            * command - rendered command string
+        Returns:
+            * command output or None if there is no valid cached output
+        '''
+        entry = self._entries.get(command)
+        if entry is not None:
+            stored_at, output = entry
+            if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                self._entries.move_to_end(command)
+                self.hits += 1
+                return output
+            del self._entries[command]
+        self.misses += 1
+        return None
+
+    def put(self, command, output):
+        '''Store command output in cache, evicting least recently used
+        entries if cache is full.
+        Arguments:
+            * command - rendered command string
+            * output - command output
+        Returns nothing
+        '''
+        self._entries[command] = (time.monotonic(), output)
+        self._entries.move_to_end(command)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        '''Drop all cached outputs, statistics are preserved.'''
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return '{} entries, {} hits, {} misses'.format(
+            len(self), self.hits, self.misses)
+
+
+def get_command_cache(host):
+    '''Grab command cache bound to Nornir host or create new one. TTL and
+    size limit can be tuned with 'command_cache_ttl' and
+    'command_cache_size' host data keys.
+    Arguments:
+        * host - instance of nornir.core.inventory.Host
+    Returns:
+        * instance of CommandCache
+    '''
+    if 'command_cache' not in host.keys():
+        host['command_cache'] = CommandCache(
+            ttl=host.get('command_cache_ttl', DEFAULT_TTL),
+            max_entries=host.get('command_cache_size', DEFAULT_MAX_ENTRIES))
+    return host['command_cache']
+
+
+def send_command(task, command, use_cache=True):
+    '''Send command to task host through netmiko connection (or through
+    host['command_channel'] if task is run by utils.async_engine), answering
+    from per-host command cache if the same command was sent already during
+    this run. Sent commands are held back by host['command_limiter'], if
+    it is set, and recorded by utils.metrics, if it is enabled.
+    Arguments:
+        * task - instance or nornir.core.task.Task
+        * command - rendered command string
+        * use_cache (defaults to True) - if False, always send command to
+            device; fresh output still stored in cache
+    Returns:
+        * command output
+    '''
+    metrics.set_operation(task)
+    cache = get_command_cache(task.host)
+    if use_cache:
+        output = cache.get(command)
+        if output is not None:
+            return output
+    # commands are rate limited if task is run by utils.scheduler
+    limiter = task.host.get('command_limiter')
+    if limiter is not None:
+        limiter.wait()
+    connection = task.host.get('command_channel')
+    if connection is None:
+        connection = task.host.get_connection('netmiko', None)
+    start = time.perf_counter()
+    output = connection.send_command(command)
+    metrics.record_command(task, command, output,
+                           time.perf_counter() - start)
+    cache.put(command, output)
+    return output
@@ -0,0 +1,328 @@
+import os
+import json
+import time
+import socket
+import tempfile
+import threading
+import socketserver
+from utils.nornir_utils import nornir_set_credentials, select_hosts
+from utils.binding_registry import (get_bindings, get_binding, load_binding,
+                                    unsupported_hosts, UnknownBinding)
+from app_exception import AppException
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(),
+                              'nornir_bindings-{}.sock'.format(os.getuid()))
+DEFAULT_IDLE_TIMEOUT = 600
+# how often server loop wakes up to evict idle connections
+POLL_INTERVAL = 5
+
+
+class DaemonException(AppException):
+    '''Top-level module exception for inheritance purposes.'''
+    pass
+
+
+class DaemonUnavailable(DaemonException):
+    '''Exception to raise if there is no daemon listening on socket.'''
+    pass
+
+
+class RequestError(DaemonException):
+    '''Exception to raise if daemon can't serve request, on both sides of
+    socket.'''
+    pass
+
+
+class ConnectionPool:
+    '''Keep netmiko connections of Nornir hosts open between binding runs
+    and close ones unused for idle_timeout seconds. Connections themselves
+    stay in host.connections, so operations get them with usual
+    host.get_connection call; pool only tracks their usage. Host checked out
+    from pool is locked, so only one binding at a time is using its
+    connection.
+    Attributes:
+        * idle_timeout (defaults to DEFAULT_IDLE_TIMEOUT) - seconds
+            connection may stay unused before closing; used in __init__
+    '''
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._host_locks = {}
+        self._hosts = {}
+        self._last_used = {}
+        self._in_use = set()
+
+    def checkout(self, host):
+        '''Lock host for exclusive use, waiting for other binding run on it
+        to finish, and drop its netmiko connection if device closed it, so
+        fresh one will be opened on first command.
+        Arguments:
+            * host - instance of nornir.core.inventory.Host
+        Returns nothing
+        '''
+        with self._lock:
+            host_lock = self._host_locks.setdefault(host.name,
+                                                    threading.Lock())
+        host_lock.acquire()
+        with self._lock:
+            self._hosts[host.name] = host
+            self._in_use.add(host.name)
+        connection = host.connections.get('netmiko')
+        if connection is not None and not connection.connection.is_alive():
+            self._close(host)
+
+    def release(self, host):
+        '''Unlock host, starting idle period of its connection.
+        Arguments:
+            * host - instance of nornir.core.inventory.Host
+        Returns nothing
+        '''
+        with self._lock:
+            self._in_use.discard(host.name)
+            self._last_used[host.name] = time.monotonic()
+        self._host_locks[host.name].release()
+
+    def evict_idle(self, now=None):
+        '''Close connections of hosts unused for idle_timeout seconds.
+        Arguments:
+            * now (defaults to None) - monotonic time to count idle periods
+                to; if None, current time is used
+        Returns:
+            * list of evicted host names
+        '''
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            evicted = [name for name, last_used in self._last_used.items()
+                       if name not in self._in_use and
+                       now - last_used >= self.idle_timeout]
+            for name in evicted:
+                del self._last_used[name]
+                self._close(self._hosts.pop(name))
+        return evicted
+
+    def close_all(self):
+        '''Close connections of all hosts not in use.'''
+        self.evict_idle(now=float('inf'))
+
+    def _close(self, host):
+        # connection may be already closed by device, drop it anyway
+        try:
+            host.close_connection('netmiko')
+        except Exception:
+            host.connections.pop('netmiko', None)
+
+    def __len__(self):
+        return len(self._last_used)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    '''Read single JSON encoded request line from client, pass it to
+    RunnerDaemon and write JSON encoded response line back.'''
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            response = {'error': 'malformed request'}
+        else:
+            # client must get response whatever binding raised
+            try:
+                response = self.server.runner.handle(request)
+            except AppException as e:
+                response = {'error': str(e)}
+            except Exception as e:
+                response = {'error': '{}: {}'.format(type(e).__name__, e)}
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    '''Unix socket server which evicts idle connections between requests.
+    Attributes:
+        * runner - instance of RunnerDaemon; used in __init__
+    '''
+    daemon_threads = True
+
+    def __init__(self, socket_path, runner):
+        self.runner = runner
+        super().__init__(socket_path, RequestHandler)
+
+    def service_actions(self):
+        self.runner.pool.evict_idle()
+
+
+class RunnerDaemon:
+    '''Long-lived runner, which initializes Nornir and asks for credentials
+    once and then executes bindings on request, reusing connections to
+    hosts between runs. Requests are JSON objects with 'action' key:
+        * {"action": "hosts", "patterns": [...], "groups": [...],
+            "filters": {...}} - select hosts from inventory, see
+            utils.nornir_utils.select_hosts
+        * {"action": "bindings"} - list bindings and their parameters
+        * {"action": "run", "hosts": [...], "binding": ...,
+            "parameters": {...}, "workers": ...} - execute binding on hosts
+    Attributes:
+        * config - Nornir configuration file location; used in __init__
+        * socket_path (defaults to DEFAULT_SOCKET) - Unix socket to listen
+            on; used in __init__
+        * idle_timeout (defaults to DEFAULT_IDLE_TIMEOUT) - seconds
+            connection may stay unused before closing; used in __init__
+        * username (defaults to None) - username to access network nodes,
+            gathered from OS if None; used in __init__
+    '''
+    def __init__(self, config, socket_path=DEFAULT_SOCKET,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, username=None):
+        # nornir is slow to import, thin client must not pay for it
+        from utils.cached_inventory import init_nornir
+        self.nornir = init_nornir(config)
+        nornir_set_credentials(self.nornir, username)
+        self.socket_path = socket_path
+        self.pool = ConnectionPool(idle_timeout)
+        self.server = None
+        # data gathered by operations is dropped before every run, so
+        # bindings work with fresh outputs
+        self._initial_data = {name: set(host.data.keys()) for name, host in
+                              self.nornir.inventory.hosts.items()}
+
+    def handle(self, request):
+        '''Serve single client request.
+        Arguments:
+            * request - dictionary with request
+        Returns:
+            * dictionary with response
+        '''
+        action = request.get('action')
+        if action == 'hosts':
+            selected = select_hosts(self.nornir, request.get('patterns', ()),
+                                    request.get('groups', ()),
+                                    request.get('filters'))
+            return {'hosts': sorted(selected.inventory.hosts)}
+        elif action == 'bindings':
+            return {'bindings': [x._asdict() for x in get_bindings().values()]}
+        elif action == 'run':
+            results = self.run_binding(request.get('hosts', []),
+                                       request.get('binding'),
+                                       request.get('parameters', {}),
+                                       request.get('workers'))
+            return {'results': {name: {'result': str(x), 'failed': x.failed}
+                                for name, x in results.items()}}
+        raise RequestError('unknown action - {}'.format(action))
+
+    def run_binding(self, hostnames, binding, parameters, num_workers=None):
+        '''Execute binding on hosts at once.
+        Arguments:
+            * hostnames - list of host names from inventory
+            * binding - binding module name
+            * parameters - dictionary of binding parameters; all of them must
+                be given, daemon can't prompt for input
+            * num_workers (defaults to None) - number of hosts to process at
+                once; if None, configured number is used
+        Returns:
+            * dictionary with host names as keys and instances of
+                nornir.core.task.Result of topmost task as values
+        '''
+        unknown = [x for x in hostnames
+                   if x not in self.nornir.inventory.hosts]
+        if unknown:
+            raise RequestError('hosts not in inventory - {}'.format(
+                ', '.join(unknown)))
+        if not hostnames:
+            raise RequestError('no hosts to run binding on')
+        try:
+            info = get_binding(binding)
+        except UnknownBinding as e:
+            raise RequestError(e)
+        if set(parameters) != set(info.parameters):
+            raise RequestError('binding {} expects parameters: {}'.format(
+                binding, ', '.join(info.parameters)))
+        unsupported = unsupported_hosts(info, [
+            self.nornir.inventory.hosts[x] for x in hostnames])
+        if unsupported:
+            raise RequestError('binding {} does not support platform of '
+                               'hosts - {}'.format(binding,
+                                                   ', '.join(unsupported)))
+        module = load_binding(binding)
+        # hosts are checked out in the same order by every request, so
+        # overlapping requests can't deadlock
+        hosts = [self.nornir.inventory.hosts[x] for x in sorted(
+            set(hostnames))]
+        checked_out = []
+        try:
+            for host in hosts:
+                self.pool.checkout(host)
+                checked_out.append(host)
+                for key in set(host.data.keys()) - self._initial_data[
+                        host.name]:
+                    del host.data[key]
+                self.nornir.data.recover_host(host.name)
+            result = module.execute(select_hosts(
+                self.nornir, [x.name for x in hosts],
+                num_workers=num_workers), **parameters)
+        finally:
+            for host in checked_out:
+                self.pool.release(host)
+        return {x.name: result[x.name][0] for x in hosts}
+
+    def bind(self):
+        '''Start listening on Unix socket, which only owner can access.
+        Socket left by crashed daemon is removed.
+        Returns nothing
+        '''
+        if os.path.exists(self.socket_path):
+            try:
+                send_request({'action': 'bindings'}, self.socket_path)
+            except DaemonUnavailable:
+                os.unlink(self.socket_path)
+            else:
+                raise DaemonException('daemon is already running on {}'.format(
+                    self.socket_path))
+        old_umask = os.umask(0o177)
+        try:
+            self.server = DaemonServer(self.socket_path, self)
+        finally:
+            os.umask(old_umask)
+
+    def close(self):
+        '''Stop listening and close all connections.'''
+        if self.server is not None:
+            self.server.server_close()
+            os.unlink(self.socket_path)
+            self.server = None
+        self.pool.close_all()
+
+    def serve(self):
+        '''Serve requests until interrupted.'''
+        self.bind()
+        try:
+            self.server.serve_forever(poll_interval=POLL_INTERVAL)
+        finally:
+            self.close()
+
+
+def send_request(request, socket_path=DEFAULT_SOCKET):
+    '''Send request to daemon and wait for response.
+    Arguments:
+        * request - dictionary with request
+        * socket_path (defaults to DEFAULT_SOCKET) - daemon Unix socket
+    Returns:
+        * dictionary with response
+    '''
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            client.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            raise DaemonUnavailable('no daemon listening on {}'.format(
+                socket_path))
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with client.makefile('rb') as reader:
+            line = reader.readline()
+    finally:
+        client.close()
+    if not line:
+        raise RequestError('daemon closed connection without response')
+    response = json.loads(line.decode('utf-8'))
+    if 'error' in response:
+        raise RequestError(response['error'])
+    return response
@@ -0,0 +1,126 @@
+import os
+import time
+import hashlib
+from drivers import get_host_driver
+from utils.command_cache import send_command
+from utils import inventory_cache
+from utils.inventory_cache import read_snapshot, write_snapshot
+
+DEFAULT_FACTS_TTL = 86400
+
+
+class HostFacts:
+    '''Slowly changing facts of a single host (interface names, VRF
+    interfaces and bindings), persisted between runs and valid while
+    configuration checkpoint of device stays the same. Every fact put is
+    written through to disk.
+    Attributes:
+        * location - facts file location; used in __init__
+        * checkpoint - configuration checkpoint facts were learned at; used
+            in __init__
+        * facts (defaults to None) - dictionary with fact names as keys;
+            used in __init__
+        * learned_at (defaults to None) - time facts were learned at, now if
+            None; used in __init__
+        * hits - number of lookups answered from facts
+        * misses - number of lookups that required commands to be sent
+    '''
+    def __init__(self, location, checkpoint, facts=None, learned_at=None):
+        self.location = location
+        self.checkpoint = checkpoint
+        self.facts = facts if facts is not None else {}
+        self.hits = 0
+        self.misses = 0
+        self.learned_at = learned_at or time.time()
+
+    def get(self, name):
+        '''Grab fact, counting hit or miss.
+        Arguments:
+            * name - fact name
+        Returns:
+            * fact value or None if it is not known
+        '''
+        value = self.facts.get(name)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, name, value):
+        '''Store fact and write all facts to disk, unless checkpoint is
+        unknown.
+        Arguments:
+            * name - fact name
+            * value - picklable fact value
+        Returns nothing
+        '''
+        self.facts[name] = value
+        if self.checkpoint is not None:
+            write_snapshot(self.location, {'checkpoint': self.checkpoint,
+                                           'learned_at': self.learned_at},
+                           self.facts)
+
+    def __str__(self):
+        return '{} facts at {}, {} hits, {} misses'.format(
+            len(self.facts), self.checkpoint, self.hits, self.misses)
+
+
+def facts_path(hostname, cache_dir=None):
+    '''Find location of facts file for host.
+    Arguments:
+        * hostname - Nornir host name
+        * cache_dir (defaults to None) - directory with caches; if None,
+            utils.inventory_cache.DEFAULT_CACHE_DIR is used
+    Returns:
+        * facts file location
+    '''
+    key = hashlib.sha1(hostname.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir or inventory_cache.DEFAULT_CACHE_DIR,
+                        'facts', key + '.pickle')
+
+
+def load_facts(hostname, checkpoint, ttl=DEFAULT_FACTS_TTL, cache_dir=None):
+    '''Load facts of host, dropping ones learned at another configuration
+    checkpoint or longer than TTL seconds ago. Facts are never trusted if
+    checkpoint is unknown.
+    Arguments:
+        * hostname - Nornir host name
+        * checkpoint - current configuration checkpoint of device or None
+        * ttl (defaults to DEFAULT_FACTS_TTL) - number of seconds facts
+            considered valid
+        * cache_dir (defaults to None) - directory with caches
+    Returns:
+        * instance of HostFacts
+    '''
+    location = facts_path(hostname, cache_dir)
+    meta, load_data = read_snapshot(location)
+    if checkpoint is not None and meta is not None and meta.get(
+            'checkpoint') == checkpoint and time.time() - meta.get(
+                'learned_at', 0) < ttl:
+        return HostFacts(location, checkpoint, load_data(),
+                         meta['learned_at'])
+    return HostFacts(location, checkpoint)
+
+
+def get_host_facts(task):
+    '''Grab facts of task host, probing device configuration checkpoint with
+    a single cheap command once per run. Facts cache is enabled with
+    'facts_cache' host data key, TTL and directory can be tuned with
+    'facts_cache_ttl' and 'facts_cache_dir' ones.
+    Arguments:
+        * task - instance or nornir.core.task.Task
+    Returns:
+        * instance of HostFacts or None if facts cache is disabled
+    '''
+    if not task.host.get('facts_cache'):
+        return None
+    if 'facts' not in task.host.keys():
+        driver = get_host_driver(task.host)
+        checkpoint = driver.parse_config_checkpoint(send_command(
+            task, driver.command('show config checkpoint'), use_cache=False))
+        task.host['facts'] = load_facts(
+            task.host.name, checkpoint,
+            ttl=task.host.get('facts_cache_ttl', DEFAULT_FACTS_TTL),
+            cache_dir=task.host.get('facts_cache_dir'))
+    return task.host['facts']
@@ -0,0 +1,334 @@
+import os
+import re
+import csv
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+from app_exception import AppException
+
+# tables with their columns and SQLite column types; every row starts with
+# snapshot (export time) and host name, so exports can be appended together
+TABLES = {
+    'interfaces': (
+        ('snapshot', 'TEXT'), ('host', 'TEXT'), ('interface', 'TEXT'),
+        ('description', 'TEXT'), ('mode', 'TEXT'), ('svi', 'INTEGER'),
+        ('subinterface', 'INTEGER'), ('lag', 'INTEGER'),
+        ('breakout', 'INTEGER'), ('admin_status', 'TEXT'),
+        ('oper_status', 'TEXT'), ('mac_address', 'TEXT'), ('mtu', 'INTEGER'),
+        ('speed', 'REAL'), ('duplex', 'TEXT'), ('load_in', 'REAL'),
+        ('load_out', 'REAL'), ('ipv4_neighbors', 'INTEGER'),
+        ('ipv6_neighbors', 'INTEGER'), ('macs_learned', 'INTEGER'),
+        ('switch_mode', 'TEXT'), ('pvid', 'INTEGER'), ('vlan_list', 'TEXT'),
+        ('vrf', 'TEXT'), ('member', 'TEXT')),
+    'interface_addresses': (
+        ('snapshot', 'TEXT'), ('host', 'TEXT'), ('interface', 'TEXT'),
+        ('address', 'TEXT'), ('prefix_length', 'INTEGER'),
+        ('version', 'INTEGER'), ('primary', 'INTEGER')),
+    'interface_vlans': (
+        ('snapshot', 'TEXT'), ('host', 'TEXT'), ('interface', 'TEXT'),
+        ('vlan', 'INTEGER')),
+    'bgp_neighbors': (
+        ('snapshot', 'TEXT'), ('host', 'TEXT'), ('vrf', 'TEXT'),
+        ('neighbor', 'TEXT'), ('as_number', 'INTEGER'),
+        ('router_id', 'TEXT'), ('type', 'TEXT'), ('state', 'TEXT'),
+        ('af', 'TEXT'), ('learned_routes', 'INTEGER'),
+        ('sent_routes', 'INTEGER')),
+    # digest of every interface and BGP neighbor record, to find records
+    # changed between snapshots without comparing them column by column
+    'record_hashes': (
+        ('snapshot', 'TEXT'), ('host', 'TEXT'), ('kind', 'TEXT'),
+        ('key', 'TEXT'), ('digest', 'INTEGER')),
+}
+# SQLite indexes on columns snapshots are looked up and joined by
+INDEXES = {
+    'interfaces': ('snapshot', 'host', 'interface'),
+    'bgp_neighbors': ('snapshot', 'host', 'neighbor'),
+    'record_hashes': ('snapshot', 'kind', 'host', 'key'),
+}
+# interface attributes exported as is, set by operations which were run
+INTERFACE_ATTRIBUTES = [x for x, _ in TABLES['interfaces'][3:]]
+# counters changing on every run are left out of record digests
+VOLATILE_ATTRIBUTES = ('load_in', 'load_out', 'ipv4_neighbors',
+                       'ipv6_neighbors', 'macs_learned')
+FORMATS = ('sqlite', 'csv', 'parquet')
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w.-]')
+
+
+class ExportException(AppException):
+    '''Top-level module exception for inheritance purposes.'''
+    pass
+
+
+class ExportDependencyMissing(ExportException):
+    '''Exception to raise if pyarrow is needed, but not installed.'''
+    pass
+
+
+def as_text(value):
+    '''Convert address objects and VLAN sets (into range notation) into
+    strings, keep other values as is.'''
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def record_digest(values):
+    '''Hash record values into signed 64-bit integer, stored in SQLite
+    INTEGER column.'''
+    return int.from_bytes(hashlib.blake2b(
+        repr(values).encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def neighbor_key(vrf, address):
+    '''Make BGP neighbor key of record_hashes table out of VRF name (may be
+    None) and neighbor address.'''
+    return '{}/{}'.format(vrf or '', address)
+
+
+def interface_rows(snapshot, hostname, interface):
+    '''Flatten utils.switch_objects.SwitchInterface into table rows.
+    Attributes not gathered by binding are exported as None.
+    Arguments:
+        * snapshot - snapshot label
+        * hostname - host name
+        * interface - instance of utils.switch_objects.SwitchInterface
+    Returns:
+        * dictionary with table names as keys and lists of rows as values
+    '''
+    values = []
+    for attribute in INTERFACE_ATTRIBUTES:
+        value = getattr(interface, attribute, None)
+        values.append(int(value) if isinstance(value, bool) else as_text(
+            value))
+    rows = {'interfaces': [(snapshot, hostname, interface.name, *values)]}
+    rows['interface_addresses'] = [
+        (snapshot, hostname, interface.name, x.address.compressed,
+         x.prefix_length, x.address.version, int(x.primary))
+        for x in interface.ipv4_addresses + interface.ipv6_addresses]
+    rows['interface_vlans'] = [
+        (snapshot, hostname, interface.name, x)
+        for x in getattr(interface, 'vlan_list', None) or []]
+    rows['record_hashes'] = [(
+        snapshot, hostname, 'interface', interface.name, record_digest((
+            [y for x, y in zip(INTERFACE_ATTRIBUTES, values)
+             if x not in VOLATILE_ATTRIBUTES],
+            [x[3:] for x in rows['interface_addresses']])))]
+    return rows
+
+
+def neighbor_rows(snapshot, hostname, vrf, neighbor):
+    '''Flatten utils.switch_objects.BGPNeighbor into rows, one per address
+    family; neighbor without address families (not established) gets a
+    single row with af set to None.
+    Arguments:
+        * snapshot - snapshot label
+        * hostname - host name
+        * vrf - name of VRF neighbor belongs to
+        * neighbor - instance of utils.switch_objects.BGPNeighbor
+    Returns:
+        * list of rows
+    '''
+    common = (snapshot, hostname, vrf, neighbor.address.compressed,
+              getattr(neighbor, 'as_number', None),
+              as_text(getattr(neighbor, 'router_id', None)),
+              getattr(neighbor, '_type', None),
+              getattr(neighbor, 'state', None))
+    families = [x for x in neighbor.af.values() if x]
+    if not families:
+        return [common + (None, None, None)]
+    return [common + (x.af_type, x.learned_routes, x.sent_routes)
+            for x in families]
+
+
+def neighbor_hash_row(snapshot, hostname, vrf, neighbor):
+    '''Make record_hashes row of BGP neighbor out of session parameters,
+    leaving routes numbers out.
+    Arguments:
+        * snapshot - snapshot label
+        * hostname - host name
+        * vrf - name of VRF neighbor belongs to
+        * neighbor - instance of utils.switch_objects.BGPNeighbor
+    Returns:
+        * row tuple
+    '''
+    return (snapshot, hostname, 'bgp_neighbor', neighbor_key(
+        vrf, neighbor.address.compressed), record_digest((
+            getattr(neighbor, 'as_number', None),
+            as_text(getattr(neighbor, 'router_id', None)),
+            getattr(neighbor, '_type', None),
+            getattr(neighbor, 'state', None))))
+
+
+def host_neighbors(host):
+    '''Iterate over BGP neighbors left in host data, either for single VRF
+    or for all VRFs.
+    Arguments:
+        * host - nornir.core.inventory.Host
+    Yields:
+        * tuples of (VRF name, utils.switch_objects.BGPNeighbor)
+    '''
+    vrf = host.data.get('vrf_name')
+    for neighbor in (host.data.get('bgp_neighbors') or {}).values():
+        yield vrf, neighbor
+    for vrf, neighbors in (host.data.get('vrf_bgp_neighbors') or {}).items():
+        for neighbor in neighbors.values():
+            yield vrf, neighbor
+
+
+def collect_rows(hosts, snapshot=None):
+    '''Flatten switch objects bindings left in host data into table rows.
+    Arguments:
+        * hosts - iterable of nornir.core.inventory.Host
+        * snapshot (defaults to None) - snapshot label; if None, current UTC
+            time is used
+    Returns:
+        * dictionary with table names as keys and lists of rows as values
+    '''
+    if snapshot is None:
+        snapshot = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    tables = {x: [] for x in TABLES}
+    for host in hosts:
+        for interface in host.data.get('interfaces') or []:
+            for table, rows in interface_rows(snapshot, host.name,
+                                              interface).items():
+                tables[table].extend(rows)
+        for vrf, neighbor in host_neighbors(host):
+            tables['bgp_neighbors'].extend(neighbor_rows(
+                snapshot, host.name, vrf, neighbor))
+            tables['record_hashes'].append(neighbor_hash_row(
+                snapshot, host.name, vrf, neighbor))
+    return tables
+
+
+def add_missing_columns(connection, table):
+    '''Add columns of TABLES missing in existing table, so database
+    exported by older version can be appended to; rows exported before have
+    them set to NULL.
+    Arguments:
+        * connection - sqlite3.Connection
+        * table - table name
+    Returns nothing
+    '''
+    existing = {x[1] for x in connection.execute(
+        'PRAGMA table_info({})'.format(table))}
+    for name, column_type in TABLES[table]:
+        if name not in existing:
+            connection.execute('ALTER TABLE {} ADD COLUMN "{}" {}'.format(
+                table, name, column_type))
+
+
+def write_sqlite(path, tables):
+    '''Append rows to SQLite database, creating tables and columns if
+    needed.
+    Arguments:
+        * path - database file location
+        * tables - dictionary with table names as keys and lists of rows as
+            values
+    Returns nothing
+    '''
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            for table, rows in tables.items():
+                columns = TABLES[table]
+                connection.execute('CREATE TABLE IF NOT EXISTS {} ({})'.format(
+                    table, ', '.join('"{}" {}'.format(x, y)
+                                     for x, y in columns)))
+                add_missing_columns(connection, table)
+                if table in INDEXES:
+                    connection.execute(
+                        'CREATE INDEX IF NOT EXISTS {0}_lookup ON {0} '
+                        '({1})'.format(table, ', '.join(
+                            '"{}"'.format(x) for x in INDEXES[table])))
+                # columns are named, as they are in different order in
+                # tables extended by add_missing_columns
+                connection.executemany(
+                    'INSERT INTO {} ({}) VALUES ({})'.format(
+                        table, ', '.join('"{}"'.format(x) for x, _ in columns),
+                        ', '.join('?' * len(columns))), rows)
+    finally:
+        connection.close()
+
+
+def write_csv(directory, tables):
+    '''Append rows to CSV file per table, header is written to new files.
+    Files with header of another version are not appended to, as their
+    columns don't match.
+    Arguments:
+        * directory - directory to write files to
+        * tables - dictionary with table names as keys and lists of rows as
+            values
+    Returns nothing
+    '''
+    os.makedirs(directory, exist_ok=True)
+    paths = {x: os.path.join(directory, x + '.csv') for x in tables}
+    # files are checked before any of them is appended to
+    for table, path in paths.items():
+        if os.path.exists(path):
+            with open(path, newline='', encoding='utf-8') as in_file:
+                if next(csv.reader(in_file), None) != [
+                        x for x, _ in TABLES[table]]:
+                    raise ExportException(
+                        '{} has columns of another version, export to new '
+                        'directory'.format(path))
+    for table, rows in tables.items():
+        new_file = not os.path.exists(paths[table])
+        with open(paths[table], 'a', newline='', encoding='utf-8') as out_file:
+            writer = csv.writer(out_file)
+            if new_file:
+                writer.writerow([x for x, _ in TABLES[table]])
+            writer.writerows(rows)
+
+
+def write_parquet(directory, tables):
+    '''Write rows to Parquet file per table and snapshot, so directory of
+    every table can be read as single dataset.
+    Arguments:
+        * directory - directory to write files to
+        * tables - dictionary with table names as keys and lists of rows as
+            values
+    Returns nothing
+    '''
+    # pyarrow is optional and slow to import, it is only needed here
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportDependencyMissing(
+            'pyarrow must be installed to export to Parquet')
+    for table, rows in tables.items():
+        if not rows:
+            continue
+        names = [x for x, _ in TABLES[table]]
+        arrow_table = pyarrow.table(dict(zip(names, zip(*rows))))
+        table_dir = os.path.join(directory, table)
+        os.makedirs(table_dir, exist_ok=True)
+        filename = UNSAFE_FILENAME_CHARS.sub('-', rows[0][0]) + '.parquet'
+        pyarrow.parquet.write_table(arrow_table,
+                                    os.path.join(table_dir, filename))
+
+
+WRITERS = {'sqlite': write_sqlite, 'csv': write_csv,
+           'parquet': write_parquet}
+
+
+def export_fleet(hosts, path, export_format='sqlite', snapshot=None):
+    '''Export interfaces, their addresses and VLANs and BGP neighbors
+    gathered by binding run into columnar tables, to query fleet state
+    offline.
+    Arguments:
+        * hosts - iterable of nornir.core.inventory.Host binding was run on
+        * path - SQLite database location or directory for CSV and Parquet
+            files
+        * export_format (defaults to 'sqlite') - one of FORMATS
+        * snapshot (defaults to None) - snapshot label; if None, current UTC
+            time is used
+    Returns:
+        * dictionary with table names as keys and numbers of rows as values
+    '''
+    if export_format not in WRITERS:
+        raise ExportException('unknown export format - {}'.format(
+            export_format))
+    tables = collect_rows(hosts, snapshot)
+    WRITERS[export_format](path, tables)
+    return {x: len(y) for x, y in tables.items()}
@@ -0,0 +1,162 @@
+import os
+import pickle
+import hashlib
+import tempfile
+
+SNAPSHOT_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'nornir_bindings')
+
+
+def file_digest(path):
+    '''Calculate SHA-1 digest of file contents.
+    Arguments:
+        * path - file location
+    Returns:
+        * hex digest string
+    '''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(path, cache_dir=None):
+    '''Find location of compiled snapshot for YAML file.
+    Arguments:
+        * path - YAML file location
+        * cache_dir (defaults to None) - directory with snapshots; if None,
+            DEFAULT_CACHE_DIR is used
+    Returns:
+        * snapshot file location
+    '''
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, key + '.pickle')
+
+
+def read_snapshot(location):
+    '''Read snapshot metadata and return loader for its data, so data is only
+    unpickled if snapshot is valid.
+    Arguments:
+        * location - snapshot file location
+    Returns:
+        * tuple of metadata dictionary and function returning data, or
+            (None, None) if there is no readable snapshot
+    '''
+    try:
+        with open(location, 'rb') as f:
+            meta = pickle.load(f)
+            data = f.read()
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None, None
+    if not isinstance(meta, dict) or meta.get(
+            'version') != SNAPSHOT_VERSION:
+        return None, None
+    return meta, lambda: pickle.loads(data)
+
+
+def write_snapshot(location, meta, data):
+    '''Atomically replace snapshot, so concurrent readers never see partial
+    one. Failures are ignored, snapshot is only an optimization.
+    Arguments:
+        * location - snapshot file location
+        * meta - metadata dictionary
+        * data - parsed YAML data
+    Returns nothing
+    '''
+    directory = os.path.dirname(location)
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp_location = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(dict(meta, version=SNAPSHOT_VERSION), f,
+                            pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_location, location)
+        except BaseException:
+            os.unlink(tmp_location)
+            raise
+    except OSError:
+        pass
+
+
+def parse_yaml(path):
+    '''Parse YAML file with safe loader, like Nornir SimpleInventory does.
+    ruamel.yaml is imported on first parse, runs answered from snapshots
+    don't need it.
+    Arguments:
+        * path - YAML file location
+    Returns:
+        * parsed YAML data
+    '''
+    from ruamel.yaml import YAML
+    with open(path, 'r', encoding='utf-8') as yaml_file:
+        return YAML(typ='safe').load(yaml_file)
+
+
+def load_yaml(path, cache_dir=None):
+    '''Load YAML file, answering from compiled snapshot if file is unchanged.
+    Snapshot is valid if file modification time and size are the same as
+    recorded; if they differ, but contents digest is the same (file was
+    touched or copied), snapshot is reused too. Parsing errors are raised
+    as is.
+    Arguments:
+        * path - YAML file location
+        * cache_dir (defaults to None) - directory with snapshots; if None,
+            DEFAULT_CACHE_DIR is used
+    Returns:
+        * parsed YAML data
+    '''
+    stat = os.stat(path)
+    location = snapshot_path(path, cache_dir)
+    meta, load_data = read_snapshot(location)
+    if meta is not None and (meta['mtime_ns'], meta['size']) == (
+            stat.st_mtime_ns, stat.st_size):
+        return load_data()
+    digest = file_digest(path)
+    if meta is not None and meta['digest'] == digest:
+        data = load_data()
+    else:
+        data = parse_yaml(path)
+    write_snapshot(location, {'mtime_ns': stat.st_mtime_ns,
+                              'size': stat.st_size, 'digest': digest}, data)
+    return data
+
+
+def inventory_files(config, cache_dir=None):
+    '''Grab inventory files locations from Nornir config.
+    Arguments:
+        * config - Nornir configuration file location
+        * cache_dir (defaults to None) - directory with snapshots
+    Returns:
+        * dictionary with inventory plugin options
+    '''
+    configuration = load_yaml(config, cache_dir) or {}
+    return configuration['inventory']['options']
+
+
+def get_hosts(config, cache_dir=None):
+    '''Grab hosts defined in inventory, without building Nornir objects.
+    Arguments:
+        * config - Nornir configuration file location
+        * cache_dir (defaults to None) - directory with snapshots
+    Returns:
+        * dictionary with host names as keys and host definitions as values
+    '''
+    return load_yaml(inventory_files(config, cache_dir)['host_file'],
+                     cache_dir) or {}
+
+
+def get_groups(config, cache_dir=None):
+    '''Grab groups defined in inventory, without building Nornir objects.
+    Arguments:
+        * config - Nornir configuration file location
+        * cache_dir (defaults to None) - directory with snapshots
+    Returns:
+        * dictionary with group names as keys and group definitions as values
+    '''
+    return load_yaml(inventory_files(config, cache_dir)['group_file'],
+                     cache_dir) or {}
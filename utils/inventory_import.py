@@ -0,0 +1,184 @@
+import csv
+import json
+import socket
+import threading
+import click
+from concurrent.futures import ThreadPoolExecutor
+from utils.runner import (RunnerException, get_inventory_groups,
+                          clean_groups, append_to_inventory,
+                          get_host_ip_address, check_config)
+from utils.inventory_cache import get_hosts
+
+DEFAULT_WORKERS = 32
+
+
+class MalformedImportFile(RunnerException):
+    '''Exception to raise if import file can't be read.'''
+    pass
+
+
+class DNSCache:
+    '''Thread-safe cache of DNS lookups. Both successful lookups and
+    failures are cached, so every name is resolved at most once during
+    import, whatever number of workers is asking for it.
+    Attributes:
+        * resolve (defaults to socket.gethostbyname) - function resolving
+            name into IP address and raising socket.gaierror on failure; used
+            in __init__
+    '''
+    def __init__(self, resolve=socket.gethostbyname):
+        self._resolve = resolve
+        self._lock = threading.Lock()
+        self._name_locks = {}
+        self._entries = {}
+
+    def resolve(self, name):
+        '''Resolve name into IP address, answering from cache if name was
+        resolved already. Concurrent lookups of the same name wait for the
+        first one.
+        Arguments:
+            * name - domain name
+        Returns:
+            * IP address string
+        '''
+        with self._lock:
+            name_lock = self._name_locks.setdefault(name, threading.Lock())
+        with name_lock:
+            if name not in self._entries:
+                try:
+                    self._entries[name] = (self._resolve(name), None)
+                except socket.gaierror as e:
+                    self._entries[name] = (None, e)
+        address, error = self._entries[name]
+        if error is not None:
+            raise error
+        return address
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def read_import_file(path):
+    '''Read hosts to import from CSV file with header or from JSONL file
+    (chosen by .jsonl or .json extension). Every record has 'hostname',
+    'address' (IP address or DNS domain to look hostname up in) and
+    'groups' (string with group names separated by commas or, for JSONL,
+    list of names) fields.
+    Arguments:
+        * path - import file location
+    Returns:
+        * list of tuples with line number and record dictionary
+    '''
+    records = []
+    with open(path, 'r', encoding='utf-8', newline='') as import_file:
+        if path.endswith(('.jsonl', '.json')):
+            for num, line in enumerate(import_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append((num, json.loads(line)))
+                except ValueError as e:
+                    raise MalformedImportFile('line {}: {}'.format(num, e))
+        else:
+            reader = csv.DictReader(import_file)
+            records = [(num, x) for num, x in enumerate(reader, 2)]
+    for num, record in records:
+        if not isinstance(record, dict) or not all(
+                record.get(x) for x in ('hostname', 'address', 'groups')):
+            raise MalformedImportFile(
+                'line {}: hostname, address and groups are required'.format(
+                    num))
+    return records
+
+
+def prepare_hosts(config, records, resolver, workers=DEFAULT_WORKERS):
+    '''Validate records and resolve host addresses concurrently. Groups are
+    checked against inventory loaded once.
+    Arguments:
+        * config - Nornir configuration file location
+        * records - list of tuples with line number and record dictionary
+        * resolver - instance of DNSCache
+        * workers (defaults to DEFAULT_WORKERS) - number of concurrent DNS
+            lookups
+    Returns:
+        * tuple of dictionary with hosts to add (host names as keys and
+            host definitions as values) and list of error strings
+    '''
+    configured_groups = get_inventory_groups(config)
+    existing_hosts = get_hosts(config)
+    errors = []
+    valid = []
+    seen = set()
+    for num, record in records:
+        hostname = str(record['hostname']).strip()
+        if hostname in existing_hosts:
+            errors.append('line {}: host {} is already in inventory'.format(
+                num, hostname))
+            continue
+        if hostname in seen:
+            errors.append('line {}: host {} is duplicated'.format(
+                num, hostname))
+            continue
+        try:
+            groups = clean_groups(record['groups'], configured_groups)
+        except RunnerException as e:
+            errors.append('line {}: {}'.format(num, e))
+            continue
+        seen.add(hostname)
+        valid.append((num, hostname, str(record['address']).strip(),
+                      groups))
+
+    def resolve(item):
+        num, hostname, address, groups = item
+        try:
+            return get_host_ip_address(address, hostname, resolver.resolve)
+        except RunnerException as e:
+            return e
+
+    hosts = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for item, ip in zip(valid, executor.map(resolve, valid)):
+            num, hostname, address, groups = item
+            if isinstance(ip, Exception):
+                errors.append('line {}: {} ({})'.format(num, ip, hostname))
+                continue
+            hosts[hostname] = {'hostname': ip, 'groups': groups}
+    return hosts, errors
+
+
+@click.command()
+@click.option('-c', '--config', default='config.yml', metavar='<PATH>',
+              help='path to Nornir config file')
+@click.option('-w', '--workers', default=DEFAULT_WORKERS,
+              type=click.IntRange(min=1), metavar='<N>',
+              help='number of concurrent DNS lookups')
+@click.option('--skip-errors', is_flag=True,
+              help='add valid hosts even if some records are invalid')
+@click.argument('import_file', type=click.Path(exists=True, dir_okay=False))
+def main(config, workers, skip_errors, import_file):
+    '''Add hosts from IMPORT_FILE into Nornir inventory. IMPORT_FILE is CSV
+    with header or JSONL (.jsonl extension) with hostname, address and
+    groups fields. Address is an IP address or DNS domain to look hostname
+    up in, groups are separated by commas. Hosts are written into inventory
+    at once; if any record is invalid, nothing is written unless
+    --skip-errors is given.
+    '''
+    try:
+        check_config(config)
+        records = read_import_file(import_file)
+    except RunnerException as e:
+        click.echo(e)
+        exit(1)
+    hosts, errors = prepare_hosts(config, records, DNSCache(), workers)
+    for error in errors:
+        click.echo(error)
+    if errors and not skip_errors:
+        click.echo('Nothing added, {} invalid records'.format(len(errors)))
+        exit(1)
+    if hosts:
+        append_to_inventory(config, hosts)
+    click.echo('{} hosts added'.format(len(hosts)))
+
+
+if __name__ == '__main__':
+    main()
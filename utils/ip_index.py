@@ -0,0 +1,163 @@
+import ipaddress
+from collections import namedtuple
+from utils.mac_index import (MacIndexException, require_numpy, mac_to_int,
+                             int_to_mac)
+from utils import mac_index
+
+IPV6_LOW_MASK = (1 << 64) - 1
+IPLocation = namedtuple('IPLocation', ['address', 'vrf', 'host', 'interface',
+                                       'mac', 'ports'])
+
+
+class InvalidIPAddress(MacIndexException):
+    '''Exception to raise if IP address to locate can't be parsed.'''
+    pass
+
+
+def parse_ip_address(address):
+    '''Parse IP address, raising InvalidIPAddress if it is not one.
+    Arguments:
+        * address - IPv4 or IPv6 address string
+    Returns:
+        * instance of ipaddress.IPv4Address or ipaddress.IPv6Address
+    '''
+    try:
+        return ipaddress.ip_address(address.strip())
+    except ValueError:
+        raise InvalidIPAddress('{} is not an IP address'.format(address))
+
+
+class IPIndex:
+    '''ARP and ND tables of many hosts kept as sorted numpy arrays: IPv4
+    addresses packed into uint32 and IPv6 addresses split into high and low
+    uint64 halves, with parallel arrays of MAC address, host, interface and
+    VRF. IP address is located with binary search and joined with MacIndex
+    by MAC address to find switch ports it is behind.
+    Attributes:
+        * entries - iterable of (host name, IP address, MAC address, interface
+            name, VRF name) tuples; used in __init__
+        * hosts, interfaces, vrfs - lists of names, indexed by ids arrays
+        * v4 - dictionary of numpy.ndarray: 'addresses' (sorted), 'macs',
+            'host_ids', 'interface_ids', 'vrf_ids'
+        * v6 - the same as v4, but with 'high' and 'low' address halves
+            (sorted by both) instead of 'addresses'
+    '''
+    def __init__(self, entries=()):
+        require_numpy()
+        numpy = mac_index.numpy
+        self.hosts = []
+        self.interfaces = []
+        self.vrfs = []
+        ids = ({}, {}, {})
+        columns = {4: [], 6: []}
+        for hostname, address, mac_address, interface, vrf_name in entries:
+            address = ipaddress.ip_address(address)
+            row = [int(address), mac_to_int(mac_address)]
+            for names, known, name in zip(
+                    (self.hosts, self.interfaces, self.vrfs), ids,
+                    (hostname, interface, vrf_name)):
+                if name not in known:
+                    known[name] = len(names)
+                    names.append(name)
+                row.append(known[name])
+            columns[address.version].append(row)
+        self.v4 = self._arrays(columns[4], {
+            'addresses': numpy.array([x[0] for x in columns[4]],
+                                     dtype=numpy.uint32)})
+        self.v6 = self._arrays(columns[6], {
+            'high': numpy.array([x[0] >> 64 for x in columns[6]],
+                                dtype=numpy.uint64),
+            'low': numpy.array([x[0] & IPV6_LOW_MASK for x in columns[6]],
+                               dtype=numpy.uint64)})
+
+    @staticmethod
+    def _arrays(rows, keys):
+        '''Build arrays of one address family, sorted by address.
+        Arguments:
+            * rows - list of [address, MAC, host id, interface id, VRF id]
+            * keys - dictionary of address arrays, most significant first
+        Returns:
+            * dictionary of numpy.ndarray
+        '''
+        numpy = mac_index.numpy
+        # lexsort sorts by last key first
+        order = numpy.lexsort(tuple(reversed(list(keys.values()))))
+        arrays = {x: y[order] for x, y in keys.items()}
+        for position, (name, dtype) in enumerate((
+                ('macs', numpy.uint64), ('host_ids', numpy.uint32),
+                ('interface_ids', numpy.uint32), ('vrf_ids', numpy.uint32)),
+                start=1):
+            arrays[name] = numpy.array([x[position] for x in rows],
+                                       dtype=dtype)[order]
+        return arrays
+
+    @classmethod
+    def from_hosts(cls, hosts):
+        '''Build index out of ARP and ND tables operations.check_interfaces.
+        get_ip_neighbors left in host data.
+        Arguments:
+            * hosts - iterable of nornir.core.inventory.Host
+        Returns:
+            * instance of IPIndex
+        '''
+        return cls((host.name, address, mac_address, interface, vrf_name)
+                   for host in hosts
+                   for address, mac_address, interface, vrf_name in
+                   host.data.get('ip_neighbors') or [])
+
+    def _positions(self, address):
+        '''Find array positions of IP address with binary search.
+        Arguments:
+            * address - instance of ipaddress.IPv4Address or IPv6Address
+        Returns:
+            * tuple of address family arrays and range of positions
+        '''
+        numpy = mac_index.numpy
+        value = int(address)
+        if address.version == 4:
+            arrays = self.v4
+            key = numpy.uint32(value)
+            return arrays, range(
+                numpy.searchsorted(arrays['addresses'], key, side='left'),
+                numpy.searchsorted(arrays['addresses'], key, side='right'))
+        arrays = self.v6
+        high = numpy.uint64(value >> 64)
+        low = numpy.uint64(value & IPV6_LOW_MASK)
+        start = numpy.searchsorted(arrays['high'], high, side='left')
+        end = numpy.searchsorted(arrays['high'], high, side='right')
+        lows = arrays['low'][start:end]
+        return arrays, range(
+            start + numpy.searchsorted(lows, low, side='left'),
+            start + numpy.searchsorted(lows, low, side='right'))
+
+    def locate(self, address, mac_table_index=None, vrf_name=None):
+        '''Find where IP address is resolved and, if MAC index is given,
+        switch ports its MAC address is learned on.
+        Arguments:
+            * address - IPv4 or IPv6 address string
+            * mac_table_index (defaults to None) - instance of
+                utils.mac_index.MacIndex
+            * vrf_name (defaults to None) - VRF name to look in; any VRF if
+                None
+        Returns:
+            * list of IPLocation; ports are lists of (MAC address, host name,
+                port name, VLAN number) tuples (empty without MAC index)
+        '''
+        address = parse_ip_address(address)
+        arrays, positions = self._positions(address)
+        locations = []
+        for position in positions:
+            vrf = self.vrfs[arrays['vrf_ids'][position]]
+            if vrf_name is not None and vrf != vrf_name:
+                continue
+            mac_address = int_to_mac(int(arrays['macs'][position]))
+            locations.append(IPLocation(
+                address.compressed, vrf,
+                self.hosts[arrays['host_ids'][position]],
+                self.interfaces[arrays['interface_ids'][position]],
+                mac_address, mac_table_index.locate(mac_address)
+                if mac_table_index is not None else []))
+        return locations
+
+    def __len__(self):
+        return len(self.v4['addresses']) + len(self.v6['high'])
@@ -0,0 +1,198 @@
+import re
+from app_exception import AppException
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAC_BITS = 48
+HEX_DIGITS = re.compile(r'^[0-9a-f]{1,12}$')
+MAC_SEPARATORS = re.compile(r'[:.-]')
+
+
+class MacIndexException(AppException):
+    '''Top-level module exception for inheritance purposes.'''
+    pass
+
+
+class MacIndexDependencyMissing(MacIndexException):
+    '''Exception to raise if numpy is needed, but not installed.'''
+    pass
+
+
+class InvalidMacAddress(MacIndexException):
+    '''Exception to raise if MAC address or prefix can't be parsed.'''
+    pass
+
+
+def require_numpy():
+    '''Raise MacIndexDependencyMissing if numpy is not installed, to fail
+    before MAC tables are collected.'''
+    if numpy is None:
+        raise MacIndexDependencyMissing(
+            'numpy must be installed to build MAC index')
+
+
+def parse_mac_prefix(prefix):
+    '''Parse MAC address or its prefix (like OUI) in any of standard, Cisco
+    or Huawei notations.
+    Arguments:
+        * prefix - MAC address or prefix string, like 'e0:d5:5e' or
+            'e0d5.5e19.49b4'
+    Returns:
+        * tuple of prefix as integer and its length in bits
+    '''
+    digits = MAC_SEPARATORS.sub('', prefix.strip().lower())
+    if not HEX_DIGITS.match(digits):
+        raise InvalidMacAddress('{} is not a MAC address or prefix'.format(
+            prefix))
+    return int(digits, 16), len(digits) * 4
+
+
+def mac_to_int(mac_address):
+    '''Convert MAC address into integer.
+    Arguments:
+        * mac_address - MAC address in standard, Cisco or Huawei notation
+    Returns:
+        * integer
+    '''
+    value, bits = parse_mac_prefix(mac_address)
+    if bits != MAC_BITS:
+        raise InvalidMacAddress('{} is not a MAC address'.format(mac_address))
+    return value
+
+
+def int_to_mac(value):
+    '''Convert integer into MAC address in standard notation.'''
+    digits = '{:012x}'.format(value)
+    return ':'.join(digits[x:x+2] for x in range(0, 12, 2))
+
+
+class MacIndex:
+    '''MAC tables of many hosts kept as sorted numpy uint64 array of MAC
+    addresses with parallel arrays of host, port and VLAN, so MAC address or
+    prefix is located with binary search and MACs learned on many ports are
+    found in a single vectorized pass.
+    Attributes:
+        * entries - iterable of (host name, MAC address, VLAN number, port
+            name) tuples; used in __init__
+        * hosts - list of host names, indexed by host_ids values
+        * ports - list of port names, indexed by port_ids values
+        * macs - numpy.ndarray of MAC addresses (uint64), sorted
+        * host_ids, port_ids, vlans - numpy.ndarray parallel to macs
+    '''
+    def __init__(self, entries=()):
+        require_numpy()
+        self.hosts = []
+        self.ports = []
+        host_ids = {}
+        port_ids = {}
+        macs, hosts, ports, vlans = [], [], [], []
+        for hostname, mac_address, vlan_id, port in entries:
+            macs.append(mac_to_int(mac_address))
+            if hostname not in host_ids:
+                host_ids[hostname] = len(self.hosts)
+                self.hosts.append(hostname)
+            hosts.append(host_ids[hostname])
+            if port not in port_ids:
+                port_ids[port] = len(self.ports)
+                self.ports.append(port)
+            ports.append(port_ids[port])
+            vlans.append(vlan_id)
+        macs = numpy.array(macs, dtype=numpy.uint64)
+        order = numpy.argsort(macs, kind='stable')
+        self.macs = macs[order]
+        self.host_ids = numpy.array(hosts, dtype=numpy.uint32)[order]
+        self.port_ids = numpy.array(ports, dtype=numpy.uint32)[order]
+        self.vlans = numpy.array(vlans, dtype=numpy.uint16)[order]
+
+    @classmethod
+    def from_hosts(cls, hosts):
+        '''Build index out of MAC tables operations.check_mac_table.
+        get_mac_table left in host data.
+        Arguments:
+            * hosts - iterable of nornir.core.inventory.Host
+        Returns:
+            * instance of MacIndex
+        '''
+        return cls((host.name, mac_address, vlan_id, port)
+                   for host in hosts
+                   for mac_address, vlan_id, port in host.data.get(
+                       'mac_table') or [])
+
+    def _entries(self, positions):
+        '''Build entries out of array positions.
+        Arguments:
+            * positions - iterable of positions in arrays
+        Returns:
+            * list of (MAC address, host name, port name, VLAN number) tuples
+        '''
+        return [(int_to_mac(int(self.macs[x])),
+                 self.hosts[self.host_ids[x]],
+                 self.ports[self.port_ids[x]], int(self.vlans[x]))
+                for x in positions]
+
+    def locate(self, mac_address):
+        '''Find where MAC address is learned.
+        Arguments:
+            * mac_address - MAC address in standard, Cisco or Huawei notation
+        Returns:
+            * list of (MAC address, host name, port name, VLAN number) tuples
+        '''
+        value = numpy.uint64(mac_to_int(mac_address))
+        return self._entries(range(
+            numpy.searchsorted(self.macs, value, side='left'),
+            numpy.searchsorted(self.macs, value, side='right')))
+
+    def locate_prefix(self, prefix):
+        '''Find where MAC addresses with prefix (like OUI) are learned.
+        Arguments:
+            * prefix - MAC address prefix, like 'e0:d5:5e' or 'e0d5.5e'
+        Returns:
+            * list of (MAC address, host name, port name, VLAN number) tuples
+        '''
+        value, bits = parse_mac_prefix(prefix)
+        shift = MAC_BITS - bits
+        return self._entries(range(
+            numpy.searchsorted(self.macs, numpy.uint64(value << shift)),
+            numpy.searchsorted(self.macs,
+                               numpy.uint64((value + 1) << shift))))
+
+    def shared_macs(self, edge_port=None):
+        '''Find MAC addresses learned on more than one edge port (on any
+        hosts) in a single vectorized pass.
+        Arguments:
+            * edge_port (defaults to None) - function receiving host name and
+                port name, returning True for edge ports; if None, all ports
+                are edge ones
+        Returns:
+            * dictionary with MAC addresses as keys and lists of (MAC
+                address, host name, port name, VLAN number) tuples as values
+        '''
+        # host and port pair encoded into single key
+        keys = self.host_ids.astype(numpy.uint64) * len(self.ports) + \
+            self.port_ids
+        positions = numpy.arange(len(self.macs))
+        if edge_port is not None and len(keys):
+            unique_keys, inverse = numpy.unique(keys, return_inverse=True)
+            edge = numpy.array([edge_port(
+                self.hosts[int(x) // len(self.ports)],
+                self.ports[int(x) % len(self.ports)]) for x in unique_keys],
+                dtype=bool)
+            positions = positions[edge[inverse]]
+        macs = self.macs[positions]
+        keys = keys[positions]
+        # macs are sorted, sort stably by key within every MAC
+        order = numpy.lexsort((keys, macs))
+        macs, keys, positions = macs[order], keys[order], positions[order]
+        new_pair = numpy.ones(len(macs), dtype=bool)
+        new_pair[1:] = (macs[1:] != macs[:-1]) | (keys[1:] != keys[:-1])
+        pair_macs, counts = numpy.unique(macs[new_pair], return_counts=True)
+        shared = numpy.isin(macs, pair_macs[counts > 1])
+        result = {}
+        for entry in self._entries(positions[shared]):
+            result.setdefault(entry[0], []).append(entry)
+        return result
+
+    def __len__(self):
+        return len(self.macs)
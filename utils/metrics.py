@@ -0,0 +1,438 @@
+import os
+import re
+import json
+import time
+import bisect
+import string
+import inspect
+import tempfile
+import functools
+import threading
+
+PREFIX = 'nornir_bindings_'
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# metric names with help texts, label names and bucket bounds
+METRICS = {
+    'command_seconds': ('Wall time of CLI commands sent to devices',
+                        ('host', 'platform', 'command'), SECONDS_BUCKETS),
+    'command_bytes': ('Size of CLI command outputs',
+                      ('host', 'platform', 'command'), BYTES_BUCKETS),
+    'parse_seconds': ('Time spent in driver parsers by operation',
+                      ('platform', 'operation', 'parser'), SECONDS_BUCKETS),
+    'task_seconds': ('Wall time of binding tasks',
+                     ('host', 'platform', 'task'), SECONDS_BUCKETS)}
+# number of label combinations kept for all metrics, next ones are dropped
+DEFAULT_MAX_SERIES = 20000
+# number of entries in every list of JSON summary
+DEFAULT_TOP = 20
+PROMETHEUS_FILE = 'nornir_bindings.prom'
+SUMMARY_FILE = 'nornir_bindings.json'
+# the only kind of placeholder vendor_vars.json command templates use
+TEMPLATE_FIELD = re.escape('{}')
+
+_registry = None
+_local = threading.local()
+
+
+class Histogram:
+    '''Histogram with fixed bucket bounds, so memory it takes doesn't depend
+    on number of observations.
+    Attributes:
+        * bounds - sorted tuple of bucket upper bounds; used in __init__
+        * counts - number of observations in every bucket, the last one is
+            for observations above all bounds
+        * sum - sum of observations
+        * count - number of observations
+        * max - the largest observation
+    '''
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+        self.count = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        '''Add observations of histogram with the same bounds.'''
+        self.counts = [x + y for x, y in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        '''Estimate quantile as upper bound of bucket it falls into.
+        Arguments:
+            * q - quantile, between 0 and 1
+        Returns:
+            * estimated value, never above the largest observation
+        '''
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if count and cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class MetricsRegistry:
+    '''Histograms of METRICS by label values, shared by all threads.
+    Attributes:
+        * max_series (defaults to DEFAULT_MAX_SERIES) - maximum number of
+            histograms kept; used in __init__
+        * dropped - number of observations dropped because of series limit
+    '''
+    def __init__(self, max_series=DEFAULT_MAX_SERIES):
+        self.max_series = max_series
+        self.dropped = 0
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric, labels, value):
+        '''Record observation.
+        Arguments:
+            * metric - key of METRICS
+            * labels - tuple of label values in order of METRICS
+            * value - observed value
+        Returns nothing
+        '''
+        key = (metric, labels)
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                if len(self._series) >= self.max_series:
+                    self.dropped += 1
+                    return
+                histogram = self._series[key] = Histogram(METRICS[metric][2])
+            histogram.observe(value)
+
+    def series(self, metric):
+        '''Grab histograms of metric.
+        Arguments:
+            * metric - key of METRICS
+        Returns:
+            * list of (labels tuple, Histogram) tuples sorted by labels
+        '''
+        with self._lock:
+            return sorted((y, z) for (x, y), z in self._series.items()
+                          if x == metric)
+
+    def aggregate(self, metric, keep):
+        '''Merge histograms of metric over labels not kept.
+        Arguments:
+            * metric - key of METRICS
+            * keep - names of labels to keep
+        Returns:
+            * dictionary with tuples of kept label values as keys and
+                Histogram as values
+        '''
+        names = METRICS[metric][1]
+        positions = [names.index(x) for x in keep]
+        merged = {}
+        for labels, histogram in self.series(metric):
+            key = tuple(labels[x] for x in positions)
+            if key not in merged:
+                merged[key] = Histogram(histogram.bounds)
+            merged[key].merge(histogram)
+        return merged
+
+    def to_prometheus(self):
+        '''Render all histograms in Prometheus text exposition format.
+        Returns:
+            * string with metrics
+        '''
+        lines = []
+        for metric, (help_text, names, _) in METRICS.items():
+            name = PREFIX + metric
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} histogram'.format(name))
+            for labels, histogram in self.series(metric):
+                pairs = ['{}="{}"'.format(x, escape_label(y))
+                         for x, y in zip(names, labels)]
+                cumulative = 0
+                for bound, count in zip(histogram.bounds + ('+Inf',),
+                                        histogram.counts):
+                    cumulative += count
+                    lines.append('{}_bucket{{{}}} {}'.format(
+                        name, ','.join(pairs + ['le="{}"'.format(bound)]),
+                        cumulative))
+                lines.append('{}_sum{{{}}} {}'.format(
+                    name, ','.join(pairs), round(histogram.sum, 6)))
+                lines.append('{}_count{{{}}} {}'.format(
+                    name, ','.join(pairs), histogram.count))
+        name = PREFIX + 'dropped_observations'
+        lines.append('# HELP {} Observations dropped because of series '
+                     'limit'.format(name))
+        lines.append('# TYPE {} counter'.format(name))
+        lines.append('{} {}'.format(name, self.dropped))
+        return '\n'.join(lines) + '\n'
+
+    def summary(self, top=DEFAULT_TOP):
+        '''Summarize histograms to find the slowest commands, parsers and
+        tasks across the fleet.
+        Arguments:
+            * top (defaults to DEFAULT_TOP) - number of entries in every
+                list
+        Returns:
+            * dictionary with lists of entries sorted by total time: command
+                templates and tasks over all hosts, single host commands by
+                the slowest one, and parsers by operation
+        '''
+        def entries(merged, names):
+            result = []
+            for labels, histogram in merged.items():
+                entry = dict(zip(names, labels))
+                entry.update(describe(histogram))
+                result.append(entry)
+            return sorted(result, key=lambda x: x['total'],
+                          reverse=True)[:top]
+
+        command_bytes = self.aggregate('command_bytes',
+                                       ('platform', 'command'))
+        commands = entries(self.aggregate(
+            'command_seconds', ('platform', 'command')),
+            ('platform', 'command'))
+        for entry in commands:
+            output_bytes = command_bytes.get((entry['platform'],
+                                              entry['command']))
+            entry['bytes'] = output_bytes.sum if output_bytes else 0
+        host_commands = [dict(zip(METRICS['command_seconds'][1], x),
+                              **describe(y))
+                         for x, y in self.series('command_seconds')]
+        return {
+            'commands': commands,
+            'slowest_host_commands': sorted(
+                host_commands, key=lambda x: x['max'], reverse=True)[:top],
+            'parsers': entries(self.aggregate(
+                'parse_seconds', METRICS['parse_seconds'][1]),
+                METRICS['parse_seconds'][1]),
+            'tasks': entries(self.aggregate(
+                'task_seconds', ('platform', 'task')), ('platform', 'task')),
+            'dropped_observations': self.dropped}
+
+
+def escape_label(value):
+    '''Escape label value for Prometheus text format.'''
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+def describe(histogram):
+    '''Make JSON friendly summary of histogram.'''
+    return {'count': histogram.count, 'total': round(histogram.sum, 6),
+            'mean': round(histogram.sum / histogram.count, 6)
+            if histogram.count else 0,
+            'p50': histogram.quantile(0.5), 'p95': histogram.quantile(0.95),
+            'max': round(histogram.max, 6)}
+
+
+def enable(max_series=DEFAULT_MAX_SERIES):
+    '''Start collecting metrics into new registry.
+    Arguments:
+        * max_series (defaults to DEFAULT_MAX_SERIES) - maximum number of
+            histograms kept
+    Returns:
+        * instance of MetricsRegistry
+    '''
+    global _registry
+    _registry = MetricsRegistry(max_series)
+    return _registry
+
+
+def disable():
+    '''Stop collecting metrics, dropping collected ones.'''
+    global _registry
+    _registry = None
+
+
+def get_registry():
+    '''Grab registry metrics are collected into or None if disabled.'''
+    return _registry
+
+
+def command_templates(driver):
+    '''Make matchers of rendered commands for driver command templates, most
+    specific (with the longest literal part) first.
+    Arguments:
+        * driver - instance of drivers.base.BaseDriver
+    Returns:
+        * list of (compiled regex, template) tuples
+    '''
+    matchers = []
+    for name, template in driver.commands.items():
+        fields = sum(1 for x in string.Formatter().parse(template)
+                     if x[1] is not None)
+        # driver may decorate rendered command, like NX-OS JSON one does
+        rendered = driver.command(name, *(('{}',) * fields))
+        matchers.append((re.compile('^{}$'.format(re.escape(rendered).replace(
+            TEMPLATE_FIELD, '(.+?)'))), rendered))
+    return sorted(matchers, key=lambda x: len(x[1].replace('{}', '')),
+                  reverse=True)
+
+
+@functools.lru_cache(maxsize=None)
+def _driver_templates(driver):
+    return command_templates(driver)
+
+
+def command_template(host, command):
+    '''Find template command was rendered from, so commands sent for
+    different interfaces or VRFs share one histogram. Commands which don't
+    come from vendor_vars.json are labeled as is.
+    Arguments:
+        * host - instance of nornir.core.inventory.Host
+        * command - rendered command string
+    Returns:
+        * command template string
+    '''
+    from drivers import get_host_driver
+    from app_exception import UnsupportedNOS
+    try:
+        driver = get_host_driver(host)
+    except UnsupportedNOS:
+        return command
+    for regex, template in _driver_templates(driver):
+        if regex.match(command):
+            return template
+    return command
+
+
+def set_operation(task):
+    '''Remember Nornir task being run in this thread, so parse time of
+    outputs is attributed to it.
+    Arguments:
+        * task - instance of nornir.core.task.Task
+    Returns nothing
+    '''
+    if _registry is not None:
+        # subtasks are often run with human readable names
+        _local.operation = getattr(task.task, '__name__', task.name)
+
+
+def record_command(task, command, output, seconds):
+    '''Record wall time and output size of command sent to task host.
+    Arguments:
+        * task - instance of nornir.core.task.Task
+        * command - rendered command string
+        * output - command output
+        * seconds - command wall time
+    Returns nothing
+    '''
+    registry = _registry
+    if registry is None:
+        return
+    labels = (task.host.name, str(task.host.platform),
+              command_template(task.host, command))
+    registry.observe('command_seconds', labels, seconds)
+    registry.observe('command_bytes', labels, len(
+        output.encode('utf-8')) if isinstance(output, str) else 0)
+
+
+def _timed_items(registry, labels, items):
+    '''Yield items of parser generator, recording time spent in it.'''
+    elapsed = 0
+    start = time.perf_counter()
+    try:
+        for item in items:
+            elapsed += time.perf_counter() - start
+            yield item
+            start = time.perf_counter()
+        elapsed += time.perf_counter() - start
+    finally:
+        registry.observe('parse_seconds', labels, elapsed)
+
+
+def timed_parser(method):
+    '''Decorate driver parser (function or generator method) to record its
+    run time by driver platform, current operation and parser name. Only
+    the outermost parser call is recorded, parsers calling each other are
+    not counted twice.
+    Arguments:
+        * method - driver method
+    Returns:
+        * decorated method
+    '''
+    generator = inspect.isgeneratorfunction(method)
+
+    @functools.wraps(method)
+    def timed(self, *args, **kwargs):
+        registry = _registry
+        if registry is None or getattr(_local, 'parsing', False):
+            return method(self, *args, **kwargs)
+        labels = (str(self.platform), getattr(_local, 'operation', None) or
+                  'unknown', method.__name__)
+        if generator:
+            return _timed_items(registry, labels,
+                                method(self, *args, **kwargs))
+        _local.parsing = True
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _local.parsing = False
+            registry.observe('parse_seconds', labels,
+                             time.perf_counter() - start)
+    return timed
+
+
+def timed_task(task):
+    '''Decorate Nornir task function to record its wall time by host,
+    platform and task name.
+    Arguments:
+        * task - Nornir task function
+    Returns:
+        * decorated task function with the same name
+    '''
+    @functools.wraps(task)
+    def timed(nornir_task, *args, **kwargs):
+        registry = _registry
+        if registry is None:
+            return task(nornir_task, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return task(nornir_task, *args, **kwargs)
+        finally:
+            registry.observe('task_seconds', (
+                nornir_task.host.name, str(nornir_task.host.platform),
+                task.__name__), time.perf_counter() - start)
+    return timed
+
+
+def write_metrics(directory, registry=None):
+    '''Write Prometheus textfile (for node exporter textfile collector) and
+    JSON summary into directory, atomically replacing previous ones.
+    Arguments:
+        * directory - directory location, created if missing
+        * registry (defaults to None) - instance of MetricsRegistry; if
+            None, the one metrics are collected into is used
+    Returns:
+        * list of written file locations
+    '''
+    registry = registry or _registry or MetricsRegistry()
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for file_name, contents in (
+            (PROMETHEUS_FILE, registry.to_prometheus()),
+            (SUMMARY_FILE, json.dumps(registry.summary(), indent=2) + '\n')):
+        location = os.path.join(directory, file_name)
+        fd, tmp_location = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(contents)
+            os.chmod(tmp_location, 0o644)
+            os.replace(tmp_location, location)
+        except BaseException:
+            os.unlink(tmp_location)
+            raise
+        paths.append(location)
+    return paths
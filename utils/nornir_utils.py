@@ -1,9 +1,16 @@
+import os
+import copy
 import getpass
+from fnmatch import fnmatchcase
+
+# environment variable with password for non-interactive runs
+PASSWORD_ENV = 'NORNIR_BINDINGS_PASSWORD'
 
 
 def nornir_set_credentials(nornir, username=None):
     '''Iterate through hosts in inventory and assign them credentials. If no
-    username provided it will be gathered from OS. Password will be prompted.
+    username provided it will be gathered from OS. Password is taken from
+    PASSWORD_ENV environment variable or prompted, if it is not set.
     Arguments:
         * nornir - instance of nornir.core.Nornir
         * username (defaults to None) - username to access network nodes
@@ -12,7 +19,49 @@ def nornir_set_credentials(nornir, username=None):
         from os import getuid
         from pwd import getpwuid
         username = getpwuid(getuid())[0]
-    password = getpass.getpass()
+    password = os.environ.get(PASSWORD_ENV)
+    if password is None:
+        password = getpass.getpass()
     for host in nornir.inventory.hosts.values():
         host.username = username
         host.password = password
+
+
+def select_hosts(nornir, patterns=(), groups=(), filters=None,
+                 num_workers=None):
+    '''Filter Nornir inventory by host name patterns, groups and host data.
+    Host is selected if its name matches any of patterns, it belongs to any
+    of groups (directly or through parent groups) and all of filters match
+    its data. Empty selector matches all hosts.
+    Arguments:
+        * nornir - instance of nornir.core.Nornir
+        * patterns (defaults to empty tuple) - host name shell-style
+            patterns, like 'tor-1*'
+        * groups (defaults to empty tuple) - group names
+        * filters (defaults to None) - dictionary of host data keys and
+            values; values are compared as strings
+        * num_workers (defaults to None) - number of hosts to process at
+            once by returned Nornir; if None, configured number is kept
+    Returns:
+        * instance of nornir.core.Nornir with selected hosts
+    '''
+    filters = filters or {}
+
+    def is_selected(host):
+        if patterns and not any(fnmatchcase(host.name, x) for x in patterns):
+            return False
+        if groups and not any(host.has_parent_group(x) for x in groups):
+            return False
+        for key, value in filters.items():
+            host_value = host.get(key)
+            if host_value is None or str(host_value) != value:
+                return False
+        return True
+
+    selected = nornir.filter(filter_func=is_selected)
+    if num_workers:
+        # filtered Nornir shares configuration with original one
+        selected.config = copy.copy(selected.config)
+        selected.config.core = copy.copy(selected.config.core)
+        selected.config.core.num_workers = num_workers
+    return selected
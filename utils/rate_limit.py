@@ -0,0 +1,104 @@
+import time
+import threading
+
+# commands per second and burst size for a single device and for all
+# devices of a site together
+DEFAULT_COMMAND_RATE = 2.0
+DEFAULT_COMMAND_BURST = 5
+DEFAULT_SITE_COMMAND_RATE = 20.0
+DEFAULT_SITE_COMMAND_BURST = 40
+
+
+class TokenBucket:
+    '''Token bucket refilled with rate tokens per second up to burst tokens.
+    Tokens are reserved ahead: bucket goes into debt and caller is told how
+    long to wait, so concurrent callers are queued in reservation order
+    without holding the lock while waiting.
+    Attributes:
+        * rate - tokens added per second; used in __init__
+        * burst - maximum number of tokens; used in __init__
+        * clock (defaults to time.monotonic) - function returning current
+            time in seconds; used in __init__
+    '''
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        '''Take tokens out of bucket.
+        Arguments:
+            * tokens (defaults to 1) - number of tokens to take
+        Returns:
+            * seconds to wait before tokens may be used
+        '''
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (
+                now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+
+class CommandLimiter:
+    '''Limit commands sent to a device by all buckets it is bound to, like
+    its own and its site one. utils.command_cache.send_command waits on
+    limiter found in host['command_limiter'] before sending every command.
+    Attributes:
+        * buckets - list of TokenBucket; used in __init__
+        * sleep (defaults to time.sleep) - function to wait with; used in
+            __init__
+        * waited - total number of seconds commands were held back
+    '''
+    def __init__(self, buckets, sleep=time.sleep):
+        self.buckets = buckets
+        self.sleep = sleep
+        self.waited = 0.0
+
+    def wait(self):
+        '''Wait until command may be sent.'''
+        delay = max([x.reserve() for x in self.buckets] or [0.0])
+        if delay > 0:
+            self.waited += delay
+            self.sleep(delay)
+
+
+def build_limiters(hosts, clock=time.monotonic, sleep=time.sleep):
+    '''Create command limiter for every host, with own bucket and bucket
+    shared by hosts with the same 'site' host data. Rates are tuned with
+    'command_rate', 'command_burst', 'site_command_rate' and
+    'site_command_burst' host data keys (site ones are taken from the first
+    host of site, so are best set in site group data); rate of 0 disables
+    limit.
+    Arguments:
+        * hosts - iterable of nornir.core.inventory.Host
+        * clock (defaults to time.monotonic) - function returning current
+            time in seconds
+        * sleep (defaults to time.sleep) - function to wait with
+    Returns:
+        * dictionary with host names as keys and CommandLimiter as values
+    '''
+    sites = {}
+    limiters = {}
+    for host in hosts:
+        buckets = []
+        rate = host.get('command_rate', DEFAULT_COMMAND_RATE)
+        if rate:
+            buckets.append(TokenBucket(rate, host.get(
+                'command_burst', DEFAULT_COMMAND_BURST), clock))
+        site = host.get('site')
+        if site is not None:
+            if site not in sites:
+                site_rate = host.get('site_command_rate',
+                                     DEFAULT_SITE_COMMAND_RATE)
+                sites[site] = TokenBucket(site_rate, host.get(
+                    'site_command_burst', DEFAULT_SITE_COMMAND_BURST),
+                    clock) if site_rate else None
+            if sites[site] is not None:
+                buckets.append(sites[site])
+        limiters[host.name] = CommandLimiter(buckets, sleep)
+    return limiters
@@ -0,0 +1,157 @@
+import sys
+import json
+import time
+import threading
+import functools
+import traceback
+from nornir.core import Nornir
+from nornir.core.task import Result
+from nornir.core.exceptions import NornirSubTaskError
+
+
+class ResultSink:
+    '''Base class for sinks, which write umbrella result of every host as
+    soon as its task finishes, in completion order, with progress counter.
+    After result is written, its text and results of subtasks are dropped,
+    so fleet runs don't keep all outputs in memory until the end.
+    Attributes:
+        * stream (defaults to sys.stdout) - file-like object to write to;
+            used in __init__
+        * release (defaults to True) - if True, drop results after they are
+            written; used in __init__
+        * completed - number of hosts written during current run
+        * total - number of hosts in current run
+    '''
+    def __init__(self, stream=None, release=True):
+        self.stream = stream or sys.stdout
+        self.release = release
+        self.completed = 0
+        self.total = 0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def start(self, total):
+        '''Reset progress counters for new run.
+        Arguments:
+            * total - number of hosts task is going to run on
+        Returns nothing
+        '''
+        with self._lock:
+            self.completed = 0
+            self.total = total
+            self._started = time.monotonic()
+
+    def wrap(self, task):
+        '''Wrap Nornir task function, so its result is written on return.
+        Arguments:
+            * task - Nornir task function
+        Returns:
+            * wrapped task function with the same name
+        '''
+        @functools.wraps(task)
+        def streamed_task(nornir_task, **kwargs):
+            try:
+                result = task(nornir_task, **kwargs)
+            except NornirSubTaskError as e:
+                self.emit(nornir_task, Result(
+                    nornir_task.host, exception=e, result=str(e),
+                    failed=True))
+                raise
+            except Exception as e:
+                self.emit(nornir_task, Result(
+                    nornir_task.host, exception=e,
+                    result=traceback.format_exc(), failed=True))
+                raise
+            if not isinstance(result, Result):
+                result = Result(host=nornir_task.host, result=result)
+            self.emit(nornir_task, result)
+            return result
+        return streamed_task
+
+    def emit(self, nornir_task, result):
+        '''Write host result and release it.
+        Arguments:
+            * nornir_task - instance of nornir.core.task.Task
+            * result - instance of nornir.core.task.Result
+        Returns nothing
+        '''
+        with self._lock:
+            self.completed += 1
+            self.write(nornir_task.host.name, nornir_task.name, result,
+                       time.monotonic() - self._started)
+            self.stream.flush()
+        if self.release:
+            result.result = None
+            for subtask_result in nornir_task.results:
+                subtask_result.result = None
+
+    def write(self, hostname, task_name, result, elapsed):
+        '''Write single host result, implemented by subclasses.
+        Arguments:
+            * hostname - host name
+            * task_name - task name
+            * result - instance of nornir.core.task.Result
+            * elapsed - seconds since run start
+        Returns nothing
+        '''
+        raise NotImplementedError
+
+
+class TextSink(ResultSink):
+    '''Write results as text with progress header.'''
+    def write(self, hostname, task_name, result, elapsed):
+        self.stream.write('[{}/{}] {} - {} {} in {:.1f} s\n{}\n'.format(
+            self.completed, self.total, hostname, task_name,
+            'failed' if result.failed else 'ok', elapsed, result.result))
+
+
+class NDJSONSink(ResultSink):
+    '''Write results as newline delimited JSON objects.'''
+    def write(self, hostname, task_name, result, elapsed):
+        self.stream.write(json.dumps({
+            'host': hostname, 'task': task_name, 'failed': result.failed,
+            'result': str(result.result), 'completed': self.completed,
+            'total': self.total, 'elapsed': round(elapsed, 3)}) + '\n')
+
+
+SINKS = {'text': TextSink, 'ndjson': NDJSONSink}
+
+
+class StreamingNornir(Nornir):
+    '''Nornir, which passes results of tasks run on it to result sink as
+    they are completed.
+    Attributes:
+        * inventory - instance of nornir.core.inventory.Inventory; used in
+            __init__
+        * config - instance of nornir.core.configuration.Config; used in
+            __init__
+        * data - instance of nornir.core.state.GlobalState; used in __init__
+        * sink - instance of ResultSink subclass; used in __init__
+    '''
+    def __init__(self, inventory, config=None, data=None, sink=None):
+        super().__init__(inventory, config, data)
+        self.sink = sink
+
+    def filter(self, *args, **kwargs):
+        return StreamingNornir(self.inventory.filter(*args, **kwargs),
+                               self.config, self.data, self.sink)
+
+    def run(self, task, num_workers=None, raise_on_error=None, on_good=True,
+            on_failed=False, **kwargs):
+        self.sink.start(len([x for x in self.inventory.hosts
+                             if (x in self.data.failed_hosts and on_failed) or
+                             (x not in self.data.failed_hosts and on_good)]))
+        return super().run(self.sink.wrap(task), num_workers, raise_on_error,
+                           on_good, on_failed, **kwargs)
+
+
+def streaming(nornir, sink):
+    '''Make Nornir stream results of tasks run on it into sink.
+    Arguments:
+        * nornir - instance of nornir.core.Nornir
+        * sink - instance of ResultSink subclass
+    Returns:
+        * instance of StreamingNornir sharing inventory, configuration and
+            state with given Nornir
+    '''
+    return StreamingNornir(nornir.inventory, nornir.config, nornir.data, sink)
@@ -1,13 +1,21 @@
+import io
 import os
 import os.path
+import sqlite3
+import tempfile
 import ipaddress
+from datetime import datetime, timezone
 import click
-from importlib import import_module
-from ruamel.yaml import YAML
-from ruamel.yaml.scanner import ScannerError
-from nornir import InitNornir
-from nornir.plugins.functions.text import print_result
-from utils.nornir_utils import nornir_set_credentials
+from utils.inventory_cache import get_hosts, get_groups, inventory_files
+from utils.nornir_utils import nornir_set_credentials, select_hosts
+from utils.binding_registry import (get_bindings, load_binding,
+                                    unsupported_hosts)
+from utils.batch import (read_job_file, select_job_hosts, run_job,
+                         inventory_data, BatchException)
+from utils.fleet_export import export_fleet, ExportException, FORMATS
+from utils import metrics
+from utils.daemon import (RunnerDaemon, DaemonException, DaemonUnavailable,
+                          RequestError, send_request, DEFAULT_SOCKET)
 from app_exception import AppException
 
 
@@ -44,14 +52,84 @@ class IPRetrievalError(RunnerException):
     pass
 
 
+def parse_filters(ctx, param, value):
+    '''Click callback converting KEY=VALUE filter options into dictionary.
+    Returns:
+        * dictionary with host data keys and values
+    '''
+    filters = {}
+    for item in value:
+        key, sep, data = item.partition('=')
+        if not sep or not key:
+            raise click.BadParameter(
+                '{} is not in KEY=VALUE format'.format(item))
+        filters[key] = data
+    return filters
+
+
 @click.command()
 @click.option('-c', '--config', default='config.yml', metavar='<PATH>',
               help='path to Nornir config file')
-@click.argument('hostname')
-def main(config, hostname):
+@click.option('-g', '--group', 'groups', multiple=True, metavar='<GROUP>',
+              help='run on hosts of group, may be repeated')
+@click.option('-f', '--filter', 'filters', multiple=True,
+              metavar='<KEY=VALUE>', callback=parse_filters,
+              help='run on hosts with such inventory data, may be repeated')
+@click.option('-w', '--workers', type=click.IntRange(min=1), metavar='<N>',
+              help='number of hosts to process at once')
+@click.option('-o', '--output', type=click.Choice(['text', 'ndjson']),
+              default='text', help='format of host results, printed as soon '
+              'as every host is done')
+@click.option('-e', '--export', 'export_path', metavar='<PATH>',
+              help='export interfaces and BGP neighbors gathered by binding '
+              'to SQLite database or directory of CSV/Parquet files')
+@click.option('--export-format', type=click.Choice(FORMATS),
+              default='sqlite', help='format of export')
+@click.option('-m', '--metrics', 'metrics_dir', metavar='<DIR>',
+              help='write command latency, output size and parse time '
+              'histograms into Prometheus textfile and JSON summary in DIR '
+              'at the end of run')
+@click.option('-j', '--job-file', type=click.Path(exists=True, dir_okay=False),
+              metavar='<PATH>', help='run jobs from YAML job file')
+@click.option('--schedule', 'schedule_file',
+              type=click.Path(exists=True, dir_okay=False), metavar='<PATH>',
+              help='poll hosts periodically by YAML schedule file')
+@click.option('-s', '--socket', 'socket_path', default=DEFAULT_SOCKET,
+              metavar='<PATH>', help='path to runner daemon Unix socket')
+@click.option('--serve', is_flag=True,
+              help='start runner daemon instead of running binding')
+@click.option('--local', is_flag=True,
+              help='run binding in this process even if daemon is running')
+@click.argument('hosts', nargs=-1)
+def main(config, groups, filters, workers, output, export_path,
+         export_format, metrics_dir, job_file, schedule_file, socket_path,
+         serve, local, hosts):
     '''Dynamically choose Nornir binding defind in 'bindings/' directory and
-    execute it on HOSTNAME. If HOSTNAME is not in inventory, you will be
-    prompted to add it in (follow instructions in prompts).
+    execute it on HOSTS. HOSTS are host names or shell-style patterns, like
+    'tor-1*'; selection is narrowed down with --group and --filter options.
+    Selected hosts are processed concurrently. If single HOSTNAME given is
+    not in inventory, you will be prompted to add it in (follow instructions
+    in prompts).
+
+    With --serve runner becomes a daemon, which keeps Nornir initialized and
+    connections to hosts open. Following runs on hosts from its inventory
+    are passed to daemon, unless --local is given.
+
+    With --job-file runner executes jobs (host selectors, binding and its
+    parameters) listed in YAML file without any prompts; password is taken
+    from NORNIR_BINDINGS_PASSWORD environment variable, if it is set.
+
+    With --schedule runner polls hosts by operations listed in YAML file at
+    their intervals until interrupted, spreading runs with jitter and rate
+    limiting commands per device and per site.
+
+    With --export switch objects gathered by binding (interfaces, their
+    addresses and VLANs, BGP neighbors) are exported into tables to be
+    queried offline. Binding is run locally then.
+
+    With --metrics commands, parsers and binding tasks are timed, and
+    histograms are written out at the end of run (at exit with --schedule).
+    Binding is run locally then.
     '''
     try:
         check_config(config)
@@ -61,7 +139,47 @@ def main(config, hostname):
     except CorruptedConfig as e:
         click.echo(e)
         exit(1)
-    if not is_in_inventory(config, hostname):
+    if serve:
+        try:
+            RunnerDaemon(config, socket_path).serve()
+        except DaemonException as e:
+            click.echo(e)
+            exit(1)
+        except KeyboardInterrupt:
+            pass
+        return
+    if metrics_dir:
+        metrics.enable()
+        click.get_current_context().call_on_close(lambda: write_metrics(
+            metrics_dir, err=output == 'ndjson'))
+    if job_file or schedule_file:
+        if any([hosts, groups, filters]):
+            raise click.UsageError('Hosts are selected by job or schedule '
+                                   'file, do not give HOSTS, --group or '
+                                   '--filter.')
+        if job_file:
+            run_batch(config, job_file, workers, output, export_path,
+                      export_format)
+        else:
+            run_schedule(config, schedule_file, workers, output)
+        return
+    if not any([hosts, groups, filters]):
+        raise click.UsageError('Give HOSTS, --group or --filter to select '
+                               'hosts to run binding on.')
+    # daemon keeps host data and metrics in its own process, nothing to
+    # export here
+    if not local and not export_path and not metrics_dir:
+        try:
+            if run_with_daemon(socket_path, hosts, groups, filters, workers):
+                return
+        except DaemonUnavailable:
+            pass
+        except RequestError as e:
+            click.echo(e)
+            exit(1)
+    if is_single_hostname(hosts, groups, filters) and not is_in_inventory(
+            config, hosts[0]):
+        hostname = hosts[0]
         click.echo('Host not found in inventory.')
         click.confirm('Add it?', abort=True)
         txt1 = ('Enter IP address to put it in config or'
@@ -77,57 +195,285 @@ def main(config, hostname):
         txt2 = ('Enter groups separated by commas, spaces will'
                 ' be stripped, unknown groups ignored, new groups creation'
                 ' unsuppoted')
-        groups = click.prompt(txt2)
+        host_groups = click.prompt(txt2)
         try:
-            add_to_inventory(config, hostname, host_ip, groups)
+            add_to_inventory(config, hostname, host_ip, host_groups)
         except UnconfiguredGroup as e:
             click.echo(e)
             exit(1)
-    bindings = [x for x in os.listdir(
-        'bindings') if '.py' in x and not x.startswith(('.', '_'))]
-    bindings_dict = {y: x for y, x in enumerate(bindings)}
-    for num, binding in bindings_dict.items():
-        click.echo('{}: {}'.format(num+1, binding[:-3]))
-    input_num = click.prompt('Choose binding to run', type=int)
-    chosen_binding = bindings_dict[input_num-1][:-3]
-    binding_module = import_module('.'+chosen_binding, package='bindings')
-    nrnr = InitNornir(config_file='config.yml')
-    nrnr = nrnr.filter(name=hostname)
+    bindings = get_bindings()
+    chosen_binding = bindings[choose_binding(
+        [(x.name, x.description) for x in bindings.values()])]
+    parameters = prompt_parameters(chosen_binding.parameters)
+    # nornir is imported only here, when binding is going to run; listing
+    # bindings and runs served by daemon don't need its slow import
+    from utils.cached_inventory import init_nornir
+    from utils.result_sink import streaming, SINKS
+    nrnr = select_hosts(streaming(init_nornir(config), SINKS[output]()),
+                        hosts, groups, filters, workers)
+    if not nrnr.inventory.hosts:
+        click.echo('No hosts matched.')
+        exit(1)
+    unsupported = unsupported_hosts(chosen_binding,
+                                    nrnr.inventory.hosts.values())
+    if unsupported:
+        click.echo('Binding {} does not support platform of hosts: {}'.format(
+            chosen_binding.name, ', '.join(unsupported)))
+        exit(1)
+    binding_module = load_binding(chosen_binding.name)
     nornir_set_credentials(nrnr)
-    result = binding_module.execute(nrnr)
-    print_result(result[hostname][0])
+    result = binding_module.execute(nrnr, **parameters)
+    echo_summary(sorted(result), sorted(result.failed_hosts),
+                 err=output == 'ndjson')
+    if export_path:
+        export(nrnr, export_path, export_format, err=output == 'ndjson')
+
+
+def is_single_hostname(hosts, groups, filters):
+    '''Check if hosts are selected by a single plain host name.
+    Arguments:
+        * hosts - host names or patterns
+        * groups - group names
+        * filters - dictionary of host data filters
+    Returns:
+        * True or False
+    '''
+    return (len(hosts) == 1 and not groups and not filters and
+            not any(x in hosts[0] for x in '*?['))
+
+
+def choose_binding(bindings):
+    '''Prompt user to choose binding by its number.
+    Arguments:
+        * bindings - list of tuples with binding name and description
+    Returns:
+        * chosen binding name
+    '''
+    for num, (binding, description) in enumerate(bindings):
+        if description:
+            click.echo('{}: {} - {}'.format(num+1, binding, description))
+        else:
+            click.echo('{}: {}'.format(num+1, binding))
+    input_num = click.prompt('Choose binding to run',
+                             type=click.IntRange(1, len(bindings)))
+    return bindings[input_num-1][0]
+
+
+def prompt_parameters(parameters):
+    '''Prompt user for binding parameters.
+    Arguments:
+        * parameters - dictionary with parameter names as keys and prompts as
+            values
+    Returns:
+        * dictionary with parameter names as keys and user input as values
+    '''
+    return {name: click.prompt(prompt) for name, prompt in parameters.items()}
+
+
+def echo_summary(hostnames, failed_hostnames, err=False):
+    '''Print out number of hosts binding was run on and failed ones, if
+    there were more than one host.
+    Arguments:
+        * hostnames - list of host names
+        * failed_hostnames - list of failed host names
+        * err (defaults to False) - if True, print to stderr, keeping stdout
+            for machine readable results
+    Returns nothing
+    '''
+    if len(hostnames) < 2:
+        return
+    summary = 'Binding run on {} hosts, {} failed'.format(
+        len(hostnames), len(failed_hostnames))
+    if failed_hostnames:
+        summary += ': {}'.format(', '.join(failed_hostnames))
+    click.echo(summary, err=err)
+
+
+def export(nornir, path, export_format, snapshot=None, err=False):
+    '''Export switch objects gathered by binding and print out number of
+    exported rows. Exit with non-zero code if export failed.
+    Arguments:
+        * nornir - instance of nornir.core.Nornir binding was run on
+        * path - export location
+        * export_format - one of utils.fleet_export.FORMATS
+        * snapshot (defaults to None) - snapshot label; if None, current UTC
+            time is used
+        * err (defaults to False) - if True, print to stderr
+    Returns nothing
+    '''
+    try:
+        counts = export_fleet(nornir.inventory.hosts.values(), path,
+                              export_format, snapshot)
+    except (ExportException, OSError, sqlite3.Error) as e:
+        click.echo('Export failed: {}'.format(e), err=err)
+        exit(1)
+    click.echo('Exported to {}: {}'.format(path, ', '.join(
+        '{} {}'.format(y, x) for x, y in counts.items())), err=err)
+
+
+def write_metrics(directory, err=False):
+    '''Write collected metrics and print out where to.
+    Arguments:
+        * directory - directory to write metrics files to
+        * err (defaults to False) - if True, print to stderr
+    Returns nothing
+    '''
+    try:
+        paths = metrics.write_metrics(directory)
+    except OSError as e:
+        click.echo('Metrics export failed: {}'.format(e), err=err)
+        return
+    click.echo('Metrics written to {}'.format(', '.join(paths)), err=err)
+
+
+def run_batch(config, job_file, workers, output='text', export_path=None,
+              export_format='sqlite'):
+    '''Run jobs from job file with single Nornir and print out results as soon
+    as every host is done. Exit with non-zero code if any host failed.
+    Arguments:
+        * config - Nornir configuration file location
+        * job_file - job file location
+        * workers - number of hosts to process at once or None
+        * output (defaults to 'text') - results format, 'text' or 'ndjson';
+            with 'ndjson' everything else is printed to stderr
+        * export_path (defaults to None) - location to export switch objects
+            after every job to; if None, nothing is exported
+        * export_format (defaults to 'sqlite') - format of export
+    Returns nothing
+    '''
+    try:
+        jobs = read_job_file(job_file)
+    except BatchException as e:
+        click.echo(e)
+        exit(1)
+    from utils.cached_inventory import init_nornir
+    from utils.result_sink import streaming, SINKS
+    nrnr = streaming(init_nornir(config), SINKS[output]())
+    nornir_set_credentials(nrnr)
+    initial_data = inventory_data(nrnr)
+    err = output == 'ndjson'
+    failed = False
+    # jobs overwrite host data, so every job is exported as own snapshot
+    started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    for job in jobs:
+        parameters = ', '.join('{}={}'.format(x, y) for x, y in sorted(
+            job.parameters.items()))
+        click.echo('Job {}: {} {}'.format(job.number, job.binding.name,
+                                          parameters), err=err)
+        selected, unsupported = select_job_hosts(nrnr, job, workers)
+        if unsupported:
+            click.echo('Binding does not support platform of hosts: {}'.format(
+                ', '.join(unsupported)), err=err)
+        if not selected.inventory.hosts:
+            click.echo('No hosts matched.', err=err)
+            continue
+        result = run_job(selected, job, initial_data)
+        echo_summary(sorted(result), sorted(result.failed_hosts), err=err)
+        failed = failed or bool(result.failed_hosts)
+        if export_path:
+            export(selected, export_path, export_format, '{} job {}'.format(
+                started, job.number), err=err)
+    if failed:
+        exit(1)
+
+
+def run_schedule(config, schedule_file, workers, output='text', stop=None):
+    '''Poll hosts by schedule file until interrupted, printing out results as
+    soon as every run is done, and number of runs of every poll at exit.
+    Arguments:
+        * config - Nornir configuration file location
+        * schedule_file - schedule file location
+        * workers - number of runs to execute at once or None
+        * output (defaults to 'text') - results format, 'text' or 'ndjson';
+            with 'ndjson' everything else is printed to stderr
+        * stop (defaults to None) - instance of threading.Event, which stops
+            polling when set
+    Returns nothing
+    '''
+    from utils.scheduler import (read_schedule_file, Scheduler,
+                                 SchedulerException, DEFAULT_WORKERS)
+    try:
+        polls = read_schedule_file(schedule_file)
+    except SchedulerException as e:
+        click.echo(e)
+        exit(1)
+    from utils.cached_inventory import init_nornir
+    from utils.result_sink import SINKS
+    nrnr = init_nornir(config)
+    nornir_set_credentials(nrnr)
+    err = output == 'ndjson'
+    scheduler = Scheduler(nrnr, polls, workers or DEFAULT_WORKERS,
+                          SINKS[output]())
+    click.echo('Polling {} hosts'.format(len(
+        {x.host.name for x in scheduler.jobs})), err=err)
+    try:
+        scheduler.serve(stop)
+    except KeyboardInterrupt:
+        pass
+    stats = scheduler.stats()
+    for poll in polls:
+        click.echo('Poll {}: {} - {runs} runs, {failed} failed, {skipped} '
+                   'skipped'.format(poll.number, poll.operation,
+                                    **stats[poll.number]), err=err)
+
+
+def run_with_daemon(socket_path, hosts, groups, filters, workers):
+    '''Run binding on hosts by runner daemon, prompting user for binding and
+    its parameters. Hosts added to inventory after daemon start are unknown
+    to it.
+    Arguments:
+        * socket_path - path to daemon Unix socket
+        * hosts - host names or patterns
+        * groups - group names
+        * filters - dictionary of host data filters
+        * workers - number of hosts to process at once or None
+    Returns:
+        * True if binding was run, False if daemon matched no hosts
+    '''
+    hostnames = send_request({'action': 'hosts', 'patterns': hosts,
+                              'groups': groups, 'filters': filters},
+                             socket_path)['hosts']
+    if not hostnames:
+        return False
+    bindings = {x['name']: x for x in send_request(
+        {'action': 'bindings'}, socket_path)['bindings']}
+    chosen_binding = choose_binding(
+        [(x['name'], x['description']) for x in bindings.values()])
+    parameters = prompt_parameters(bindings[chosen_binding]['parameters'])
+    results = send_request({'action': 'run', 'hosts': hostnames,
+                            'binding': chosen_binding,
+                            'parameters': parameters, 'workers': workers},
+                           socket_path)['results']
+    for hostname in sorted(results):
+        status = 'failed' if results[hostname]['failed'] else 'ok'
+        click.echo('* {} ** {}'.format(hostname, status))
+        click.echo(results[hostname]['result'])
+    echo_summary(sorted(results), sorted(
+        x for x, y in results.items() if y['failed']))
+    return True
 
 
 def get_inventory_groups(config):
-    '''Parse Nornir config file to find group inventory file and parse it next.
-    Grab all configured groups and return them.
+    '''Find group inventory file in Nornir config and grab all configured
+    groups from it. Files are loaded through utils.inventory_cache.
     Arguments:
         * config - Nornir configuration file location
     Returns:
         view of dictionary keys, which represents groups defined in inventory
     '''
-    yaml = YAML()
-    with open(config, 'r', encoding='utf-8') as config_file:
-        config_yaml = yaml.load(config_file)
-    group_inventory = config_yaml['inventory']['options']['group_file']
-    with open(group_inventory, 'r', encoding='utf-8') as group_file:
-        groups = yaml.load(group_file)
-    return groups.keys()
+    return get_groups(config).keys()
 
 
 def is_in_inventory(config, hostname):
-    '''Initialize Nornir and check if hostname is defined in inventory.
+    '''Check if hostname is defined in inventory, without Nornir
+    initialization. Files are loaded through utils.inventory_cache.
     Argumets:
         * config - Nornir configuration file location
         * hostname - hostname that will be looked up
     Returns:
         * True or False - is host in inventory
     '''
-    nrnr = InitNornir(config_file=config)
-    if hostname not in nrnr.inventory.hosts.keys():
-        return False
-    else:
-        return True
+    return hostname in get_hosts(config)
 
 
 def add_to_inventory(config, hostname, ip, groups, no_such_group_ignore=False):
@@ -145,10 +491,30 @@ def add_to_inventory(config, hostname, ip, groups, no_such_group_ignore=False):
             unexisted groups, otherwise raise UnconfiguredGroup
     Returns nothing
     '''
+    cleaned_groups = clean_groups(groups, get_inventory_groups(config),
+                                  no_such_group_ignore)
+    append_to_inventory(config, {hostname: {"hostname": ip,
+                                            "groups": cleaned_groups}})
+
+
+def clean_groups(groups, configured_groups, no_such_group_ignore=False):
+    '''Validate groups host will be added to. Raise NoGroupsHost exception if
+    no groups given, or all of them not exist (in case of
+    no_such_group_ignore flag is set).
+    Arguments:
+        * groups - string with group names separated by commas (spaces will
+            be ignored) or list of group names
+        * configured_groups - group names defined in inventory
+        * no_such_group_ignore (default to False) - if True, silently drop
+            unexisted groups, otherwise raise UnconfiguredGroup
+    Returns:
+        * list of group names
+    '''
     if not groups:
         raise NoGroupsHost('No groups configured')
-    configured_groups = get_inventory_groups(config)
-    groups = [x.strip() for x in groups.split(',')]
+    if isinstance(groups, str):
+        groups = groups.split(',')
+    groups = [x.strip() for x in groups]
     cleaned_groups = []
     # we are going to use this for stripping nonexisiting groups if
     # no_such_group_ignore flag is set
@@ -163,14 +529,41 @@ def add_to_inventory(config, hostname, ip, groups, no_such_group_ignore=False):
             cleaned_groups.append(group)
     if len(cleaned_groups) == 0:
         raise NoGroupsHost('All configured groups not exist')
-    host = {hostname: {"hostname": ip, "groups": cleaned_groups}}
+    return cleaned_groups
+
+
+def append_to_inventory(config, hosts):
+    '''Append hosts to Nornir inventory host file. File is replaced in one
+    atomic operation, so Nornir never reads partially written inventory,
+    and existing contents (including comments) are kept as is.
+    Arguments:
+        * config - Nornir configuration file location
+        * hosts - dictionary with host names as keys and host definitions as
+            values
+    Returns nothing
+    '''
+    from ruamel.yaml import YAML
+    host_inventory = inventory_files(config)['host_file']
     yaml = YAML()
-    with open(config, 'r', encoding='utf-8') as config_file:
-        config_yaml = yaml.load(config_file)
-    host_inventory = config_yaml['inventory']['options']['host_file']
     yaml.indent(mapping=2, sequence=2, offset=2)
-    with open(host_inventory, 'a', encoding='utf-8') as host_file:
-        yaml.dump(host, host_file)
+    new_hosts = io.StringIO()
+    yaml.dump(hosts, new_hosts)
+    with open(host_inventory, 'r', encoding='utf-8') as host_file:
+        contents = host_file.read()
+    if contents and not contents.endswith('\n'):
+        contents += '\n'
+    directory = os.path.dirname(os.path.abspath(host_inventory))
+    fd, tmp_inventory = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+            tmp_file.write(contents + new_hosts.getvalue())
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.chmod(tmp_inventory, os.stat(host_inventory).st_mode & 0o777)
+        os.replace(tmp_inventory, host_inventory)
+    except BaseException:
+        os.unlink(tmp_inventory)
+        raise
 
 
 def check_config(config):
@@ -180,24 +573,19 @@ def check_config(config):
         * config - path to Nornir config
     Returns nothing
     '''
+    from ruamel.yaml.scanner import ScannerError
     if not os.path.isfile(config):
         raise ConfigNotFound('No config found at {}'.format(config))
     try:
-        yaml = YAML()
-        with open(config, 'r', encoding='utf-8') as config_file:
-            configuration = yaml.load(config_file)
-        hosts = configuration['inventory']['options']['host_file']
-        groups = configuration['inventory']['options']['group_file']
-        # test host and group files for syntax by loading them
-        with open(hosts, 'r', encoding='utf-8') as host_file:
-            yaml.load(host_file)
-        with open(groups, 'r', encoding='utf-8') as group_file:
-            yaml.load(group_file)
+        # test host and group files for syntax by loading them; unchanged
+        # files are answered from snapshots without parsing
+        get_hosts(config)
+        get_groups(config)
     except ScannerError as e:
         raise CorruptedConfig('Corrupted config: {}'.format(e))
 
 
-def get_host_ip_address(user_input, hostname):
+def get_host_ip_address(user_input, hostname, resolve=None):
     '''Get host IP address. First try to convert user input into valid IP
     address. If it fails use that input as domain name and try DNS lookup. If
     that fails to - raise IPRetrievalError.
@@ -205,14 +593,18 @@ def get_host_ip_address(user_input, hostname):
         * user_input - input from user (we expect it to be either IP address or
             name of DNS domain
         * hostname - just a hostname
+        * resolve (defaults to None) - function resolving domain name into IP
+            address and raising socket.gaierror on failure; if None,
+            socket.gethostbyname is used
     Returns string, representing IP address
     '''
     try:
         return ipaddress.ip_address(user_input).compressed
     except ValueError:
+        import socket
+        resolve = resolve or socket.gethostbyname
         try:
-            import socket
-            return socket.gethostbyname(hostname+'.'+user_input)
+            return resolve(hostname+'.'+user_input)
         except socket.gaierror:
             raise IPRetrievalError('Incorrect IP address, hostname or domain')
 
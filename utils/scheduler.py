@@ -0,0 +1,306 @@
+import time
+import heapq
+import random
+import pkgutil
+import importlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from nornir.core.task import Task
+import operations
+from utils.batch import as_list
+from utils.daemon import ConnectionPool
+from utils.nornir_utils import select_hosts
+from utils.rate_limit import build_limiters
+from app_exception import AppException
+
+POLL_KEYS = {'operation', 'hosts', 'groups', 'filters', 'interval', 'jitter',
+             'parameters', 'data'}
+# fraction of interval every run is shifted by at most, both ways
+DEFAULT_JITTER = 0.1
+DEFAULT_WORKERS = 20
+# how often scheduler loop wakes up to evict idle connections
+POLL_INTERVAL = 5
+
+Poll = namedtuple('Poll', ['number', 'operation', 'task', 'hosts', 'groups',
+                           'filters', 'interval', 'jitter', 'parameters',
+                           'data'])
+
+
+class SchedulerException(AppException):
+    '''Top-level module exception for inheritance purposes.'''
+    pass
+
+
+class MalformedScheduleFile(SchedulerException):
+    '''Exception to raise if schedule file can't be read or has invalid
+    polls.'''
+    pass
+
+
+def find_operation(name):
+    '''Find Nornir task in operations package by its name, either qualified
+    with module ('check_vrf_status.check_vrf_bgp_neighbors') or bare.
+    Arguments:
+        * name - operation name
+    Returns:
+        * Nornir task function
+    '''
+    module_name, _, function_name = str(name).rpartition('.')
+    if module_name:
+        module_names = [module_name]
+    else:
+        module_names = [x.name for x in pkgutil.iter_modules(
+            operations.__path__)]
+    for module_name in module_names:
+        try:
+            module = importlib.import_module('operations.' + module_name)
+        except ImportError:
+            continue
+        function = getattr(module, function_name, None)
+        if callable(function) and not function_name.startswith('_'):
+            return function
+    raise MalformedScheduleFile('no operation {}'.format(name))
+
+
+def parse_polls(entries):
+    '''Validate schedule file entries and make polls out of them. Entry is a
+    dictionary with 'operation' (name of Nornir task in operations package),
+    'interval' in seconds and host selectors ('hosts', 'groups', 'filters'),
+    like in job file. Optional 'jitter' is fraction of interval runs are
+    shifted by at random, 'parameters' are passed to task and 'data' is
+    set into host data before every run (like 'vrf_name' operations expect).
+    Arguments:
+        * entries - list of dictionaries
+    Returns:
+        * list of Poll
+    '''
+    if not isinstance(entries, list):
+        raise MalformedScheduleFile('schedule file must contain list of polls')
+    polls = []
+    for num, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            raise MalformedScheduleFile('poll {} is not a mapping'.format(num))
+        unknown = set(entry) - POLL_KEYS
+        if unknown:
+            raise MalformedScheduleFile('poll {} has unknown keys: {}'.format(
+                num, ', '.join(sorted(unknown))))
+        try:
+            task = find_operation(entry.get('operation'))
+        except MalformedScheduleFile as e:
+            raise MalformedScheduleFile('poll {}: {}'.format(num, e))
+        hosts = as_list(entry.get('hosts'))
+        groups = as_list(entry.get('groups'))
+        filters = {str(x): str(y) for x, y in (
+            entry.get('filters') or {}).items()}
+        if not any([hosts, groups, filters]):
+            raise MalformedScheduleFile('poll {} selects no hosts'.format(num))
+        interval = entry.get('interval')
+        jitter = entry.get('jitter', DEFAULT_JITTER)
+        if not isinstance(interval, (int, float)) or interval <= 0:
+            raise MalformedScheduleFile(
+                'poll {} needs positive interval in seconds'.format(num))
+        if not isinstance(jitter, (int, float)) or not 0 <= jitter < 1:
+            raise MalformedScheduleFile(
+                'poll {}: jitter must be fraction of interval'.format(num))
+        parameters = entry.get('parameters') or {}
+        data = entry.get('data') or {}
+        if not isinstance(parameters, dict) or not isinstance(data, dict):
+            raise MalformedScheduleFile(
+                'poll {}: parameters and data must be mappings'.format(num))
+        polls.append(Poll(num, str(entry['operation']), task, hosts, groups,
+                          filters, interval, jitter, parameters, data))
+    return polls
+
+
+def read_schedule_file(path):
+    '''Read polls from YAML (or JSON) schedule file, see parse_polls for
+    format.
+    Arguments:
+        * path - schedule file location
+    Returns:
+        * list of Poll
+    '''
+    from ruamel.yaml import YAML, YAMLError
+    try:
+        with open(path, 'r', encoding='utf-8') as schedule_file:
+            entries = YAML(typ='safe').load(schedule_file)
+    except (OSError, YAMLError) as e:
+        raise MalformedScheduleFile('can not read schedule file: {}'.format(
+            e))
+    return parse_polls(entries)
+
+
+class PollJob:
+    '''Single poll scheduled on a single host.
+    Attributes:
+        * poll - instance of Poll; used in __init__
+        * host - instance of nornir.core.inventory.Host; used in __init__
+        * slot - time of current run without jitter; used in __init__
+        * next_run - time current run is due at
+        * running - True if run was submitted and is not finished yet
+        * runs - number of finished runs
+        * failed - number of failed runs
+        * skipped - number of runs skipped because previous one was still
+            running or scheduler was late
+    '''
+    __slots__ = ('poll', 'host', 'slot', 'next_run', 'running', 'runs',
+                 'failed', 'skipped')
+
+    def __init__(self, poll, host, slot):
+        self.poll = poll
+        self.host = host
+        self.slot = slot
+        self.next_run = slot
+        self.running = False
+        self.runs = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def __lt__(self, other):
+        return self.next_run < other.next_run
+
+
+class Scheduler:
+    '''Run polls on hosts periodically. First runs are spread evenly over
+    poll interval, every following run is shifted by random jitter, so
+    devices are not polled all at the same second. Commands are rate
+    limited per device and per site (see utils.rate_limit.build_limiters).
+    Run which is due while previous run of the same poll on the same host
+    is still going on is skipped, not queued, so load stays predictable.
+    Polls of the same host are run one at a time, with host data gathered
+    by previous run dropped, and connections are kept open between them.
+    Attributes:
+        * nornir - instance of nornir.core.Nornir with credentials set; used
+            in __init__
+        * polls - list of Poll; used in __init__
+        * workers (defaults to DEFAULT_WORKERS) - number of runs executed at
+            once; used in __init__
+        * sink (defaults to None) - instance of
+            utils.result_sink.ResultSink results are written to; used in
+            __init__
+        * clock (defaults to time.monotonic) - function returning current
+            time in seconds; used in __init__
+        * sleep (defaults to time.sleep) - function to wait for command
+            tokens with; used in __init__
+        * seed (defaults to None) - random seed for start times and jitter;
+            used in __init__
+        * jobs - list of PollJob
+        * pool - instance of utils.daemon.ConnectionPool
+    '''
+    def __init__(self, nornir, polls, workers=DEFAULT_WORKERS, sink=None,
+                 clock=time.monotonic, sleep=time.sleep, seed=None):
+        self.nornir = nornir
+        self.polls = polls
+        self.workers = workers
+        self.sink = sink
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.pool = ConnectionPool()
+        self.jobs = []
+        now = clock()
+        for poll in polls:
+            selected = select_hosts(nornir, poll.hosts, poll.groups,
+                                    poll.filters)
+            for host in selected.inventory.hosts.values():
+                self.jobs.append(PollJob(poll, host, now + self.random.uniform(
+                    0, poll.interval)))
+        hosts = {x.host.name: x.host for x in self.jobs}
+        for name, limiter in build_limiters(hosts.values(), clock,
+                                            sleep).items():
+            hosts[name]['command_limiter'] = limiter
+        # data gathered by operations is dropped before every run
+        self._initial_data = {x: set(y.data.keys()) for x, y in hosts.items()}
+        self._queue = list(self.jobs)
+        heapq.heapify(self._queue)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        if sink is not None:
+            sink.start(len(self.jobs))
+
+    def _reschedule(self, job, now):
+        '''Move job to its next interval slot after now, counting slots
+        scheduler was late for as skipped, and shift it by jitter.'''
+        interval = job.poll.interval
+        job.slot += interval
+        while job.slot <= now:
+            job.slot += interval
+            job.skipped += 1
+        job.next_run = job.slot + self.random.uniform(
+            -job.poll.jitter, job.poll.jitter) * interval
+
+    def tick(self):
+        '''Submit runs which are due, skipping ones still running.
+        Returns:
+            * seconds until next run is due or None if there are no jobs
+        '''
+        now = self.clock()
+        while self._queue and self._queue[0].next_run <= now:
+            job = heapq.heappop(self._queue)
+            if job.running:
+                job.skipped += 1
+            else:
+                job.running = True
+                self._executor.submit(self._run, job)
+            self._reschedule(job, now)
+            heapq.heappush(self._queue, job)
+        # progress counter of sink is restarted for every round of runs
+        if self.sink is not None and self.sink.completed >= len(self.jobs):
+            self.sink.start(len(self.jobs))
+        if not self._queue:
+            return None
+        return max(0.0, self._queue[0].next_run - now)
+
+    def _run(self, job):
+        '''Run poll task on host in worker thread.'''
+        host = job.host
+        failed = True
+        self.pool.checkout(host)
+        try:
+            for key in set(host.data.keys()) - self._initial_data[host.name]:
+                del host.data[key]
+            host.data.update(job.poll.data)
+            task = job.poll.task
+            if self.sink is not None:
+                task = self.sink.wrap(task)
+            failed = Task(task, **job.poll.parameters).start(
+                host, self.nornir).failed
+        finally:
+            self.pool.release(host)
+            job.runs += 1
+            job.failed += failed
+            job.running = False
+
+    def stats(self):
+        '''Count runs of every poll on all of its hosts.
+        Returns:
+            * dictionary with poll numbers as keys and dictionaries with
+                'runs', 'failed' and 'skipped' counters as values
+        '''
+        stats = {x.number: {'runs': 0, 'failed': 0, 'skipped': 0}
+                 for x in self.polls}
+        for job in self.jobs:
+            for counter in ('runs', 'failed', 'skipped'):
+                stats[job.poll.number][counter] += getattr(job, counter)
+        return stats
+
+    def close(self):
+        '''Wait for running polls to finish and close all connections.'''
+        self._executor.shutdown(wait=True)
+        self.pool.close_all()
+
+    def serve(self, stop=None):
+        '''Run polls until stopped or interrupted.
+        Arguments:
+            * stop (defaults to None) - instance of threading.Event, which
+                stops scheduler when set
+        Returns nothing
+        '''
+        stop = stop or threading.Event()
+        try:
+            while not stop.is_set():
+                delay = self.tick()
+                self.pool.evict_idle()
+                stop.wait(POLL_INTERVAL if delay is None else min(
+                    delay, POLL_INTERVAL))
+        finally:
+            self.close()
@@ -0,0 +1,296 @@
+import sqlite3
+from collections import namedtuple
+import click
+from app_exception import AppException
+from utils.fleet_export import neighbor_key
+from utils.switch_objects import VlanSet
+
+# MAC count change is a swing if it is both at least that ratio of previous
+# count and at least that number of MACs
+MAC_SWING_RATIO = 0.5
+MAC_SWING_MIN = 10
+# keys of records, which digest differs between snapshots or which are gone,
+# of hosts present in both snapshots
+CHANGED_KEYS = '''
+    WITH common AS (
+        SELECT host FROM record_hashes WHERE snapshot = :old
+        INTERSECT
+        SELECT host FROM record_hashes WHERE snapshot = :new)
+    SELECT n.host, n.key FROM record_hashes n
+    LEFT JOIN record_hashes o ON o.snapshot = :old AND o.kind = n.kind
+        AND o.host = n.host AND o.key = n.key
+    WHERE n.snapshot = :new AND n.kind = :kind
+        AND n.host IN common AND o.digest IS NOT n.digest
+    UNION
+    SELECT o.host, o.key FROM record_hashes o
+    LEFT JOIN record_hashes n ON n.snapshot = :new AND n.kind = o.kind
+        AND n.host = o.host AND n.key = o.key
+    WHERE o.snapshot = :old AND o.kind = :kind
+        AND o.host IN common AND n.digest IS NULL'''
+# interfaces present in both snapshots with MAC count swing
+MAC_SWINGS = '''
+    SELECT n.host, n.interface, o.macs_learned, n.macs_learned
+    FROM interfaces n
+    JOIN interfaces o ON o.snapshot = :old AND o.host = n.host
+        AND o.interface = n.interface
+    WHERE n.snapshot = :new AND abs(n.macs_learned - o.macs_learned) >=
+        max(:min, o.macs_learned * :ratio)'''
+Change = namedtuple('Change', ['host', 'name', 'change', 'old', 'new'])
+
+
+class SnapshotDiffException(AppException):
+    '''Top-level module exception for inheritance purposes.'''
+    pass
+
+
+class SnapshotNotFound(SnapshotDiffException):
+    '''Exception to raise if snapshot to compare is not in database.'''
+    pass
+
+
+def list_snapshots(connection):
+    '''List snapshots with record hashes in database, oldest first (labels
+    start with export time).
+    Arguments:
+        * connection - sqlite3.Connection to database written by
+            utils.fleet_export
+    Returns:
+        * list of snapshot labels
+    '''
+    try:
+        return [x for x, in connection.execute(
+            'SELECT DISTINCT snapshot FROM record_hashes ORDER BY snapshot')]
+    except sqlite3.OperationalError:
+        raise SnapshotDiffException(
+            'No record hashes in database, export it with newer version')
+
+
+def unhashed_snapshots(connection):
+    '''List snapshots exported by older version, which wrote no record
+    hashes, so they can't be compared.
+    Arguments:
+        * connection - sqlite3.Connection to database written by
+            utils.fleet_export
+    Returns:
+        * set of snapshot labels
+    '''
+    snapshots = set()
+    for table in ('interfaces', 'bgp_neighbors'):
+        try:
+            snapshots.update(x for x, in connection.execute(
+                'SELECT DISTINCT snapshot FROM {}'.format(table)))
+        except sqlite3.OperationalError:
+            continue
+    return snapshots - set(list_snapshots(connection))
+
+
+def changed_keys(connection, old, new, kind):
+    '''Find records which differ between snapshots by joining their digests,
+    so unchanged records are never loaded. Records of hosts missing in
+    either snapshot (not run or failed) are skipped.
+    Arguments:
+        * connection - sqlite3.Connection
+        * old, new - snapshot labels
+        * kind - 'interface' or 'bgp_neighbor'
+    Returns:
+        * list of (host name, record key) tuples
+    '''
+    return connection.execute(CHANGED_KEYS, {
+        'old': old, 'new': new, 'kind': kind}).fetchall()
+
+
+def load_changed(connection, old, new, keys, query):
+    '''Load rows of changed records out of both snapshots.
+    Arguments:
+        * connection - sqlite3.Connection
+        * old, new - snapshot labels
+        * keys - non-empty list of (host name, key columns...) tuples,
+            columns are named c0, c1... in 'changed' table
+        * query - SELECT joining temporary 'changed' table by key columns,
+            with snapshot in the first column and host in the second; CROSS
+            JOIN keeps SQLite from scanning 'changed' table (it has no
+            statistics) for every row of joined one
+    Returns:
+        * tuple of dictionaries (old, new) with (host, key columns...) as
+            keys and rows without snapshot as values
+    '''
+    width = len(keys[0])
+    connection.execute('DROP TABLE IF EXISTS temp.changed')
+    connection.execute('CREATE TEMP TABLE changed ({})'.format(', '.join(
+        'c{}'.format(x) for x in range(width))))
+    connection.executemany('INSERT INTO temp.changed VALUES ({})'.format(
+        ', '.join('?' * width)), keys)
+    records = ({}, {})
+    for row in connection.execute(query, {'old': old, 'new': new}):
+        records[row[0] == new][row[1:1 + width]] = row[1:]
+    return records
+
+
+def diff_interfaces(connection, old, new):
+    '''Compare interfaces of two snapshots: find ones which flapped
+    (operational status changed), had MAC count swing or VLAN list changed.
+    Arguments:
+        * connection - sqlite3.Connection
+        * old, new - snapshot labels
+    Returns:
+        * list of Change
+    '''
+    keys = changed_keys(connection, old, new, 'interface')
+    if not keys:
+        return []
+    old_rows, new_rows = load_changed(connection, old, new, keys, '''
+        SELECT i.snapshot, i.host, i.interface, i.oper_status,
+            i.vlan_list FROM temp.changed c
+        CROSS JOIN interfaces i ON i.host = c.c0 AND i.interface = c.c1
+        WHERE i.snapshot IN (:old, :new)''')
+    changes = []
+    for key in keys:
+        if key not in old_rows or key not in new_rows:
+            continue
+        host, name, old_status, old_vlans = old_rows[key]
+        _, _, new_status, new_vlans = new_rows[key]
+        if old_status != new_status:
+            changes.append(Change(host, name, 'flapped', old_status,
+                                  new_status))
+        if old_vlans != new_vlans:
+            changes.append(Change(host, name, 'vlans', old_vlans, new_vlans))
+    return changes
+
+
+def diff_macs(connection, old, new):
+    '''Find interfaces of two snapshots with MAC count swing. MAC counts
+    change a bit on every run, so they are left out of record digests and
+    compared with a single indexed join instead.
+    Arguments:
+        * connection - sqlite3.Connection
+        * old, new - snapshot labels
+    Returns:
+        * list of Change
+    '''
+    return [Change(host, name, 'macs', old_macs, new_macs)
+            for host, name, old_macs, new_macs in connection.execute(
+                MAC_SWINGS, {'old': old, 'new': new, 'ratio': MAC_SWING_RATIO,
+                             'min': MAC_SWING_MIN})]
+
+
+def diff_bgp_neighbors(connection, old, new):
+    '''Compare BGP neighbors of two snapshots: find sessions which left
+    established state, including neighbors gone from configuration.
+    Arguments:
+        * connection - sqlite3.Connection
+        * old, new - snapshot labels
+    Returns:
+        * list of Change; name is neighbor key ('VRF/address'), new state
+            is None for gone neighbors
+    '''
+    keys = [(host, ) + tuple(key.rpartition('/')[::2]) for host, key in
+            changed_keys(connection, old, new, 'bgp_neighbor')]
+    if not keys:
+        return []
+    old_rows, new_rows = load_changed(connection, old, new, keys, '''
+        SELECT DISTINCT b.snapshot, b.host, COALESCE(b.vrf, ''), b.neighbor,
+            b.state FROM temp.changed c
+        CROSS JOIN bgp_neighbors b ON b.host = c.c0 AND b.neighbor = c.c2
+            AND COALESCE(b.vrf, '') = c.c1
+        WHERE b.snapshot IN (:old, :new)''')
+    changes = []
+    for key in keys:
+        if key not in old_rows or old_rows[key][3] != 'established':
+            continue
+        new_state = new_rows[key][3] if key in new_rows else None
+        if new_state != 'established':
+            changes.append(Change(key[0], neighbor_key(*key[1:]),
+                                  'bgp_down', 'established', new_state))
+    return changes
+
+
+def diff_snapshots(path, old=None, new=None):
+    '''Report changes between two snapshots of database written by
+    utils.fleet_export: interfaces that flapped, MAC count swings, VLAN list
+    changes and BGP sessions that left established state.
+    Arguments:
+        * path - SQLite database location
+        * old (defaults to None) - label of snapshot to compare with; if
+            None, the one before new is used
+        * new (defaults to None) - label of snapshot to compare; if None,
+            the latest one is used
+    Returns:
+        * list of Change
+    '''
+    connection = sqlite3.connect(path)
+    try:
+        snapshots = list_snapshots(connection)
+        unhashed = unhashed_snapshots(connection)
+        for label in (old, new):
+            if label in unhashed:
+                raise SnapshotNotFound(
+                    'Snapshot {} was exported by older version without '
+                    'record hashes, it can not be compared'.format(label))
+            if label is not None and label not in snapshots:
+                raise SnapshotNotFound('No snapshot {} in {}'.format(
+                    label, path))
+        if new is None:
+            new = snapshots[-1] if snapshots else None
+        if old is None:
+            older = [x for x in snapshots if x < new] if new else []
+            old = older[-1] if older else None
+        if old is None or new is None:
+            raise SnapshotNotFound('Two snapshots needed in {}{}'.format(
+                path, ', {} exported by older version can not be '
+                'compared'.format(len(unhashed)) if unhashed else ''))
+        return diff_interfaces(connection, old, new) + diff_macs(
+            connection, old, new) + diff_bgp_neighbors(connection, old, new)
+    finally:
+        connection.close()
+
+
+def format_change(change):
+    '''Format Change into single line.'''
+    if change.change == 'flapped':
+        text = 'flapped {} -> {}'.format(change.old, change.new)
+    elif change.change == 'macs':
+        text = 'MACs learned {} -> {}'.format(change.old, change.new)
+    elif change.change == 'vlans':
+        old_vlans = VlanSet.from_string(change.old or '')
+        new_vlans = VlanSet.from_string(change.new or '')
+        text = 'VLANs added: {}; removed: {}'.format(
+            new_vlans - old_vlans or '-', old_vlans - new_vlans or '-')
+    else:
+        text = 'BGP session left established, now {}'.format(
+            change.new or 'removed')
+    return '{} {} {}'.format(change.host, change.name, text)
+
+
+@click.command()
+@click.option('--old', metavar='<SNAPSHOT>',
+              help='snapshot to compare with, defaults to previous one')
+@click.option('--new', metavar='<SNAPSHOT>',
+              help='snapshot to compare, defaults to the latest one')
+@click.option('-l', '--list', 'list_only', is_flag=True,
+              help='list snapshots in database and exit')
+@click.argument('database', type=click.Path(exists=True, dir_okay=False))
+def main(old, new, list_only, database):
+    '''Print changes between two snapshots of DATABASE, exported by runner
+    with --export: interfaces that flapped, MAC count swings, VLAN list
+    changes and BGP sessions that left established state.
+    '''
+    try:
+        if list_only:
+            connection = sqlite3.connect(database)
+            try:
+                for snapshot in list_snapshots(connection):
+                    click.echo(snapshot)
+            finally:
+                connection.close()
+            return
+        changes = diff_snapshots(database, old, new)
+    except SnapshotDiffException as e:
+        click.echo(e)
+        exit(1)
+    for change in changes:
+        click.echo(format_change(change))
+    click.echo('{} changes'.format(len(changes)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,27 @@
+import sys
 import ipaddress
 
+# attributes operations may set on SwitchInterface; instances keep them in
+# slots instead of per-instance dictionary, which matters for fleet-wide
+# in-memory snapshots with millions of interfaces
+INTERFACE_ATTRIBUTES = (
+    'admin_status', 'oper_status', 'description', 'mac_address', 'mtu',
+    'speed', 'duplex', 'load_in', 'load_out', 'ipv4_neighbors',
+    'ipv6_neighbors', 'macs_learned', 'switch_mode', 'pvid', 'vlan_list',
+    'vrf', 'members', 'member', 'breakout', 'transceiver', 'ddm',
+    'module_type', 'optical_lanes', 'rx_power')
+INTERFACE_TYPES = ('physical', 'svi', 'subinterface', 'lag')
+MIN_VLAN = 1
+MAX_VLAN = 4094
+
 
 class SwitchInterface:
-    '''Represents switch interface and it's status.
+    '''Represents switch interface and it's status. Besides listed ones,
+    attributes from INTERFACE_ATTRIBUTES are set by operations; attributes
+    not set yet raise AttributeError.
     Attributes:
-        * name - interface name; used in __init__
+        * name - interface name, interned, as it is repeated on every host;
+            used in __init__
         * ipv4_addresses - list of IPAddress instances, with all IPv4 addresses
             exist on that interface
         * ipv6_addresses - list of IPAddress instances, with all IPv6 addresses
@@ -16,8 +33,11 @@ class SwitchInterface:
         * subinterface - boolean to indicate if this interface is subinterface
         * lag - boolean to indicate if this is interface is LAG
     '''
+    __slots__ = ('name', 'ipv4_addresses', 'ipv6_addresses', 'mode', 'svi',
+                 'subinterface', 'lag') + INTERFACE_ATTRIBUTES
+
     def __init__(self, name, mode='switched'):
-        self.name = name
+        self.name = sys.intern(name)
         self.ipv4_addresses = []
         self.ipv6_addresses = []
         self.mode = mode
@@ -37,28 +57,284 @@ class SwitchInterface:
         else:
             self.lag = False
 
+    @property
+    def interface_type(self):
+        '''Interface type, one of INTERFACE_TYPES.'''
+        if self.subinterface:
+            return 'subinterface'
+        if self.svi:
+            return 'svi'
+        if self.lag:
+            return 'lag'
+        return 'physical'
+
     def __str__(self):
         return self.name
 
 
+class InterfaceSet:
+    '''Ordered container of SwitchInterface instances indexed by interface
+    name and type. Behaves like a list for iteration and positional indexing,
+    but interface is also found by name in constant time.
+    Attributes:
+        * interfaces (defaults to empty) - iterable of SwitchInterface; used in
+            __init__
+    '''
+    __slots__ = ('_interfaces', '_by_name', '_by_type')
+
+    def __init__(self, interfaces=()):
+        self._interfaces = []
+        self._by_name = {}
+        self._by_type = {x: [] for x in INTERFACE_TYPES}
+        for interface in interfaces:
+            self.append(interface)
+
+    def append(self, interface):
+        '''Add interface, replacing one with the same name.
+        Arguments:
+            * interface - instance of SwitchInterface
+        Returns nothing
+        '''
+        existing = self._by_name.get(interface.name)
+        if existing is not None:
+            self._interfaces.remove(existing)
+            self._by_type[existing.interface_type].remove(existing)
+        self._interfaces.append(interface)
+        self._by_name[interface.name] = interface
+        self._by_type[interface.interface_type].append(interface)
+
+    def get(self, name, default=None):
+        '''Grab interface by name.
+        Arguments:
+            * name - interface name
+            * default (defaults to None) - value returned if there is no
+                such interface
+        Returns:
+            * instance of SwitchInterface or default
+        '''
+        return self._by_name.get(name, default)
+
+    def of_type(self, *interface_types):
+        '''Grab interfaces of given types, in order they were added.
+        Arguments:
+            * interface_types - one or more of INTERFACE_TYPES
+        Returns:
+            * list of SwitchInterface
+        '''
+        if len(interface_types) == 1:
+            return list(self._by_type[interface_types[0]])
+        return [x for x in self._interfaces
+                if x.interface_type in interface_types]
+
+    @property
+    def names(self):
+        '''List of interface names.'''
+        return list(self._by_name)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._by_name[key]
+        return self._interfaces[key]
+
+    def __contains__(self, item):
+        if isinstance(item, str):
+            return item in self._by_name
+        return self._by_name.get(item.name) is item
+
+    def __iter__(self):
+        return iter(self._interfaces)
+
+    def __len__(self):
+        return len(self._interfaces)
+
+    def __repr__(self):
+        return 'InterfaceSet([{}])'.format(', '.join(self._by_name))
+
+
+class VlanSet:
+    '''Set of VLAN IDs backed by 4096 bit bitmap (arbitrary precision
+    integer), so even 1-4094 trunk takes about half a kilobyte. Supports
+    membership test, iteration in ascending order, set operations and
+    rendering back to range notation, like '1-10,20'. Instances are
+    immutable; VlanSet is equal to another VlanSet or list, tuple or range
+    of the same VLAN IDs.
+    Attributes:
+        * vlans (defaults to empty) - iterable of VLAN IDs; used in __init__
+        * bitmap - integer with bit set for every VLAN ID in set
+    '''
+    __slots__ = ('_bitmap',)
+
+    def __init__(self, vlans=()):
+        bitmap = 0
+        for vlan in vlans:
+            vlan = int(vlan)
+            if not MIN_VLAN <= vlan <= MAX_VLAN:
+                raise ValueError('VLAN ID {} is out of range'.format(vlan))
+            bitmap |= 1 << vlan
+        self._bitmap = bitmap
+
+    @classmethod
+    def from_bitmap(cls, bitmap):
+        '''Make VlanSet out of bitmap, without checking it.
+        Arguments:
+            * bitmap - integer with bit set for every VLAN ID
+        Returns:
+            * instance of VlanSet
+        '''
+        vlan_set = cls()
+        vlan_set._bitmap = bitmap
+        return vlan_set
+
+    @classmethod
+    def from_string(cls, vlan_list, separator=','):
+        '''Parse string with VLAN numbers and ranges, as switches list them,
+        like '1-10,20'. Ranges are set into bitmap without expanding them.
+        Arguments:
+            * vlan_list - string that represents VLAN list, grabbed out of
+                switch
+            * separator (defaults to ',') - string, that separates VLAN
+                numbers and ranges on the list
+        Returns:
+            * instance of VlanSet
+        '''
+        bitmap = 0
+        # whitespace separated lists (Huawei) are wrapped over lines
+        items = vlan_list.split(separator) if separator.strip() else \
+            vlan_list.split()
+        for item in items:
+            item = item.strip()
+            if not item:
+                continue
+            start, _, end = item.partition('-')
+            start = int(start)
+            end = int(end) if end else start
+            if not MIN_VLAN <= start <= end <= MAX_VLAN:
+                raise ValueError('VLAN range {} is invalid'.format(item))
+            bitmap |= ((1 << (end - start + 1)) - 1) << start
+        return cls.from_bitmap(bitmap)
+
+    @property
+    def bitmap(self):
+        return self._bitmap
+
+    def ranges(self):
+        '''Iterate over continuous VLAN ranges in ascending order.
+        Returns:
+            * generator of (first VLAN ID, last VLAN ID) tuples
+        '''
+        bitmap = self._bitmap
+        while bitmap:
+            # lowest set bit starts range, lowest unset bit above it ends it
+            start = (bitmap & -bitmap).bit_length() - 1
+            run = bitmap >> start
+            length = (~run & (run + 1)).bit_length() - 1
+            yield start, start + length - 1
+            bitmap &= ~(((1 << length) - 1) << start)
+
+    def __contains__(self, vlan):
+        return isinstance(vlan, int) and vlan >= 0 and bool(
+            self._bitmap >> vlan & 1)
+
+    def __iter__(self):
+        for start, end in self.ranges():
+            yield from range(start, end + 1)
+
+    def __len__(self):
+        return bin(self._bitmap).count('1')
+
+    def __bool__(self):
+        return bool(self._bitmap)
+
+    def __or__(self, other):
+        return VlanSet.from_bitmap(self._bitmap | _as_vlan_set(other)._bitmap)
+
+    def __and__(self, other):
+        return VlanSet.from_bitmap(self._bitmap & _as_vlan_set(other)._bitmap)
+
+    def __sub__(self, other):
+        return VlanSet.from_bitmap(
+            self._bitmap & ~_as_vlan_set(other)._bitmap)
+
+    def __xor__(self, other):
+        return VlanSet.from_bitmap(self._bitmap ^ _as_vlan_set(other)._bitmap)
+
+    union = __or__
+    intersection = __and__
+    difference = __sub__
+    symmetric_difference = __xor__
+
+    def issubset(self, other):
+        '''Check if every VLAN ID of set is in other set or iterable.'''
+        other = _as_vlan_set(other)
+        return self._bitmap & ~other._bitmap == 0
+
+    def __le__(self, other):
+        return self.issubset(other)
+
+    def __ge__(self, other):
+        return _as_vlan_set(other).issubset(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, range)):
+            other = VlanSet(other)
+        if not isinstance(other, VlanSet):
+            return NotImplemented
+        return self._bitmap == other._bitmap
+
+    def __hash__(self):
+        return hash(self._bitmap)
+
+    def __getstate__(self):
+        return self._bitmap
+
+    def __setstate__(self, state):
+        self._bitmap = state
+
+    def __str__(self):
+        return ','.join(str(x) if x == y else '{}-{}'.format(x, y)
+                        for x, y in self.ranges())
+
+    def __repr__(self):
+        return "VlanSet.from_string('{}')".format(self)
+
+
+def _as_vlan_set(vlans):
+    '''Make VlanSet out of iterable of VLAN IDs, if it is not already one.'''
+    return vlans if isinstance(vlans, VlanSet) else VlanSet(vlans)
+
+
 class IPAddress:
     '''Represents IP address (both v4 and v6) assigned to switch interface.
+    Address is kept as integer with IP version, instead of ipaddress object,
+    and converted back on access.
     Attributes:
-        * address - instance of ipaddress.ip_address; used in __init__
+        * address - instance of ipaddress.ip_address; used in __init__ as
+            string, integer or ipaddress object
+        * version - IP version, 4 or 6
         * prefix_length - prefix length in integer; used in __init__
         * primary - boolean, true if address is primary one; Note, however,
             that in some cases there can not be primary address, for example
             IPv6 in Huawei VRPv8; used in __init__ other way around as
             'secondary' (defaults to None)
     '''
+    __slots__ = ('_address', 'version', 'prefix_length', 'primary')
+
     def __init__(self, address, prefix_length, secondary=None):
-        self.address = ipaddress.ip_address(address)
+        address = ipaddress.ip_address(address)
+        self._address = int(address)
+        self.version = address.version
         self.prefix_length = int(prefix_length)
         if not secondary:
             self.primary = True
         else:
             self.primary = False
 
+    @property
+    def address(self):
+        if self.version == 4:
+            return ipaddress.IPv4Address(self._address)
+        return ipaddress.IPv6Address(self._address)
+
     def __str__(self):
         view = self.address.compressed + '/' + str(self.prefix_length)
         if self.primary:
@@ -69,12 +345,20 @@ class IPAddress:
 class BGPNeighbor:
     '''Represents BGP neighbor for a switch.
     Attributes:
-        * address - instance of ipaddress.ip_address; used in __init__
+        * address - instance of ipaddress.ip_address; used in __init__ as
+            string or ipaddress object, which is kept as is
         * af - dictionary containing AddressFamily instances assigned to 'ipv4'
             and 'ipv6' keys respectively
+        * state, as_number, router_id, _type - session parameters, set by
+            operations
     '''
+    __slots__ = ('address', 'af', 'state', 'as_number', 'router_id', '_type')
+
     def __init__(self, address):
-        self.address = ipaddress.ip_address(address)
+        if not isinstance(address, (ipaddress.IPv4Address,
+                                    ipaddress.IPv6Address)):
+            address = ipaddress.ip_address(address)
+        self.address = address
         self.af = {'ipv4': None, 'ipv6': None}
 
 
@@ -84,6 +368,8 @@ class AddressFamily:
         * af_type - either 'v4' or 'v6', which represent respective AFI type;
             used in __init__
     '''
+    __slots__ = ('af_type', 'learned_routes', 'sent_routes')
+
     def __init__(self, af_type):
         if af_type == 'v4' or af_type == 'v6':
             self.af_type = 'ip{} unicast'.format(af_type)